@@ -0,0 +1,169 @@
+"""Нагрузочные замеры UseCases и хранилищ
+
+python -m benchmarks run [--users 1k,100k] [--backends json,sqlite] [--history-days 90] [--output FILE]
+python -m benchmarks compare OLD.json NEW.json [--threshold 0.10]
+python -m benchmarks startup [--budget-ms 100]
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.suites import bench_history, bench_usecases
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def _valuation_path() -> str:
+    from valutatrade_hub.core.valuation import np
+    return f"numpy {np.__version__}" if np is not None else "python (NumPy не установлен)"
+
+
+def run(args: argparse.Namespace) -> int:
+    sizes = [parse_size(v) for v in args.users.split(",") if v]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    formats = [f.strip() for f in args.history_formats.split(",") if f.strip()]
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+            # Путь массовой оценки портфелей (leaderboard): NumPy или списки Python
+            "valuation": _valuation_path(),
+        },
+        "results": {},
+    }
+    results = report["results"]
+    started = time.perf_counter()
+    print(f"Оценка портфелей: {report['meta']['valuation']}", file=sys.stderr, flush=True)
+
+    for backend in backends:
+        for size in sizes:
+            name = f"usecases/{backend}/{size}"
+            print(f"{name} ...", file=sys.stderr, flush=True)
+            results[name] = bench_usecases(size, backend, args.iterations, args.seed)
+            _print_group(name, results[name])
+
+    for history_format in formats:
+        name = f"history/{history_format}/{args.history_days}d"
+        print(f"{name} ...", file=sys.stderr, flush=True)
+        results[name] = bench_history(args.history_days, history_format, args.iterations, args.seed)
+        _print_group(name, results[name])
+
+    report["meta"]["duration_s"] = round(time.perf_counter() - started, 2)
+    # ru_maxrss в Linux — в килобайтах
+    report["meta"]["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = Path(args.output or f"benchmarks/results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты сохранены: {output}")
+    return 0
+
+
+def _print_group(name: str, group: Dict[str, Any]) -> None:
+    for op, m in group.items():
+        if not isinstance(m, dict):
+            continue
+        print(
+            f"{name:<28} {op:<20} p50 {m['p50_ms']:9.3f} мс  p95 {m['p95_ms']:9.3f} мс  "
+            f"p99 {m['p99_ms']:9.3f} мс  {m['throughput_ops']:10,.0f} оп/с  пик {m['peak_alloc_kb']:8.1f} КБ"
+        )
+
+
+def _flatten(report: Dict[str, Any]) -> Dict[Tuple[str, str], Dict[str, float]]:
+    return {
+        (group, op): metrics
+        for group, ops in report["results"].items()
+        for op, metrics in ops.items()
+        if isinstance(metrics, dict)
+    }
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Сравнение двух прогонов; код 1, если есть регрессии выше порога"""
+    with open(args.old, encoding="utf-8") as f:
+        old = _flatten(json.load(f))
+    with open(args.new, encoding="utf-8") as f:
+        new = _flatten(json.load(f))
+
+    regressions: List[str] = []
+    for key in sorted(old.keys() & new.keys()):
+        cells = []
+        for metric in METRICS:
+            before, after = old[key][metric], new[key][metric]
+            change = (after - before) / before if before else 0.0
+            cells.append(f"{metric[:3]} {before:8.3f} -> {after:8.3f} ({change:+6.1%})")
+            if change > args.threshold:
+                regressions.append(f"{key[0]} {key[1]} {metric}: {change:+.1%}")
+        print(f"{key[0]:<28} {key[1]:<20} " + "  ".join(cells))
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<28} {key[1]:<20} только в {'старом' if key in old else 'новом'} прогоне")
+
+    if regressions:
+        print(f"\nРегрессии (порог {args.threshold:.0%}):")
+        for line in regressions:
+            print(f"- {line}")
+        return 1
+    return 0
+
+
+def startup(args: argparse.Namespace) -> int:
+    """Время импорта и запуска; код 1, если импорт не укладывается в бюджет"""
+    from benchmarks.startup import import_profile, process_latency
+
+    profile = import_profile()
+    print(f"Импорт main + cli.interface: {profile['import_ms']:.1f} мс (бюджет {args.budget_ms:.0f} мс)")
+    for item in profile["heaviest"]:
+        print(f"  {item['module']:<40} {item['cumulative_ms']:8.1f} мс")
+    for name, m in process_latency(args.runs).items():
+        print(f"{name:<24} p50 {m['p50_ms']:8.1f} мс  p95 {m['p95_ms']:8.1f} мс")
+    return 1 if profile["import_ms"] > args.budget_ms else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Нагрузочные замеры ValutaTrade Hub")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="выполнить замеры и сохранить JSON")
+    run_parser.add_argument("--users", default="1k,100k", help="размеры наборов пользователей, например 1k,100k,1m")
+    run_parser.add_argument("--backends", default="json,sqlite")
+    run_parser.add_argument("--history-days", type=int, default=90)
+    run_parser.add_argument("--history-formats", default="jsonl,binary")
+    run_parser.add_argument("--iterations", type=int, default=1000, help="вызовов на операцию")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/<время>.json)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="допустимый рост задержки, доля")
+    compare_parser.set_defaults(handler=compare)
+
+    startup_parser = commands.add_parser("startup", help="время импорта (-X importtime) и запуска CLI")
+    startup_parser.add_argument("--budget-ms", type=float, default=100.0, help="бюджет времени импорта (под -X importtime), мс")
+    startup_parser.add_argument("--runs", type=int, default=10)
+    startup_parser.set_defaults(handler=startup)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
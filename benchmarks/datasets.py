@@ -0,0 +1,75 @@
+import hashlib
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from valutatrade_hub.core import utils
+
+PASSWORD = "bench-pass"
+CURRENCIES = ("USD", "EUR", "RUB", "BTC", "ETH", "SOL")
+RATES: Dict[str, float] = {
+    "EUR_USD": 1.08,
+    "RUB_USD": 0.011,
+    "BTC_USD": 60000.0,
+    "ETH_USD": 3000.0,
+    "SOL_USD": 150.0,
+}
+
+
+def username(i: int) -> str:
+    return f"user{i:07d}"
+
+
+def write_users(root: Path, count: int, seed: int = 42) -> None:
+    """Пользователи и портфели (1–4 кошелька) в формате JSON-хранилища"""
+    rng = random.Random(seed)
+    registered = datetime(2025, 1, 1).isoformat()
+    users: List[dict] = []
+    portfolios: List[dict] = []
+    for i in range(1, count + 1):
+        salt = f"salt{i}"
+        users.append({
+            "user_id": i,
+            "username": username(i),
+            "hashed_password": hashlib.sha256((PASSWORD + salt).encode()).hexdigest(),
+            "salt": salt,
+            "registration_date": registered,
+        })
+        codes = rng.sample(CURRENCIES, rng.randint(1, 4))
+        portfolios.append({
+            "user_id": i,
+            "wallets": {code: {"balance": round(rng.uniform(1, 10000), 4)} for code in codes},
+        })
+    utils.save_json_file(str(root / "data" / "users.json"), users)
+    utils.save_json_file(str(root / "data" / "portfolios.json"), portfolios)
+
+
+def write_rates(root: Path) -> None:
+    """Свежий снимок курсов"""
+    now = datetime.now().isoformat()
+    data = {pair: {"rate": rate, "updated_at": now} for pair, rate in RATES.items()}
+    data["last_refresh"] = now
+    data["version"] = 1
+    utils.save_json_file(str(root / "data" / "rates.json"), data)
+
+
+def write_history(storage, days: int, step_minutes: int = 5, seed: int = 42) -> int:
+    """История курсов за days дней с шагом step_minutes (один пакет на модельный день)"""
+    rng = random.Random(seed)
+    rates = dict(RATES)
+    moment = datetime.now() - timedelta(days=days)
+    step = timedelta(minutes=step_minutes)
+    written = 0
+    while moment < datetime.now():
+        batch = storage.begin_batch()
+        day_end = moment + timedelta(days=1)
+        while moment < day_end and moment < datetime.now():
+            timestamp = moment.isoformat()
+            for pair in rates:
+                rates[pair] *= 1 + rng.gauss(0, 0.001)
+                batch.add(pair, rates[pair], "Bench", timestamp)
+            moment += step
+        storage.commit_batch(batch)
+        written += len(batch.records)
+    return written
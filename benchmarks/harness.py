@@ -0,0 +1,97 @@
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль (q в долях) по отсортированной выборке, с интерполяцией"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(fn: Callable[[int], Any], iterations: int, warmup: int = 0, memory_sample: int = 50) -> Dict[str, Any]:
+    """Замер операции: задержки по вызовам, пропускная способность и пик памяти
+
+    fn получает номер итерации. Пик памяти (tracemalloc) снимается отдельным
+    коротким прогоном, чтобы трассировка не искажала замер задержек.
+    """
+    for i in range(warmup):
+        fn(-1 - i)
+
+    gc.collect()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(min(memory_sample, iterations)):
+            fn(iterations + i)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    to_ms = 1e-6
+    return {
+        "iterations": iterations,
+        "p50_ms": percentile(latencies, 0.50) * to_ms,
+        "p95_ms": percentile(latencies, 0.95) * to_ms,
+        "p99_ms": percentile(latencies, 0.99) * to_ms,
+        "max_ms": latencies[-1] * to_ms if latencies else 0.0,
+        "throughput_ops": iterations / elapsed if elapsed > 0 else 0.0,
+        "peak_alloc_kb": max(peak, 0) / 1024,
+    }
+
+
+def reset_singletons() -> None:
+    """Сброс синглтонов приложения между сценариями (новая рабочая папка — новый конфиг)"""
+    from valutatrade_hub.infra.database import DatabaseManager
+    from valutatrade_hub.infra.settings import SettingsLoader
+
+    if DatabaseManager._instance is not None and hasattr(DatabaseManager._instance, "_initialized"):
+        DatabaseManager._instance.close()
+    DatabaseManager._instance = None
+    SettingsLoader._instance = None
+    SettingsLoader._initialized = False
+
+
+@contextmanager
+def workspace(settings: Dict[str, Any]) -> Iterator[Path]:
+    """Временная рабочая папка со своим config.json и каталогом data"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="vt-bench-") as directory:
+        root = Path(directory)
+        (root / "data").mkdir()
+        config = {
+            "users_file": "data/users.json",
+            "portfolios_file": "data/portfolios.json",
+            "rates_file": "data/rates.json",
+            "rates_ttl_seconds": 10 ** 9,
+            "default_base_currency": "USD",
+            "log_file": "logs/actions.log",
+        }
+        config.update(settings)
+        with open(root / "config.json", "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        os.chdir(root)
+        try:
+            yield root
+        finally:
+            reset_singletons()
+            os.chdir(previous)
@@ -0,0 +1,84 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import percentile, workspace
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(top: int = 10) -> Dict[str, Any]:
+    """Время импорта main по python -X importtime: итог и самые дорогие модули проекта"""
+    env = dict(os.environ, PYTHONPATH=str(MAIN.parent))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main; import valutatrade_hub.cli.interface"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3))))
+    # Отступ 1 — модули верхнего уровня, 3 — импортированные ими напрямую
+    total_us = sum(
+        cumulative for name, _, cumulative, depth in modules
+        if depth == 1 and name in ("main", "valutatrade_hub.cli.interface")
+    )
+    heaviest = sorted((m for m in modules if m[3] == 3), key=lambda m: -m[2])[:top]
+    return {
+        "import_ms": total_us / 1000,
+        "heaviest": [{"module": name, "cumulative_ms": cumulative / 1000} for name, _, cumulative, _ in heaviest],
+    }
+
+
+def _run(args: List[str], stdin: str, env: Dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, str(MAIN)] + args, input=stdin, capture_output=True, text=True, env=env, check=False)
+    return (time.perf_counter() - started) * 1000
+
+
+def _first_prompt(env: Dict[str, str]) -> float:
+    """Время от запуска процесса до появления приглашения '> '"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", str(MAIN)], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, env=env,
+    )
+    output = b""
+    while not output.endswith(b"> "):
+        chunk = os.read(proc.stdout.fileno(), 4096)
+        if not chunk:
+            break
+        output += chunk
+    elapsed = (time.perf_counter() - started) * 1000
+    proc.communicate(b"exit\n")
+    return elapsed
+
+
+def _python_baseline(env: Dict[str, str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def process_latency(runs: int = 10) -> Dict[str, Any]:
+    """Время до первого приглашения CLI, полный цикл запуска и пакет из одной команды"""
+    env = dict(os.environ, PYTHONPATH=str(MAIN.parent), VALUTATRADE_RATES_SOURCE="random")
+    scenarios: Dict[str, Callable[[Dict[str, str]], float]] = {
+        # Чистый запуск интерпретатора — нижняя граница
+        "python_baseline": _python_baseline,
+        "cli_first_prompt": _first_prompt,
+        "cli_exit": lambda e: _run([], "exit\n", e),
+        "one_shot_show_rates": lambda e: _run(["--batch", "-"], "show-rates\n", e),
+    }
+    results: Dict[str, Any] = {}
+    with workspace({}):
+        for name, scenario in scenarios.items():
+            samples = sorted(scenario(env) for _ in range(runs))
+            results[name] = {"p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95)}
+    return results
@@ -0,0 +1,119 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+from benchmarks import datasets
+from benchmarks.harness import measure, workspace
+
+
+def _scaled(iterations: int, users: int, heavy: bool) -> int:
+    """Для операций, зависящих от объёма данных, число повторов уменьшается с его ростом"""
+    if not heavy:
+        return iterations
+    return max(3, min(iterations, 200_000 // max(users, 1)))
+
+
+def bench_usecases(users: int, backend: str, iterations: int, seed: int = 42) -> Dict[str, Any]:
+    """Операции UseCases на наборе из users пользователей и хранилище backend"""
+    results: Dict[str, Any] = {}
+    with workspace({"storage_backend": backend}) as root:
+        datasets.write_users(root, users, seed)
+        datasets.write_rates(root)
+
+        from valutatrade_hub.core.usecases import UseCases
+        from valutatrade_hub.infra.database import DatabaseManager
+
+        usecases = UseCases()
+        db = DatabaseManager()
+        rng = random.Random(seed)
+        codes = ("EUR", "BTC", "ETH", "SOL", "RUB")
+
+        def login(i: int) -> None:
+            usecases.login_user(datasets.username(rng.randint(1, users)), datasets.PASSWORD)
+
+        def login_holder() -> None:
+            # Продажи и просмотр портфеля измеряются от имени одного пользователя
+            # с кошельками во всех валютах, а не последнего случайного входа
+            usecases.login_user(datasets.username(1), datasets.PASSWORD)
+            for code in codes:
+                usecases.buy_currency(code, 10 ** 6)
+
+        def register(i: int) -> None:
+            usecases.register_user(f"new{i + 10 ** 8}", datasets.PASSWORD)
+
+        def buy(i: int) -> None:
+            usecases.buy_currency(rng.choice(codes), 1.0)
+
+        def sell(i: int) -> None:
+            usecases.sell_currency(rng.choice(codes), 0.5)
+
+        def show_portfolio(i: int) -> None:
+            usecases.show_portfolio("USD")
+
+        def get_rate(i: int) -> None:
+            usecases.get_exchange_rate(rng.choice(codes), "USD")
+
+        def leaderboard(i: int) -> None:
+            usecases.show_leaderboard("USD", 10)
+
+        operations: Dict[str, Callable[[int], None]] = {
+            "buy_currency": buy,
+            "sell_currency": sell,
+            "show_portfolio": show_portfolio,
+            "get_exchange_rate": get_rate,
+        }
+        results["login_user"] = measure(login, iterations, warmup=min(10, iterations))
+        login_holder()
+        for name, fn in operations.items():
+            results[name] = measure(fn, iterations, warmup=min(10, iterations))
+        # В JSON-хранилище регистрация переписывает users.json целиком
+        heavy_register = backend == "json"
+        results["register_user"] = measure(register, _scaled(iterations, users, heavy_register), memory_sample=3)
+        results["show_leaderboard"] = measure(leaderboard, _scaled(iterations, users, heavy=True), memory_sample=1)
+        db.commit()
+    return results
+
+
+def bench_history(days: int, history_format: str, iterations: int, seed: int = 42) -> Dict[str, Any]:
+    """Запись и чтение истории курсов за days дней"""
+    results: Dict[str, Any] = {}
+    with workspace({}) as root:
+        from valutatrade_hub.parser_service.config import ParserConfig
+        from valutatrade_hub.parser_service.history_query import RateHistory
+        from valutatrade_hub.parser_service.storage import RatesStorage
+
+        datasets.write_rates(root)
+        storage = RatesStorage(ParserConfig(HISTORY_FORMAT=history_format))
+        records = datasets.write_history(storage, days, seed=seed)
+        results["records"] = records
+        rng = random.Random(seed)
+        pairs = list(datasets.RATES)
+        now = datetime.now()
+
+        def append_to_history(i: int) -> None:
+            storage.append_to_history(rng.choice(pairs), 1.0 + i, "Bench")
+
+        def commit_batch(i: int) -> None:
+            batch = storage.begin_batch()
+            timestamp = datetime.now().isoformat()
+            for pair in pairs:
+                batch.add(pair, 1.0 + i, "Bench", timestamp)
+            storage.commit_batch(batch)
+
+        history = RateHistory(storage)
+
+        def rate_at(i: int) -> None:
+            history.rate_at(rng.choice(pairs), now - timedelta(minutes=rng.randint(0, days * 1440)))
+
+        def candles_1h(i: int) -> None:
+            start = now - timedelta(days=rng.randint(1, days))
+            history.candles(rng.choice(pairs), 3600, start, start + timedelta(days=1))
+
+        # Запросы выполняются до записей, чтобы индекс не перестраивался на каждом вызове
+        results["rate_at"] = measure(rate_at, iterations, warmup=1)
+        results["candles_1h_day"] = measure(candles_1h, iterations, warmup=1)
+        results["append_to_history"] = measure(append_to_history, iterations)
+        results["commit_batch"] = measure(commit_batch, iterations)
+        if hasattr(storage.history, "close"):
+            storage.history.close()
+    return results
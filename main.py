@@ -1,15 +1,125 @@
 #!/usr/bin/env python3
-from valutatrade_hub.cli.interface import run_cli
-from valutatrade_hub.logging_config import setup_logging
-from valutatrade_hub.parser_service.scheduler import RatesScheduler
+import logging
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Optional
+
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.logging_config import setup_logging, shutdown_logging
+from valutatrade_hub.metrics import PrometheusFileExporter
+
+if TYPE_CHECKING:
+    import argparse
+
+# Тяжёлые модули (requests, хранилище, бизнес-логика) импортируются по мере
+# надобности, чтобы приглашение CLI появлялось сразу после запуска
+
+
+def parse_cli_args() -> "argparse.Namespace":
+    if len(sys.argv) == 1:
+        # Интерактивный запуск без аргументов: argparse не импортируется
+        return SimpleNamespace(batch=None, commit_every=500, verbose=False)
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="project",
+        description="Платформа симуляции торговли валютами",
+        epilog="Однократная команда: project <команда> [--аргумент значение ...], например project buy --currency BTC --amount 0.1",
+    )
+    parser.add_argument("--batch", metavar="FILE", help="выполнить команды из файла ('-' — из stdin) и выйти")
+    parser.add_argument("--commit-every", type=int, default=500, help="размер группы записей в пакетном режиме")
+    parser.add_argument("--verbose", action="store_true", help="выводить результат каждой команды пакета")
+    return parser.parse_args()
+
+
+def start_metrics_exporter() -> PrometheusFileExporter:
+    """Периодическая запись метрик действий в текстовом формате Prometheus"""
+    settings = SettingsLoader()
+    exporter = PrometheusFileExporter(
+        Path(settings.get("metrics_file", "data/metrics.prom")),
+        float(settings.get("metrics_interval", 15)),
+    )
+    exporter.start()
+    return exporter
+
+
+class BackgroundScheduler:
+    """Создание и запуск планировщика курсов в фоновом потоке"""
+
+    def __init__(self) -> None:
+        self.scheduler = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._start, name="scheduler-init", daemon=True)
+
+    def _start(self) -> None:
+        from valutatrade_hub.cli.interface import attach_scheduler
+        try:
+            from valutatrade_hub.parser_service.scheduler import RatesScheduler
+            scheduler = RatesScheduler()
+        except Exception as e:
+            logging.getLogger("valutatrade").error(f"Планировщик не запущен: {e}")
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            scheduler.start()
+            self.scheduler = scheduler
+        attach_scheduler(scheduler)
+
+    def start(self) -> "BackgroundScheduler":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._thread.join(timeout)
+        with self._lock:
+            self._stopped = True
+            if self.scheduler is not None:
+                self.scheduler.stop()
+
+
+def close_database(compact: bool = True) -> None:
+    """Закрытие хранилища, если оно было открыто"""
+    from valutatrade_hub.infra.database import DatabaseManager
+    if DatabaseManager._instance is not None:
+        DatabaseManager().close(compact=compact)
 
-scheduler = RatesScheduler(interval_seconds=120)
 
 def main() -> None:
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
+        # Однократная команда (project buy --currency BTC --amount 0.1): без планировщика и метрик
+        setup_logging()
+        from valutatrade_hub.cli.oneshot import run_once
+        code = run_once(sys.argv[1:])
+        # Журнал сворачивает долгоживущий процесс (REPL, API-сервер) или следующий запуск:
+        # однократная команда лишь дописывает в него свои записи
+        close_database(compact=False)
+        shutdown_logging()
+        sys.exit(code)
+
+    args = parse_cli_args()
     setup_logging()
-    scheduler.start()
-    run_cli()
+
+    if args.batch:
+        from valutatrade_hub.cli.batch import run_batch
+        code = run_batch(args.batch, commit_every=max(1, args.commit_every), verbose=args.verbose)
+        close_database()
+        shutdown_logging()
+        sys.exit(code)
+
+    from valutatrade_hub.cli.interface import run_cli
+
+    # Планировщик создаётся и делает первое обновление в фоне: CLI сразу работает на сохранённых курсах
+    scheduler = BackgroundScheduler()
+    exporter = start_metrics_exporter()
+    run_cli(on_start=scheduler.start)
     scheduler.stop()
+    exporter.stop()
+    close_database()
+    shutdown_logging()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
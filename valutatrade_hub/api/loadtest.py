@@ -0,0 +1,245 @@
+"""Нагрузочный тест HTTP API на localhost
+
+python -m valutatrade_hub.api.loadtest [--port 8080] [--connections 32] [--duration 10]
+python -m valutatrade_hub.api.loadtest --spawn      (запустить сервер в отдельном процессе
+                                                    во временном каталоге данных)
+
+Каждое соединение регистрирует своего пользователя, входит и в цикле
+выполняет смесь запросов buy/sell/portfolio/rates/rate по keep-alive.
+Регистрации идут одновременно, поэтому после прогона проверяется, что
+все пользователи получили разные user_id.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# (доля, метод, путь, тело) — тело может ссылаться на случайную валюту
+SCENARIO: Tuple[Tuple[float, str, str, Optional[Dict[str, Any]]], ...] = (
+    (0.35, "POST", "/buy", {"currency": None, "amount": 0.01}),
+    (0.15, "POST", "/sell", {"currency": None, "amount": 0.005}),
+    (0.25, "GET", "/portfolio?base=USD", None),
+    (0.15, "GET", "/rates?top=3", None),
+    (0.10, "GET", "/rate?from=BTC&to=USD", None),
+)
+CURRENCIES = ("BTC", "ETH", "EUR")
+
+
+class _Connection:
+    """Клиентское keep-alive соединение"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.session: Optional[str] = None
+
+    async def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        data = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if self.session:
+            head += f"Authorization: Bearer {self.session}\r\n"
+        self.writer.write((head + "\r\n").encode("latin-1") + data)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Сервер закрыл соединение")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else {}
+        return status, payload
+
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+async def _client(
+    index: int, host: str, port: int, deadline: float, run_id: str,
+    latencies: List[float], statuses: Counter, user_ids: List[int], rng: random.Random,
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    conn = _Connection(reader, writer, f"{host}:{port}")
+    try:
+        credentials = {"username": f"load-{run_id}-{index}", "password": "loadtest"}
+        await conn.request("POST", "/register", credentials)
+        status, payload = await conn.request("POST", "/login", credentials)
+        if status != 200:
+            raise RuntimeError(f"Вход не выполнен: {payload.get('error')}")
+        conn.session = payload["session"]
+        user_ids.append(payload["user_id"])
+
+        weights = [share for share, *_ in SCENARIO]
+        while time.perf_counter() < deadline:
+            _, method, path, body = rng.choices(SCENARIO, weights)[0]
+            if body is not None and body.get("currency", "") is None:
+                body = dict(body, currency=rng.choice(CURRENCIES))
+            started = time.perf_counter()
+            status, _ = await conn.request(method, path, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, connections: int, duration: float, seed: int = 42) -> Dict[str, Any]:
+    """Нагрузка в течение duration секунд; возвращает сводку"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    user_ids: List[int] = []
+    run_id = f"{int(time.time())}-{os.getpid()}"
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    deadline = started + duration
+    results = await asyncio.gather(
+        *(_client(i, host, port, deadline, run_id, latencies, statuses, user_ids, random.Random(rng.random()))
+          for i in range(connections)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    failures = [r for r in results if isinstance(r, BaseException)]
+    latencies.sort()
+    return {
+        "connections": connections,
+        "duration_s": elapsed,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "statuses": dict(sorted(statuses.items())),
+        "failed_connections": len(failures),
+        "duplicate_user_ids": len(user_ids) - len(set(user_ids)),
+        "first_failure": repr(failures[0]) if failures else None,
+    }
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+# Параметры config.json с путями к файлам данных: во временном каталоге — значения по умолчанию
+_DATA_FILES = {
+    "users_file": "data/users.json",
+    "portfolios_file": "data/portfolios.json",
+    "rates_file": "data/rates.json",
+    "log_file": "logs/actions.log",
+    "sqlite_file": "data/valutatrade.db",
+    "journal_file": "data/portfolios.journal",
+    "orders_file": "data/orders.jsonl",
+    "session_file": "data/session.token",
+    "session_key_file": "data/session.key",
+}
+
+
+def _prepare_workspace(workdir: Path) -> None:
+    """Временный каталог для сервера: config.json с путями внутри него и копия текущих курсов
+
+    Пользователи load-*, их портфели и журналы не попадают в рабочие данные.
+    """
+    config: Dict[str, Any] = {}
+    if Path("config.json").exists():
+        config = json.loads(Path("config.json").read_text(encoding="utf-8"))
+    rates_file = Path(config.get("rates_file", _DATA_FILES["rates_file"]))
+    config.update(_DATA_FILES)
+    (workdir / "data").mkdir()
+    if rates_file.exists():
+        shutil.copy(rates_file, workdir / _DATA_FILES["rates_file"])
+    (workdir / "config.json").write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _spawn_server(host: str, port: int, workdir: Path, timeout: float = 10.0) -> subprocess.Popen:
+    """Запуск сервера в отдельном процессе в каталоге workdir и ожидание готовности порта"""
+    env = dict(os.environ)
+    package_root = str(Path(__file__).resolve().parents[2])
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "valutatrade_hub.api.server", "--host", host, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        cwd=workdir,
+        env=env,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {proc.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("Сервер не запустился")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP API ValutaTrade Hub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=32, help="одновременных keep-alive соединений")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность, с")
+    parser.add_argument(
+        "--spawn", action="store_true",
+        help="запустить сервер в отдельном процессе на свободном порту с временным каталогом данных",
+    )
+    parser.add_argument("--json", action="store_true", help="вывести сводку в JSON")
+    args = parser.parse_args()
+
+    proc = None
+    workdir = None
+    try:
+        if args.spawn:
+            workdir = Path(tempfile.mkdtemp(prefix="valutatrade-loadtest-"))
+            _prepare_workspace(workdir)
+            args.port = _free_port(args.host)
+            proc = _spawn_server(args.host, args.port, workdir)
+        report = asyncio.run(run_load(args.host, args.port, args.connections, args.duration))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(
+            f"Соединений: {report['connections']}, запросов: {report['requests']} за {report['duration_s']:.1f} с "
+            f"— {report['rps']:,.0f} запросов/с"
+        )
+        print(
+            f"Задержка: p50 {report['p50_ms']:.2f} мс, p95 {report['p95_ms']:.2f} мс, "
+            f"p99 {report['p99_ms']:.2f} мс, макс {report['max_ms']:.2f} мс"
+        )
+        print("Статусы: " + ", ".join(f"{code}: {n}" for code, n in report["statuses"].items()))
+        if report["failed_connections"]:
+            print(f"Соединений с ошибкой: {report['failed_connections']} ({report['first_failure']})")
+        if report["duplicate_user_ids"]:
+            print(f"Пользователей с повторяющимся user_id: {report['duplicate_user_ids']}")
+    sys.exit(1 if report["failed_connections"] or report["duplicate_user_ids"] else 0)
+
+
+if __name__ == "__main__":
+    main()
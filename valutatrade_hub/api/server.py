@@ -0,0 +1,334 @@
+"""HTTP/JSON API поверх UseCases на asyncio
+
+Запуск: python -m valutatrade_hub.api.server [--host 127.0.0.1] [--port 8080]
+
+POST /register  {"username": ..., "password": ...}
+POST /login     {"username": ..., "password": ...} -> {"session": ...}
+POST /logout
+POST /buy       {"currency": "BTC", "amount": 0.1}
+POST /sell      {"currency": "BTC", "amount": 0.1}
+GET  /portfolio?base=USD
+POST /orders    {"side": "buy", "type": "limit", "currency": "BTC", "amount": 0.1, "price": 50000}
+GET  /orders
+POST /orders/cancel {"id": 1}
+GET  /rates?currency=BTC | /rates?top=3
+GET  /rate?from=BTC&to=USD
+
+Операции пользователя требуют заголовка Authorization: Bearer <session>.
+Ответ — {"ok": true, "message": ...} или {"ok": false, "error": ..., "type": ...}.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from valutatrade_hub.core.currencies import CurrencyNotFoundError
+from valutatrade_hub.core.exceptions import ApiRequestError, InsufficientFundsError, UserError
+from valutatrade_hub.core.session import Session
+from valutatrade_hub.core.usecases import UseCases
+from valutatrade_hub.infra.settings import SettingsLoader
+
+logger = logging.getLogger("valutatrade")
+
+# Максимальный размер тела запроса, байт
+MAX_BODY = 64 * 1024
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+Handler = Callable[[Dict[str, Any], Optional[Session]], Dict[str, Any]]
+
+
+class HttpError(Exception):
+    """Ошибка запроса с HTTP-статусом"""
+    def __init__(self, status: int, message: str) -> None:
+        self.status = status
+        super().__init__(message)
+
+
+def _require(params: Dict[str, Any], *names: str) -> Tuple[Any, ...]:
+    missing = [name for name in names if params.get(name) in (None, "")]
+    if missing:
+        raise UserError("Требуются параметры: " + ", ".join(missing))
+    return tuple(params[name] for name in names)
+
+
+def _amount(value: Any) -> float:
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise UserError("'amount' должен быть числом")
+    if amount <= 0:
+        raise UserError("'amount' должен быть положительным числом")
+    return amount
+
+
+class ApiServer:
+    """HTTP/1.1 сервер с keep-alive; вызовы UseCases выполняются в пуле потоков
+
+    Цикл событий только разбирает запросы и пишет ответы, а работа с
+    хранилищем (блокирующая) уходит в executor, поэтому медленный запрос
+    одного клиента не задерживает остальных.
+    """
+
+    def __init__(
+        self,
+        usecases: Optional[UseCases] = None,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        workers: Optional[int] = None,
+        keepalive_timeout: float = 15.0,
+    ) -> None:
+        self.usecases = usecases or UseCases()
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="api")
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes: Dict[Tuple[str, str], Tuple[Handler, bool]] = {
+            # (метод, путь): (обработчик, нужна ли сессия)
+            ("POST", "/register"): (self._register, False),
+            ("POST", "/login"): (self._login, False),
+            ("POST", "/logout"): (self._logout, True),
+            ("POST", "/buy"): (self._buy, True),
+            ("POST", "/sell"): (self._sell, True),
+            ("GET", "/portfolio"): (self._portfolio, True),
+            ("POST", "/orders"): (self._place_order, True),
+            ("GET", "/orders"): (self._orders, True),
+            ("POST", "/orders/cancel"): (self._cancel_order, True),
+            ("GET", "/rates"): (self._rates, False),
+            ("GET", "/rate"): (self._rate, False),
+        }
+
+    # Обработчики (выполняются в пуле потоков)
+
+    def _register(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        username, password = _require(params, "username", "password")
+        return {"message": self.usecases.register_user(str(username), str(password))}
+
+    def _login(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        username, password = _require(params, "username", "password")
+        new_session = self.usecases.login(str(username), str(password))
+        return {
+            "message": f"Вы вошли как '{new_session.username}'",
+            "session": new_session.session_id,
+            "user_id": new_session.user_id,
+            "expires_in": self.usecases.sessions.ttl_seconds,
+        }
+
+    def _logout(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        self.usecases.logout(session)
+        return {"message": "Вы вышли из системы"}
+
+    def _buy(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        currency, amount = _require(params, "currency", "amount")
+        return {"message": self.usecases.buy_currency(str(currency).upper(), _amount(amount), session=session)}
+
+    def _sell(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        currency, amount = _require(params, "currency", "amount")
+        return {"message": self.usecases.sell_currency(str(currency).upper(), _amount(amount), session=session)}
+
+    def _portfolio(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        return {"message": self.usecases.show_portfolio(params.get("base", "USD"), session=session)}
+
+    def _place_order(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        side, kind, currency, amount, price = _require(params, "side", "type", "currency", "amount", "price")
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            raise UserError("'price' должен быть числом")
+        return {"message": self.usecases.place_order(
+            side=str(side), kind=str(kind), currency=str(currency), amount=_amount(amount), price=price,
+            quote=str(params.get("quote", "USD")), session=session,
+        )}
+
+    def _orders(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        return {"message": self.usecases.show_orders(session=session)}
+
+    def _cancel_order(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        (order_id,) = _require(params, "id")
+        try:
+            order_id = int(order_id)
+        except (TypeError, ValueError):
+            raise UserError("'id' должен быть номером ордера")
+        return {"message": self.usecases.cancel_order(order_id, session=session)}
+
+    def _rates(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        top = params.get("top")
+        try:
+            top_n = int(top) if top else None
+        except ValueError:
+            raise UserError("'top' должен быть натуральным числом")
+        return {"message": self.usecases.show_rates(currency=params.get("currency"), top_n=top_n)}
+
+    def _rate(self, params: Dict[str, Any], session: Optional[Session]) -> Dict[str, Any]:
+        from_curr, to_curr = _require(params, "from", "to")
+        return {"message": self.usecases.get_exchange_rate(str(from_curr), str(to_curr))}
+
+    # Протокол
+
+    def _authenticate(self, headers: Dict[str, str]) -> Session:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            raise HttpError(401, "Требуется заголовок Authorization: Bearer <session>")
+        try:
+            return self.usecases.sessions.get(token.strip())
+        except UserError as e:
+            raise HttpError(401, str(e))
+
+    def _call(self, handler: Handler, params: Dict[str, Any], session: Optional[Session]) -> Tuple[int, Dict[str, Any]]:
+        """Вызов обработчика и перевод исключений в HTTP-статусы"""
+        try:
+            payload = handler(params, session)
+            payload["ok"] = True
+            return 200, payload
+        except CurrencyNotFoundError as e:
+            return 404, {"ok": False, "error": str(e), "type": type(e).__name__}
+        except InsufficientFundsError as e:
+            return 409, {"ok": False, "error": str(e), "type": type(e).__name__}
+        except ApiRequestError as e:
+            return 503, {"ok": False, "error": str(e), "type": type(e).__name__}
+        except UserError as e:
+            return 400, {"ok": False, "error": str(e), "type": type(e).__name__}
+        except Exception as e:
+            logger.error(f"API: внутренняя ошибка: {e}")
+            return 500, {"ok": False, "error": "Внутренняя ошибка сервера", "type": type(e).__name__}
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        url = urlsplit(target)
+        route = self._routes.get((method, url.path))
+        if route is None:
+            if any(path == url.path for _, path in self._routes):
+                return 405, {"ok": False, "error": f"Метод {method} не поддерживается", "type": "HttpError"}
+            return 404, {"ok": False, "error": f"Неизвестный адрес {url.path}", "type": "HttpError"}
+        handler, needs_session = route
+
+        params: Dict[str, Any] = dict(parse_qsl(url.query))
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return 400, {"ok": False, "error": "Тело запроса должно быть JSON-объектом", "type": "HttpError"}
+            if not isinstance(data, dict):
+                return 400, {"ok": False, "error": "Тело запроса должно быть JSON-объектом", "type": "HttpError"}
+            params.update(data)
+
+        session = None
+        if needs_session:
+            try:
+                session = self._authenticate(headers)
+            except HttpError as e:
+                return e.status, {"ok": False, "error": str(e), "type": "HttpError"}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, handler, params, session)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка запросов одного соединения, пока клиент держит keep-alive"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"ok": False, "error": "Слишком большой запрос", "type": "HttpError"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._dispatch(method, target, headers, body)
+
+                self.requests += 1
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Обрыв соединения или некорректный запрос: соединение закрывается
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+
+def main() -> None:
+    from valutatrade_hub.infra.database import DatabaseManager
+    from valutatrade_hub.logging_config import setup_logging, shutdown_logging
+
+    settings = SettingsLoader()
+    parser = argparse.ArgumentParser(description="HTTP/JSON API ValutaTrade Hub")
+    parser.add_argument("--host", default=settings.get("api_host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(settings.get("api_port", 8080)))
+    parser.add_argument("--workers", type=int, default=settings.get("api_workers"), help="потоков для вызовов UseCases")
+    args = parser.parse_args()
+
+    setup_logging()
+    server = ApiServer(host=args.host, port=args.port, workers=args.workers)
+
+    async def run() -> None:
+        # SIGTERM завершает сервер так же, как Ctrl+C: с закрытием хранилища и журнала
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+        await server.start()
+        print(f"API: http://{server.host}:{server.port}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        DatabaseManager().close()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import sys
+import time
+from collections import Counter
+from typing import IO, List, Optional, Tuple
+
+from valutatrade_hub.cli.interface import execute_command, format_error, parse_args
+from valutatrade_hub.infra.database import DatabaseManager
+
+
+def _read_commands(stream: IO[str]) -> Tuple[List[Tuple[int, dict]], List[Tuple[int, str]]]:
+    """Разбор всех команд заранее: (номер строки, команда) и ошибки разбора"""
+    commands: List[Tuple[int, dict]] = []
+    errors: List[Tuple[int, str]] = []
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            commands.append((line_no, parse_args(line)))
+        except Exception as e:
+            errors.append((line_no, format_error(e)))
+    return commands, errors
+
+
+def run_batch(path: str, commit_every: int = 500, verbose: bool = False, out: Optional[IO[str]] = None) -> int:
+    """Пакетное выполнение команд из файла (или stdin при path == '-')
+
+    Все команды разбираются заранее и выполняются над одним загруженным
+    состоянием; записи фиксируются группами по commit_every команд.
+    Возвращает код завершения: 0 — без ошибок, 1 — были ошибки.
+    """
+    out = out or sys.stdout
+    if path == "-":
+        commands, parse_errors = _read_commands(sys.stdin)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            commands, parse_errors = _read_commands(f)
+
+    for line_no, message in parse_errors:
+        print(f"[строка {line_no}] {message}", file=out)
+
+    db = DatabaseManager()
+    error_types: Counter = Counter()
+    executed = 0
+    started = time.perf_counter()
+    db.begin()
+    try:
+        for line_no, parsed in commands:
+            if parsed["command"] == "exit":
+                break
+            executed += 1
+            try:
+                message = execute_command(parsed)
+                if verbose:
+                    print(message, file=out)
+            except Exception as e:
+                error_types[type(e).__name__] += 1
+                print(f"[строка {line_no}] {format_error(e)}", file=out)
+            if executed % commit_every == 0:
+                db.commit()
+                db.begin()
+    finally:
+        db.commit()
+    elapsed = time.perf_counter() - started
+
+    failed = sum(error_types.values())
+    throughput = executed / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Выполнено команд: {executed} (успешно: {executed - failed}, с ошибкой: {failed}, "
+        f"не разобрано: {len(parse_errors)}) за {elapsed:.2f} с — {throughput:,.0f} команд/с",
+        file=out,
+    )
+    for error_type, count in error_types.most_common():
+        print(f"- {error_type}: {count}", file=out)
+    return 1 if failed or parse_errors else 0
@@ -1,31 +1,62 @@
 import shlex
+import threading
 from datetime import datetime
+from typing import List
 
-from valutatrade_hub.core.usecases import UseCases
 from valutatrade_hub.core.exceptions import InsufficientFundsError, CurrencyNotFoundError, ApiRequestError, UserError
-from valutatrade_hub.parser_service.updater import RatesUpdater
-from valutatrade_hub.parser_service.config import ParserConfig
 
-# Глобальный экземпляр бизнес-логики
-_usecases = UseCases()
+# Экземпляр бизнес-логики создаётся при первой команде (см. get_usecases)
+_usecases = None
+_usecases_lock = threading.Lock()
 
+# Фоновый планировщик обновления курсов (задаётся в run_cli)
+_scheduler = None
 
-def print_help_message() -> None:
-    """Печать справки по командам"""
+
+def get_usecases():
+    """Отложенное создание UseCases: хранилище открывается при первой команде, а не при импорте"""
+    global _usecases
+    if _usecases is None:
+        # Первым может обратиться и поток планировщика (исполнение ордеров)
+        with _usecases_lock:
+            if _usecases is None:
+                from valutatrade_hub.core.usecases import UseCases
+                _usecases = UseCases()
+    return _usecases
+
+
+def attach_scheduler(scheduler) -> None:
+    """Подключение планировщика, созданного в фоне после старта CLI"""
+    global _scheduler
+    _scheduler = scheduler
+    # UseCases подписывается на новые снимки курсов (исполнение ордеров) при создании
+    get_usecases()
+
+
+def help_message() -> str:
+    """Текст справки по командам"""
     help_text = """Доступные команды:
 
 help
 register --username <имя> --password <пароль>
 login --username <имя> --password <пароль>
+logout
 show-portfolio --base <валюта>
 buy --currency <валюта> --amount <количество>
 sell --currency <валюта> --amount <количество>
+order --side <buy|sell> --type <limit|stop> --currency <валюта> --amount <количество> --price <цена> [--quote <валюта>]
+orders
+cancel-order --id <номер>
 get-rate --from <валюта> --to <валюта>
 update-rates --source <источник>
 show-rates --currency <валюта> --top <количество>
+leaderboard --base <валюта> --top <количество>
+history --from <валюта> --to <валюта> [--at <дата>] [--start <дата>] [--end <дата>] [--interval <1h>]
+scheduler-status
+stats
 exit
 """
-    print(help_text.strip())
+    return help_text.strip()
 
 
 def parse_args(raw_input: str) -> dict:
@@ -34,7 +65,11 @@ def parse_args(raw_input: str) -> dict:
         parts = shlex.split(raw_input)
     except ValueError as e:
         raise UserError(f"Ошибка парсинга команды: {e}")
+    return parse_argv(parts)
+
 
+def parse_argv(parts: List[str]) -> dict:
+    """Разбор уже разделённых аргументов (строка REPL или sys.argv)"""
     if not parts:
         raise UserError("Пустая команда")
 
@@ -53,10 +88,223 @@ def parse_args(raw_input: str) -> dict:
     return {"command": command, "args": args}
 
 
-def run_cli() -> None:
-    """Запуск основного цикла командной строки"""
-    print_help_message()
+def execute_command(parsed: dict) -> str:
+    """Выполнение разобранной команды; возвращает текст для вывода"""
+    command = parsed["command"]
+    args = parsed["args"]
+
+    if command == "help":
+        return help_message()
+
+    elif command == "register":
+        username = args.get("username")
+        password = args.get("password")
+        if not username or not password:
+            raise UserError("Требуются аргументы --username и --password")
+        return get_usecases().register_user(username, password)
+
+    elif command == "login":
+        username = args.get("username")
+        password = args.get("password")
+        if not username or not password:
+            raise UserError("Требуются аргументы --username и --password")
+        return get_usecases().login_user(username, password)
+
+    elif command == "logout":
+        get_usecases().logout()
+        return "Вы вышли из системы"
+
+    elif command == "show-portfolio":
+        base = args.get("base", "USD")
+        return get_usecases().show_portfolio(base)
+
+    elif command == "buy":
+        currency = args.get("currency")
+        amount_str = args.get("amount")
+        if not currency or not amount_str:
+            raise UserError("Требуются --currency и --amount")
+        try:
+            amount = float(amount_str)
+        except ValueError:
+            raise UserError("'amount' должен быть числом")
+        if amount <= 0:
+            raise UserError("'amount' должен быть положительным числом")
+        return get_usecases().buy_currency(currency, amount)
+
+    elif command == "sell":
+        currency = args.get("currency")
+        amount_str = args.get("amount")
+        if not currency or not amount_str:
+            raise UserError("Требуются --currency и --amount")
+        try:
+            amount = float(amount_str)
+        except ValueError:
+            raise UserError("'amount' должен быть числом")
+        if amount <= 0:
+            raise UserError("'amount' должен быть положительным числом")
+        return get_usecases().sell_currency(currency, amount)
+
+    elif command == "order":
+        side = args.get("side")
+        kind = args.get("type")
+        currency = args.get("currency")
+        amount_str = args.get("amount")
+        price_str = args.get("price")
+        if not side or not kind or not currency or not amount_str or not price_str:
+            raise UserError("Требуются --side, --type, --currency, --amount и --price")
+        try:
+            amount = float(amount_str)
+            price = float(price_str)
+        except ValueError:
+            raise UserError("'amount' и 'price' должны быть числами")
+        return get_usecases().place_order(
+            side=side, kind=kind, currency=currency, amount=amount, price=price, quote=args.get("quote", "USD")
+        )
+
+    elif command == "orders":
+        return get_usecases().show_orders()
+
+    elif command == "cancel-order":
+        order_id = args.get("id")
+        if not order_id:
+            raise UserError("Требуется --id")
+        try:
+            order_id = int(order_id.lstrip("#"))
+        except ValueError:
+            raise UserError("'id' должен быть номером ордера")
+        return get_usecases().cancel_order(order_id)
+
+    elif command == "get-rate":
+        from_curr = args.get("from")
+        to_curr = args.get("to")
+        if not from_curr or not to_curr:
+            raise UserError("Требуются --from и --to")
+        return get_usecases().get_exchange_rate(from_curr, to_curr)
+
+    elif command == "update-rates":
+        source = args.get("source")
+        from valutatrade_hub.parser_service.config import ParserConfig
+        from valutatrade_hub.parser_service.updater import RatesUpdater
+
+        # О начале обновления сообщает журнал RatesUpdater; ошибки
+        # передаются вызывающему, чтобы пакетный и однократный режимы
+        # учли их как сбой команды
+        config = ParserConfig()
+        get_usecases()
+        updater = RatesUpdater(config)
+        count = updater.run_update(source=source)
+        return f"Успешное обновление. Получено курсов: {count}. Последнее обновление: {datetime.now().strftime('%Y-%m-%dT%H:%M:%S')}"
+
+    elif command == "show-rates":
+        currency = args.get("currency")
+        top_n = args.get("top")
+        try:
+            top_n = int(top_n) if top_n else None
+        except ValueError:
+            raise UserError("'top' должен быть натуральным числом")
+        return get_usecases().show_rates(currency=currency, top_n=top_n)
+
+    elif command == "leaderboard":
+        base = args.get("base", "USD")
+        top_n = args.get("top", "10")
+        try:
+            top_n = int(top_n)
+        except ValueError:
+            raise UserError("'top' должен быть натуральным числом")
+        return get_usecases().show_leaderboard(base=base, top_n=top_n)
+
+    elif command == "history":
+        from_curr = args.get("from")
+        to_curr = args.get("to")
+        if not from_curr or not to_curr:
+            raise UserError("Требуются --from и --to")
+        return get_usecases().show_history(
+            from_curr,
+            to_curr,
+            at=args.get("at"),
+            start=args.get("start"),
+            end=args.get("end"),
+            interval=args.get("interval"),
+        )
+
+    elif command == "stats":
+        return format_action_stats()
+
+    elif command == "scheduler-status":
+        return format_scheduler_status(_scheduler)
+
+    else:
+        return f"Неизвестная команда: {command}. Введите 'help'."
+
+
+def format_action_stats() -> str:
+    """Текст статистики задержек и результатов действий"""
+    from valutatrade_hub.metrics import registry
+
+    snapshot = registry.snapshot()
+    if not snapshot:
+        return "Статистика пуста: ещё не выполнено ни одного действия"
+    lines = [f"{'Действие':<10} {'всего':>7} {'ошибок':>7} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'макс, мс':>9}"]
+    for action, s in snapshot.items():
+        lines.append(
+            f"{action:<10} {s['count']:>7} {s['error']:>7} {s['p50_ms']:>9.3f} "
+            f"{s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}"
+        )
+        for error_type, n in sorted(s["errors"].items()):
+            lines.append(f"  - {error_type}: {n}")
+    return "\n".join(lines)
+
+
+def format_scheduler_status(scheduler) -> str:
+    """Текст статистики планировщика по источникам"""
+    if scheduler is None:
+        return "Планировщик не запущен"
+    lines = [f"Планировщик: {'работает' if scheduler.is_running() else 'остановлен'}"]
+    network = scheduler.updater.source_stats()
+    for s in scheduler.status():
+        next_due = f"{s['next_due_in']:.0f} с" if s["next_due_in"] is not None else "—"
+        lines.append(
+            f"- {s['source']}: интервал {s['interval']:.0f} с, последний запуск {s['last_run'] or '—'} "
+            f"({s['last_duration']:.2f} с, курсов: {s['last_count']}), следующий через {next_due}, "
+            f"предохранитель: {s['breaker']}"
+        )
+        if s["last_error"]:
+            lines.append(f"  ошибка ({s['failures']} подряд): {s['last_error']}")
+        net = network.get(s["source"])
+        if net:
+            lines.append(
+                f"  запросов: {net['requests']}, из кеша: {net['cache_hits']}, 304: {net['not_modified']}, "
+                f"ошибок: {net['errors']}, средняя задержка: {net['avg_latency'] * 1000:.0f} мс"
+            )
+    return "\n".join(lines)
+
+
+def format_error(error: Exception) -> str:
+    """Текст сообщения об ошибке выполнения команды"""
+    if isinstance(error, CurrencyNotFoundError):
+        return f"Ошибка: {error}\nПоддерживаемые валюты: USD, EUR, RUB, BTC, ETH, SOL. Введите 'help' для справки."
+    if isinstance(error, ApiRequestError):
+        return (
+            f"Ошибка: {error}\n"
+            "Повторите попытку позже или проверьте подключение к сети и переменную EXCHANGERATE_API_KEY."
+        )
+    if isinstance(error, (InsufficientFundsError, UserError)):
+        return f"Ошибка: {error}"
+    return f"Внутренняя ошибка: {error}"
+
+
+def run_cli(scheduler=None, on_start=None) -> None:
+    """Запуск основного цикла командной строки
+
+    on_start вызывается после вывода справки, непосредственно перед первым
+    приглашением: фоновая инициализация не конкурирует с запуском CLI.
+    """
+    if scheduler is not None:
+        attach_scheduler(scheduler)
+    print(help_message())
     print()
+    if on_start is not None:
+        on_start()
 
     while True:
         try:
@@ -68,109 +316,10 @@ def run_cli() -> None:
                 print("Выход")
                 break
 
-            if user_input == "help":
-                print_help_message()
-                print()
-                continue
+            print(execute_command(parse_args(user_input)))
 
-            parsed = parse_args(user_input)
-            command = parsed["command"]
-            args = parsed["args"]
-
-            if command == "register":
-                username = args.get("username")
-                password = args.get("password")
-                if not username or not password:
-                    raise UserError("Требуются аргументы --username и --password")
-                message = _usecases.register_user(username, password)
-                print(message)
-
-            elif command == "login":
-                username = args.get("username")
-                password = args.get("password")
-                if not username or not password:
-                    raise UserError("Требуются аргументы --username и --password")
-                message = _usecases.login_user(username, password)
-                print(message)
-
-            elif command == "show-portfolio":
-                base = args.get("base", "USD")
-                message = _usecases.show_portfolio(base)
-                print(message)
-
-            elif command == "buy":
-                currency = args.get("currency")
-                amount_str = args.get("amount")
-                if not currency or not amount_str:
-                    raise UserError("Требуются --currency и --amount")
-                try:
-                    amount = float(amount_str)
-                except ValueError:
-                    raise UserError("'amount' должен быть числом")
-                if amount <= 0:
-                    raise UserError("'amount' должен быть положительным числом")
-                message = _usecases.buy_currency(currency, amount)
-                print(message)
-
-            elif command == "sell":
-                currency = args.get("currency")
-                amount_str = args.get("amount")
-                if not currency or not amount_str:
-                    raise UserError("Требуются --currency и --amount")
-                try:
-                    amount = float(amount_str)
-                except ValueError:
-                    raise UserError("'amount' должен быть числом")
-                if amount <= 0:
-                    raise UserError("'amount' должен быть положительным числом")
-                message = _usecases.sell_currency(currency, amount)
-                print(message)
-
-            elif command == "get-rate":
-                from_curr = args.get("from")
-                to_curr = args.get("to")
-                if not from_curr or not to_curr:
-                    raise UserError("Требуются --from и --to")
-                message = _usecases.get_exchange_rate(from_curr, to_curr)
-                print(message)
-
-            elif command == "update-rates":
-                source = args.get("source")
-                try:
-                    print("Начало обновления курсов валют...")
-                    config = ParserConfig()
-                    updater = RatesUpdater(config)
-                    count = updater.run_update(source=source)
-                    print(f"Успешное обновление. Получено курсов: {count}. Последнее обновление: {datetime.now().strftime('%Y-%m-%dT%H:%M:%S')}")
-                except Exception as e:
-                    print(f"Ошибка при обновлении курсов: {e}")
-                    print("Проверьте подключение к сети и переменную EXCHANGERATE_API_KEY")
-            
-            elif command == "show-rates":
-                currency = args.get("currency")
-                top_n = args.get("top")
-                try:
-                    top_n = int(top_n) if top_n else None
-                except ValueError:
-                    raise UserError("'top' должен быть натуральным числом")
-                message = _usecases.show_rates(currency=currency, top_n=top_n)
-                print(message)
-
-            else:
-                print(f"Неизвестная команда: {command}. Введите 'help'.")
-
-        except InsufficientFundsError as e:
-            print(f"Ошибка: {e}")
-        except CurrencyNotFoundError as e:
-            print(f"Ошибка: {e}")
-            print("Поддерживаемые валюты: USD, EUR, RUB, BTC, ETH, SOL. Введите 'help' для справки.")
-        except ApiRequestError as e:
-            print(f"Ошибка: {e}")
-            print("Повторите попытку позже или проверьте подключение к сети.")
-        except UserError as e:
-            print(f"Ошибка: {e}")
         except KeyboardInterrupt:
             print("\nВыход")
             break
         except Exception as e:
-            print(f"Внутренняя ошибка: {e}")
\ No newline at end of file
+            print(format_error(e))
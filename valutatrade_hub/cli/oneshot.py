@@ -0,0 +1,39 @@
+import sys
+from typing import IO, List, Optional
+
+from valutatrade_hub.cli.interface import execute_command, format_error, get_usecases, parse_argv
+from valutatrade_hub.infra.session_tokens import SessionTokenStore
+
+# Команды, которым не нужна сохранённая сессия
+_NO_SESSION = {"help", "register", "login", "logout", "update-rates", "show-rates", "stats"}
+
+
+def run_once(argv: List[str], out: Optional[IO[str]] = None) -> int:
+    """Выполнение одной команды из аргументов процесса (project buy --currency BTC --amount 0.1)
+
+    Вход сохраняется между запусками в подписанном токене с ограниченным
+    сроком действия. Планировщик и обновление курсов при старте не
+    запускаются. Возвращает код завершения: 0 — успех, 1 — ошибка.
+    """
+    out = out or sys.stdout
+    tokens = SessionTokenStore()
+    try:
+        parsed = parse_argv(argv)
+        command = parsed["command"]
+        if command not in _NO_SESSION:
+            claims = tokens.load()
+            if claims is not None:
+                get_usecases().resume_session(claims["uid"], claims["sub"])
+
+        message = execute_command(parsed)
+        if command == "login":
+            user = get_usecases().get_logged_in_user()
+            tokens.issue(user.user_id, user.username)
+            message += f" (сессия действует {tokens.ttl_seconds} с)"
+        elif command == "logout":
+            tokens.clear()
+        print(message, file=out)
+        return 0
+    except Exception as e:
+        print(format_error(e), file=out)
+        return 1
@@ -17,9 +17,13 @@ class CurrencyNotFoundError(Exception):
 
 
 class ApiRequestError(Exception):
-    """Исключение: ошибка при обращении к внешнему API"""
-    def __init__(self, reason: str) -> None:
+    """Исключение: ошибка при обращении к внешнему API
+
+    retryable=False — повтор запроса не поможет (неверный ключ, ошибка 4xx).
+    """
+    def __init__(self, reason: str, retryable: bool = True) -> None:
         self.reason = reason
+        self.retryable = retryable
         message = f"Ошибка при обращении к внешнему API: {reason}"
         super().__init__(message)
 
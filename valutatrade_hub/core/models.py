@@ -1,7 +1,10 @@
 import hashlib
 import secrets
 from datetime import datetime
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from valutatrade_hub.core.rate_matrix import RateMatrix
 
 
 class User:
@@ -166,8 +169,19 @@ class Portfolio:
             raise KeyError(f"Кошелёк для валюты {code} не найден")
         return self._wallets[code]
 
-    def get_total_value(self, base_currency: str = "USD") -> float:
+    def get_total_value(self, base_currency: str = "USD", rates: Optional["RateMatrix"] = None) -> float:
         """Возврат общей стоимости портфеля в базовой валюте"""
+        if rates is not None:
+            # Модуль оценки (и NumPy, если установлен) загружается только при первом использовании
+            from valutatrade_hub.core.valuation import value_portfolios
+
+            report = value_portfolios(
+                ((self._user_id, code, wallet.balance) for code, wallet in self._wallets.items()),
+                rates,
+                base_currency,
+            )
+            return round(float(report.totals[0]), 2) if len(report.totals) else 0.0
+
         # Фиксированные курсы относительно USD
         exchange_rates = {
             "USD": 1.0,
@@ -0,0 +1,243 @@
+import heapq
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from valutatrade_hub.core.currencies import CurrencyNotFoundError
+from valutatrade_hub.core.exceptions import InsufficientFundsError, UserError
+from valutatrade_hub.infra.order_journal import OrderJournal
+
+logger = logging.getLogger("valutatrade")
+
+SIDES = ("buy", "sell")
+KINDS = ("limit", "stop")
+
+
+@dataclass
+class Order:
+    """Отложенный ордер пользователя на пару currency/quote
+
+    Цена — стоимость одной единицы currency в валюте quote. Лимитный ордер
+    на покупку срабатывает, когда цена опускается до price или ниже, на
+    продажу — когда поднимается до price или выше; стоп-ордера — наоборот.
+    """
+    order_id: int
+    user_id: int
+    username: str
+    side: str
+    kind: str
+    currency: str
+    quote: str
+    amount: float
+    price: float
+    created_at: str
+    status: str = "open"
+
+    @property
+    def pair(self) -> Tuple[str, str]:
+        return self.currency, self.quote
+
+    @property
+    def fires_on_rise(self) -> bool:
+        """True — срабатывает при цене >= price, False — при цене <= price"""
+        return (self.side == "sell") == (self.kind == "limit")
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Поля простых типов: копия __dict__ заметно быстрее dataclasses.asdict
+        return dict(vars(self))
+
+
+class OrderBook:
+    """Открытые ордера в кучах по парам: O(log n) на постановку и исполнение
+
+    Для каждой пары две кучи по цене срабатывания: min-куча ордеров,
+    срабатывающих на росте цены, и max-куча (цены со знаком минус) —
+    на падении. При новой цене извлекаются только пересечённые ордера,
+    поэтому обработка снимка пропорциональна числу сработавших ордеров.
+    Отменённые ордера удаляются из куч лениво, при извлечении.
+    """
+
+    def __init__(self) -> None:
+        self.orders: Dict[int, Order] = {}
+        # пара -> (на рост: [(price, id)], на падение: [(-price, id)])
+        self._heaps: Dict[Tuple[str, str], Tuple[List[Tuple[float, int]], List[Tuple[float, int]]]] = {}
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def add(self, order: Order) -> None:
+        rising, falling = self._heaps.setdefault(order.pair, ([], []))
+        if order.fires_on_rise:
+            heapq.heappush(rising, (order.price, order.order_id))
+        else:
+            heapq.heappush(falling, (-order.price, order.order_id))
+        self.orders[order.order_id] = order
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        """Снятие ордера (запись в куче удаляется при следующем извлечении)"""
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            self._stale += 1
+        return order
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        return list(self._heaps)
+
+    def pop_triggered(self, pair: Tuple[str, str], price: float) -> List[Order]:
+        """Извлечение ордеров пары, пересечённых ценой price"""
+        heaps = self._heaps.get(pair)
+        if heaps is None or math.isnan(price):
+            return []
+        rising, falling = heaps
+        fired: List[Order] = []
+        while rising and rising[0][0] <= price:
+            self._take(heapq.heappop(rising)[1], fired)
+        while falling and -falling[0][0] >= price:
+            self._take(heapq.heappop(falling)[1], fired)
+        if not rising and not falling:
+            del self._heaps[pair]
+        return fired
+
+    def _take(self, order_id: int, fired: List[Order]) -> None:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            self._stale -= 1
+        else:
+            fired.append(order)
+
+    def compact(self) -> None:
+        """Перестроение куч, если в них накопилось много отменённых записей"""
+        if self._stale <= len(self.orders):
+            return
+        orders = list(self.orders.values())
+        self.orders.clear()
+        self._heaps.clear()
+        self._stale = 0
+        for order in orders:
+            self.add(order)
+
+    def for_user(self, user_id: int) -> Iterator[Order]:
+        return (o for o in self.orders.values() if o.user_id == user_id)
+
+
+def validate_order(side: str, kind: str, amount: float, price: float) -> None:
+    """Проверка параметров ордера"""
+    if side not in SIDES:
+        raise UserError("'side' должен быть buy или sell")
+    if kind not in KINDS:
+        raise UserError("'type' должен быть limit или stop")
+    if amount <= 0:
+        raise UserError("'amount' должен быть положительным числом")
+    if not price > 0 or math.isinf(price):
+        raise UserError("'price' должен быть положительным числом")
+
+
+class OrderEngine:
+    """Постановка, отмена и исполнение отложенных ордеров
+
+    process() вызывается по событию нового снимка курсов. Закрытие
+    сработавших ордеров записывается в журнал до исполнения сделок, так что
+    после сбоя ордер не будет исполнен повторно. Каждая операция выполняется
+    под файловой блокировкой журнала; если журнал изменил другой процесс
+    (однократная команда, API-сервер), книга ордеров сначала перечитывается,
+    поэтому номера ордеров не повторяются.
+    """
+
+    def __init__(self, journal: OrderJournal, execute: Callable[[Order, float], None]) -> None:
+        self.journal = journal
+        self._execute = execute
+        self._lock = journal.lock()
+        self.book = OrderBook()
+        self._next_id = 1
+        self._reload()
+
+    def _reload(self) -> None:
+        book = OrderBook()
+        for data in self.journal.load().values():
+            book.add(Order(**data))
+        self.book = book
+        self._next_id = self.journal.last_id + 1
+
+    def _sync(self) -> None:
+        if self.journal.changed_externally():
+            self._reload()
+
+    def place(
+        self, user_id: int, username: str, side: str, kind: str,
+        currency: str, quote: str, amount: float, price: float,
+    ) -> Order:
+        """Постановка ордера в книгу"""
+        validate_order(side, kind, amount, price)
+        with self._lock:
+            self._sync()
+            order = Order(
+                self._next_id, user_id, username, side, kind, currency, quote,
+                amount, price, datetime.now().isoformat(),
+            )
+            self.journal.append([{"op": "place", "order": order.to_dict()}])
+            self.book.add(order)
+            self._next_id += 1
+        return order
+
+    def cancel(self, user_id: int, order_id: int) -> Order:
+        """Отмена открытого ордера пользователя"""
+        with self._lock:
+            self._sync()
+            order = self.book.orders.get(order_id)
+            if order is None or order.user_id != user_id:
+                raise UserError(f"Открытый ордер #{order_id} не найден")
+            self.book.remove(order_id)
+            order.status = "cancelled"
+            self.journal.append([{"op": "close", "id": order_id, "status": order.status}])
+        return order
+
+    def pairs_involving(self, codes: Set[str]) -> List[Tuple[str, str]]:
+        """Пары книги, цена которых зависит от курсов валют codes"""
+        with self._lock:
+            # Ордера, выставленные другим процессом, должны участвовать в отборе пар
+            self._sync()
+            return [pair for pair in self.book.pairs() if pair[0] in codes or pair[1] in codes]
+
+    def open_orders(self, user_id: int) -> List[Order]:
+        with self._lock:
+            self._sync()
+            return sorted(self.book.for_user(user_id), key=lambda o: o.order_id)
+
+    def process(
+        self, price_of: Callable[[str, str], float], pairs: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> List[Tuple[Order, float]]:
+        """Исполнение ордеров, пересечённых текущими ценами; возвращает (ордер, цена)"""
+        with self._lock:
+            self._sync()
+            fired: List[Tuple[Order, float]] = []
+            for pair in list(pairs if pairs is not None else self.book.pairs()):
+                price = price_of(*pair)
+                fired.extend((order, price) for order in self.book.pop_triggered(pair, price))
+            if not fired:
+                return []
+
+            self.journal.append({"op": "close", "id": order.order_id, "status": "filled", "price": price} for order, price in fired)
+            rejected = []
+            for order, price in fired:
+                try:
+                    self._execute(order, price)
+                    order.status = "filled"
+                except (UserError, InsufficientFundsError, CurrencyNotFoundError) as e:
+                    order.status = "rejected"
+                    rejected.append({"op": "close", "id": order.order_id, "status": "rejected", "reason": str(e)})
+                    logger.warning(f"Ордер #{order.order_id} отклонён: {e}")
+                except Exception as e:
+                    # Сбой хранилища не должен прерывать цикл: остальные ордера уже
+                    # закрыты в журнале и без исполнения были бы потеряны
+                    order.status = "rejected"
+                    rejected.append({"op": "close", "id": order.order_id, "status": "rejected", "reason": repr(e)})
+                    logger.error(f"Ордер #{order.order_id} не исполнен из-за ошибки: {e!r}")
+            self.journal.append(rejected)
+
+            self.book.compact()
+            if self.journal.needs_compaction(len(self.book)):
+                self.journal.rewrite(o.to_dict() for o in self.book.orders.values())
+            return fired
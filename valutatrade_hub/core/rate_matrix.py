@@ -0,0 +1,59 @@
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List
+
+
+class RateMatrix:
+    """Плотная матрица кросс-курсов N×N, построенная по одному снимку курсов
+
+    Ячейка [i][j] — курс валюты i в валюте j (через USD). Отсутствующие
+    курсы хранятся как NaN. Валют единицы, поэтому матрица хранится в
+    array("d") и не требует NumPy (его импорт заметно удлинил бы запуск
+    каждой команды); NumPy используется только при массовой оценке.
+    """
+
+    def __init__(
+        self,
+        codes: Iterable[str],
+        usd_rates: Dict[str, float],
+        version: int = 0,
+        updated_at: str = "неизвестно",
+    ) -> None:
+        self.codes: List[str] = [sys.intern(code) for code in codes]
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self.version = version
+        self.updated_at = updated_at
+        self.size = len(self.codes)
+
+        usd = [usd_rates.get(code, math.nan) for code in self.codes]
+        self.usd_vector = array("d", usd)
+        self._data = array("d", (a / b for a in usd for b in usd))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any], codes: Iterable[str]) -> "RateMatrix":
+        """Построение матрицы из содержимого rates.json"""
+        usd_rates = {"USD": 1.0}
+        for key, info in snapshot.items():
+            if isinstance(info, dict) and key.endswith("_USD"):
+                usd_rates[key[:-4]] = float(info["rate"])
+        return cls(
+            codes,
+            usd_rates,
+            version=snapshot.get("version", 0),
+            updated_at=snapshot.get("last_refresh", "неизвестно"),
+        )
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """Кросс-курс from_code -> to_code (NaN, если курса нет)
+
+        KeyError, если валюта отсутствует в матрице.
+        """
+        return float(self._data[self.index[from_code] * self.size + self.index[to_code]])
+
+    def usd_rate(self, code: str) -> float:
+        """Курс валюты к USD (NaN, если курса нет)"""
+        return float(self.usd_vector[self.index[code]])
@@ -0,0 +1,75 @@
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from valutatrade_hub.core.exceptions import UserError
+
+
+@dataclass(frozen=True)
+class Session:
+    """Сессия авторизованного пользователя"""
+    session_id: str
+    user_id: int
+    username: str
+    expires_at: float  # по часам time.monotonic()
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (time.monotonic() if now is None else now) >= self.expires_at
+
+
+class SessionRegistry:
+    """Потокобезопасный реестр сессий с ограниченным сроком действия
+
+    Истёкшие сессии удаляются при обращении к ним и периодически при
+    создании новых, поэтому реестр не растёт без ограничений.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + ttl_seconds
+
+    def create(self, user_id: int, username: str) -> Session:
+        """Новая сессия пользователя"""
+        now = time.monotonic()
+        session = Session(secrets.token_urlsafe(24), user_id, username, now + self.ttl_seconds)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            if now >= self._next_purge:
+                self._purge(now)
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """Действующая сессия по идентификатору"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.is_expired():
+                del self._sessions[session_id]
+                session = None
+        if session is None:
+            raise UserError("Сессия не найдена или истекла. Выполните login")
+        return session
+
+    def revoke(self, session_id: str) -> bool:
+        """Завершение сессии; True, если она существовала"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self) -> int:
+        """Удаление истёкших сессий; возвращает их число"""
+        with self._lock:
+            return self._purge(time.monotonic())
+
+    def _purge(self, now: float) -> int:
+        expired = [sid for sid, s in self._sessions.items() if s.is_expired(now)]
+        for sid in expired:
+            del self._sessions[sid]
+        self._next_purge = now + self.ttl_seconds
+        return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
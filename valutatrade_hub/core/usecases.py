@@ -1,90 +1,95 @@
 import hashlib
+import logging
+import math
 import secrets
-from datetime import datetime
-from typing import Optional, Dict, Any
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
-from valutatrade_hub.core.models import User
 from valutatrade_hub.core.currencies import get_currency, CurrencyNotFoundError
-from valutatrade_hub.core.exceptions import UserError, InsufficientFundsError, ApiRequestError
+from valutatrade_hub.core.exceptions import UserError, ApiRequestError
+from valutatrade_hub.core.orders import Order, OrderEngine
+from valutatrade_hub.core.session import Session, SessionRegistry
 from valutatrade_hub.infra.settings import SettingsLoader
 from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.order_journal import OrderJournal
 from valutatrade_hub.decorators import log_action
+from valutatrade_hub.events import SNAPSHOT_COMMITTED, SnapshotCommitted, bus
 
-
-# Глобальная сессия
-_current_user: Optional[User] = None
+logger = logging.getLogger("valutatrade")
 
 
 class UseCases:
-    """Основной класс для бизнес-логики приложения"""
+    """Основной класс для бизнес-логики приложения
+
+    Операции пользователя принимают сессию (session=...) явно, поэтому один
+    экземпляр может обслуживать многих пользователей из разных потоков.
+    Без сессии используется сессия по умолчанию — последний login в CLI.
+    """
 
     def __init__(self) -> None:
         self.db = DatabaseManager()
         settings = SettingsLoader()
         self.rates_ttl = settings.get("rates_ttl_seconds")
         self.default_base_currency = settings.get("default_base_currency")
+        self.sessions = SessionRegistry(float(settings.get("session_ttl_seconds", 3600)))
+        self._default_session: Optional[Session] = None
+        self._rate_history = None
+        self._order_engine: Optional[OrderEngine] = None
+        self._order_engine_lock = threading.Lock()
+        # Блокировки портфелей: изменения одного пользователя выполняются по очереди
+        self._user_locks: Dict[int, threading.Lock] = {}
+        self._user_locks_guard = threading.Lock()
+        # Ордера исполняются по событию нового снимка курсов
+        bus.subscribe(SNAPSHOT_COMMITTED, self._on_snapshot_committed)
 
     def _get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Получение данных пользователя по имени"""
-        users = self.db.load_users()
-        for user in users:
-            if user["username"] == username:
-                return user
-        return None
+        return self.db.get_user(username)
 
     def _get_portfolio_by_user_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Получение портфеля по ID пользователя"""
-        portfolios = self.db.load_portfolios()
-        for portfolio in portfolios:
-            if portfolio["user_id"] == user_id:
-                return portfolio
-        return None
+        return self.db.get_portfolio(user_id)
 
     def _save_portfolio_for_user(self, user_id: int, portfolio_dict: Dict[str, Any]) -> None:
         """Сохранение портфеля для пользователя"""
-        portfolios = self.db.load_portfolios()
-        for i, p in enumerate(portfolios):
-            if p["user_id"] == user_id:
-                portfolios[i] = portfolio_dict
-                self.db.save_portfolios(portfolios)
-                return
-        portfolios.append(portfolio_dict)
-        self.db.save_portfolios(portfolios)
+        self.db.save_portfolio(portfolio_dict)
 
     def _get_exchange_rate(self, from_curr: str, to_curr: str) -> float:
-        """Расчёт курса из одной валюты в другую через USD"""
-        get_currency(from_curr)
-        get_currency(to_curr)
-
-        rates = self.db.load_rates()
+        """Курс из одной валюты в другую по матрице кросс-курсов"""
         from_curr = from_curr.upper()
         to_curr = to_curr.upper()
+        matrix = self.db.get_rate_matrix()
+        if from_curr not in matrix or to_curr not in matrix:
+            # Ошибка о неподдерживаемой валюте
+            get_currency(from_curr)
+            get_currency(to_curr)
+            raise CurrencyNotFoundError("Валюта не поддерживается")
 
         if from_curr == to_curr:
             return 1.0
 
-        supported = ["USD", "EUR", "RUB", "BTC", "ETH", "SOL"]
-        if from_curr not in supported or to_curr not in supported:
-            raise CurrencyNotFoundError("Валюта не поддерживается")
-
-        def get_usd_rate(code: str) -> float:
-            if code == "USD":
-                return 1.0
-            pair = f"{code}_USD"
-            if pair in rates:
-                return rates[pair]["rate"]
-            raise UserError(f"Нет курса для {code} к USD")
-
-        from_usd = get_usd_rate(from_curr)
-        to_usd = get_usd_rate(to_curr)
-        
-        return from_usd / to_usd
-
-    def get_logged_in_user(self) -> User:
-        """Получение текущего авторизованного пользователя"""
-        if _current_user is None:
+        rate = matrix.rate(from_curr, to_curr)
+        if math.isnan(rate):
+            missing = from_curr if math.isnan(matrix.usd_rate(from_curr)) else to_curr
+            raise UserError(f"Нет курса для {missing} к USD")
+        return rate
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        """Блокировка портфеля пользователя"""
+        with self._user_locks_guard:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    def get_logged_in_user(self, session: Optional[Session] = None) -> Session:
+        """Действующая сессия: переданная явно или сессия по умолчанию"""
+        session = session or self._default_session
+        if session is None:
             raise UserError("Сначала выполните login")
-        return _current_user
+        return self.sessions.get(session.session_id)
 
     @log_action("REGISTER")
     def register_user(self, username: str, password: str) -> str:
@@ -95,28 +100,33 @@ class UseCases:
         if self._get_user_by_username(username):
             raise UserError(f"Имя пользователя '{username}' уже занято")
 
-        users = self.db.load_users()
-        user_id = max([u["user_id"] for u in users], default=0) + 1
         salt = secrets.token_urlsafe(16)
         hashed = hashlib.sha256((password + salt).encode()).hexdigest()
 
-        new_user = {
-            "user_id": user_id,
+        # Проверка имени, выделение user_id и запись выполняются хранилищем атомарно:
+        # параллельные регистрации (HTTP API) не получают один идентификатор
+        new_user = self.db.create_user({
             "username": username,
             "hashed_password": hashed,
             "salt": salt,
             "registration_date": datetime.now().isoformat()
-        }
-        users.append(new_user)
-        self.db.save_users(users)
+        })
+        if new_user is None:
+            raise UserError(f"Имя пользователя '{username}' уже занято")
+        user_id = new_user["user_id"]
 
         self._save_portfolio_for_user(user_id, {"user_id": user_id, "wallets": {}})
 
         return f"Пользователь '{username}' зарегистрирован (id={user_id}). Войдите: login --username {username} --password ****"
 
-    @log_action("LOGIN")
     def login_user(self, username: str, password: str) -> str:
-        """Авторизация пользователя"""
+        """Авторизация пользователя CLI: сессия становится сессией по умолчанию"""
+        self._default_session = self.login(username, password)
+        return f"Вы вошли как '{username}'"
+
+    @log_action("LOGIN")
+    def login(self, username: str, password: str) -> Session:
+        """Проверка пароля и создание новой сессии"""
         user_data = self._get_user_by_username(username)
         if not user_data:
             raise UserError(f"Пользователь '{username}' не найден")
@@ -126,32 +136,40 @@ class UseCases:
         if hashed_input != user_data["hashed_password"]:
             raise UserError("Неверный пароль")
 
-        global _current_user
-        _current_user = User(
-            user_id=user_data["user_id"],
-            username=user_data["username"],
-            password="dummy",
-            salt=salt,
-            registration_date=datetime.fromisoformat(user_data["registration_date"])
-        )
-        _current_user._hashed_password = user_data["hashed_password"]
-        return f"Вы вошли как '{username}'"
+        return self.sessions.create(user_data["user_id"], user_data["username"])
 
-    def show_portfolio(self, base: str = "USD") -> str:
+    def resume_session(self, user_id: int, username: str) -> Session:
+        """Восстановление входа по проверенному токену сессии (без пароля)"""
+        user_data = self._get_user_by_username(username)
+        if not user_data or user_data["user_id"] != user_id:
+            raise UserError("Пользователь сессии не найден. Выполните login")
+        self._default_session = self.sessions.create(user_id, username)
+        return self._default_session
+
+    def logout(self, session: Optional[Session] = None) -> None:
+        """Завершение сессии (по умолчанию — сессии CLI)"""
+        session = session or self._default_session
+        if session is None:
+            return
+        self.sessions.revoke(session.session_id)
+        if session is self._default_session:
+            self._default_session = None
+
+    def show_portfolio(self, base: str = "USD", *, session: Optional[Session] = None) -> str:
         """Показ портфолио пользователя"""
         get_currency(base)
-        user = self.get_logged_in_user()
-        portfolio_data = self._get_portfolio_by_user_id(user.user_id)
-        if not portfolio_data or not portfolio_data["wallets"]:
+        user = self.get_logged_in_user(session)
+        with self._user_lock(user.user_id):
+            portfolio_data = self._get_portfolio_by_user_id(user.user_id)
+            wallets = {code: wallet["balance"] for code, wallet in portfolio_data["wallets"].items()} if portfolio_data else {}
+        if not wallets:
             return f"Портфель пользователя '{user.username}' пуст."
 
         base = base.upper()
-        wallets = portfolio_data["wallets"]
         lines = []
         total_in_base = 0.0
 
-        for code, wallet in wallets.items():
-            balance = wallet["balance"]
+        for code, balance in wallets.items():
             if code == base:
                 converted = balance
             else:
@@ -169,20 +187,14 @@ class UseCases:
         return result
 
     @log_action("BUY", verbose=True)
-    def buy_currency(self, currency: str, amount: float) -> str:
+    def buy_currency(self, currency: str, amount: float, *, session: Optional[Session] = None) -> str:
         """Покупка валюты"""
-        user = self.get_logged_in_user()
+        user = self.get_logged_in_user(session)
         if amount <= 0:
             raise UserError("'amount' должен быть положительным числом")
         get_currency(currency)
 
-        portfolio_data = self._get_portfolio_by_user_id(user.user_id)
-        if currency not in portfolio_data["wallets"]:
-            portfolio_data["wallets"][currency] = {"balance": 0.0}
-
-        old_balance = portfolio_data["wallets"][currency]["balance"]
-        portfolio_data["wallets"][currency]["balance"] = old_balance + amount
-        self._save_portfolio_for_user(user.user_id, portfolio_data)
+        old_balance, new_balance = self.db.adjust_wallet_balance(user.user_id, currency, amount)
 
         try:
             rate = self._get_exchange_rate(currency, "USD")
@@ -195,28 +207,23 @@ class UseCases:
         if rate is not None:
             result += f" по курсу {rate:,.2f} USD/{currency}"
             result += f"\nОценочная стоимость покупки: {cost_usd:,.2f} USD"
-        result += f"\nИзменения в портфеле:\n- {currency}: было {old_balance:.4f} -> стало {old_balance + amount:.4f}"
+        result += f"\nИзменения в портфеле:\n- {currency}: было {old_balance:.4f} -> стало {new_balance:.4f}"
         return result
 
     @log_action("SELL", verbose=True)
-    def sell_currency(self, currency: str, amount: float) -> str:
+    def sell_currency(self, currency: str, amount: float, *, session: Optional[Session] = None) -> str:
         """Продажа валюты"""
-        user = self.get_logged_in_user()
+        user = self.get_logged_in_user(session)
         if amount <= 0:
             raise UserError("'amount' должен быть положительным числом")
         get_currency(currency)
 
         portfolio_data = self._get_portfolio_by_user_id(user.user_id)
-        if currency not in portfolio_data["wallets"]:
+        if not portfolio_data or currency not in portfolio_data["wallets"]:
             raise UserError(f"У вас нет кошелька '{currency}'. Добавьте валюту: она создаётся автоматически при первой покупке.")
 
-        balance = portfolio_data["wallets"][currency]["balance"]
-        if amount > balance:
-            raise InsufficientFundsError(available=balance, required=amount, code=currency)
-
-        old_balance = balance
-        portfolio_data["wallets"][currency]["balance"] = old_balance - amount
-        self._save_portfolio_for_user(user.user_id, portfolio_data)
+        # Проверка баланса выполняется хранилищем атомарно вместе со списанием
+        old_balance, new_balance = self.db.adjust_wallet_balance(user.user_id, currency, -amount)
 
         try:
             rate = self._get_exchange_rate(currency, "USD")
@@ -229,7 +236,7 @@ class UseCases:
         if rate is not None:
             result += f" по курсу {rate:,.2f} USD/{currency}"
             result += f"\nОценочная выручка: {revenue_usd:,.2f} USD"
-        result += f"\nИзменения в портфеле:\n- {currency}: было {old_balance:.4f} -> стало {old_balance - amount:.4f}"
+        result += f"\nИзменения в портфеле:\n- {currency}: было {old_balance:.4f} -> стало {new_balance:.4f}"
         return result
 
     @log_action("GET_RATE")
@@ -250,8 +257,7 @@ class UseCases:
         try:
             rate = self._get_exchange_rate(from_curr, to_curr)
             reverse_rate = self._get_exchange_rate(to_curr, from_curr)
-            rates = self.db.load_rates()
-            updated_at = rates.get("last_refresh", "неизвестно")
+            updated_at = self.db.get_rate_matrix().updated_at
             return f"Курс {from_curr}->{to_curr}: {rate:.6f} (обновлено: {updated_at})\nОбратный курс {to_curr}->{from_curr}: {reverse_rate:.2f}"
         except (UserError, CurrencyNotFoundError):
             raise
@@ -268,7 +274,7 @@ class UseCases:
             raise UserError("Локальный кеш курсов пуст. Выполните 'update-rates', чтобы загрузить данные.")
 
         last_refresh = data.get("last_refresh", "неизвестно")
-        pairs = {k: v for k, v in data.items() if k != "last_refresh"}
+        pairs = {k: v for k, v in data.items() if isinstance(v, dict)}
 
         if not pairs:
             raise UserError("Локальный кеш курсов пуст. Выполните 'update-rates', чтобы загрузить данные.")
@@ -304,4 +310,204 @@ class UseCases:
         lines = [f"Курсы валют из кеша, последнее обновление: {last_refresh}:"]
         for pair, info in filtered.items():
             lines.append(f"- {pair}: {info['rate']:.2f}")
-        return "\n".join(lines)
\ No newline at end of file
+        return "\n".join(lines)
+
+    def show_leaderboard(self, base: str = "USD", top_n: int = 10) -> str:
+        """Сводный отчёт: активы под управлением (AUM) и топ пользователей"""
+        from valutatrade_hub.core.valuation import value_portfolios
+
+        base = base.upper().strip()
+        get_currency(base)
+        if top_n <= 0:
+            raise UserError("'top' должен быть натуральным числом")
+        matrix = self.db.get_rate_matrix()
+        if math.isnan(matrix.usd_rate(base)):
+            raise UserError(f"Нет курса для {base} к USD")
+
+        report = value_portfolios(self.db.iter_wallets(), matrix, base)
+        if not report.wallets:
+            return "Нет ни одного непустого портфеля."
+
+        lines = [f"Активы под управлением (база: {base}, кошельков: {report.wallets}):"]
+        for code, units in sorted(report.aum_units.items()):
+            lines.append(f"- {code}: {units:.4f} -> {report.aum_value[code]:,.2f} {base}")
+        lines.append(f"{'-' * 33}\nИТОГО AUM: {report.total_aum:,.2f} {base}")
+
+        top = report.top(top_n)
+        names = self.db.get_usernames(user_id for user_id, _ in top)
+        lines.append(f"\nТоп-{len(top)} пользователей:")
+        for place, (user_id, total) in enumerate(top, start=1):
+            lines.append(f"{place}. {names.get(user_id, f'id={user_id}')}: {total:,.2f} {base}")
+        return "\n".join(lines)
+
+    def _get_order_engine(self) -> OrderEngine:
+        """Ленивое создание движка ордеров (книга читается из журнала)"""
+        with self._order_engine_lock:
+            if self._order_engine is None:
+                journal = OrderJournal(Path(SettingsLoader().get("orders_file", "data/orders.jsonl")))
+                self._order_engine = OrderEngine(journal, self._fill_order)
+            return self._order_engine
+
+    def _fill_order(self, order: Order, price: float) -> None:
+        """Исполнение сработавшего ордера: изменение баланса кошелька"""
+        delta = order.amount if order.side == "buy" else -order.amount
+        self.db.adjust_wallet_balance(order.user_id, order.currency, delta)
+
+    def _on_snapshot_committed(self, event: SnapshotCommitted) -> None:
+        """Проверка ордеров только по парам, затронутым изменившимися курсами"""
+        if not event.changed:
+            return
+        engine = self._get_order_engine()
+        pairs = engine.pairs_involving(event.changed_codes())
+        if pairs:
+            self.process_orders(pairs)
+
+    def process_orders(self, pairs: Optional[Iterable[Tuple[str, str]]] = None) -> List[Order]:
+        """Исполнение ордеров по текущему снимку курсов"""
+        matrix = self.db.get_rate_matrix()
+        fired = self._get_order_engine().process(matrix.rate, pairs)
+        for order, price in fired:
+            logger.info(
+                f"ORDER_{order.status.upper()} id={order.order_id} user='{order.username}' user_id={order.user_id} "
+                f"{order.kind} {order.side} {order.amount:.4f} {order.currency} trigger={order.price:.6f} "
+                f"price={price:.6f} {order.quote}/{order.currency}"
+            )
+        return [order for order, _ in fired]
+
+    @log_action("ORDER")
+    def place_order(
+        self,
+        side: str,
+        kind: str,
+        currency: str,
+        amount: float,
+        price: float,
+        quote: str = "USD",
+        *,
+        session: Optional[Session] = None,
+    ) -> str:
+        """Постановка лимитного или стоп-ордера; уже пересечённый ордер исполняется сразу"""
+        user = self.get_logged_in_user(session)
+        side, kind = side.lower(), kind.lower()
+        currency, quote = currency.upper(), quote.upper()
+        get_currency(currency)
+        get_currency(quote)
+        if currency == quote:
+            raise UserError("Валюта ордера и валюта цены должны различаться")
+
+        engine = self._get_order_engine()
+        order = engine.place(user.user_id, user.username, side, kind, currency, quote, amount, price)
+        condition = ">=" if order.fires_on_rise else "<="
+        result = (
+            f"Ордер #{order.order_id} выставлен: {kind} {side} {amount:.4f} {currency} "
+            f"при цене {condition} {price:,.6f} {quote}"
+        )
+        self.process_orders([order.pair])
+        if order.status != "open":
+            result += f"\nОрдер {'исполнен' if order.status == 'filled' else 'отклонён'} сразу: цена уже пересекла уровень"
+        return result
+
+    def show_orders(self, *, session: Optional[Session] = None) -> str:
+        """Открытые ордера пользователя"""
+        user = self.get_logged_in_user(session)
+        orders = self._get_order_engine().open_orders(user.user_id)
+        if not orders:
+            return "Открытых ордеров нет."
+        lines = [f"Открытые ордера пользователя '{user.username}':"]
+        for o in orders:
+            condition = ">=" if o.fires_on_rise else "<="
+            lines.append(
+                f"#{o.order_id}: {o.kind} {o.side} {o.amount:.4f} {o.currency} при цене {condition} "
+                f"{o.price:,.6f} {o.quote} (выставлен {o.created_at})"
+            )
+        return "\n".join(lines)
+
+    @log_action("CANCEL_ORDER")
+    def cancel_order(self, order_id: int, *, session: Optional[Session] = None) -> str:
+        """Отмена открытого ордера"""
+        user = self.get_logged_in_user(session)
+        order = self._get_order_engine().cancel(user.user_id, order_id)
+        return f"Ордер #{order.order_id} отменён"
+
+    def _get_rate_history(self):
+        """Ленивое создание индекса истории курсов"""
+        if self._rate_history is None:
+            from valutatrade_hub.parser_service.config import ParserConfig
+            from valutatrade_hub.parser_service.history_query import RateHistory
+            from valutatrade_hub.parser_service.storage import RatesStorage
+            self._rate_history = RateHistory(RatesStorage(ParserConfig()))
+        return self._rate_history
+
+    def show_history(
+        self,
+        from_curr: str,
+        to_curr: str,
+        at: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        interval: Optional[str] = None,
+    ) -> str:
+        """История курса пары: курс на момент, замеры за период или свечи OHLC"""
+        from valutatrade_hub.parser_service.history_query import parse_interval
+
+        from_curr = from_curr.upper().strip()
+        to_curr = to_curr.upper().strip()
+        get_currency(from_curr)
+        get_currency(to_curr)
+
+        def parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+            if value is None:
+                return None
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                raise UserError(f"'{name}' должен быть датой в формате ISO, например 2025-01-31T12:00")
+
+        at_dt = parse_time(at, "at")
+        end_dt = parse_time(end, "end") or datetime.now()
+        start_dt = parse_time(start, "start")
+
+        history = self._get_rate_history()
+        pair = f"{from_curr}_{to_curr}"
+        inverse = False
+        if pair not in history.pairs():
+            pair = f"{to_curr}_{from_curr}"
+            inverse = True
+            if pair not in history.pairs():
+                raise UserError(f"История курса {from_curr}->{to_curr} не найдена")
+
+        def convert(rate: float) -> float:
+            return 1.0 / rate if inverse else rate
+
+        if at_dt is not None:
+            found = history.rate_at(pair, at_dt)
+            if found is None:
+                raise UserError(f"Нет данных о курсе {from_curr}->{to_curr} на {at_dt.isoformat()}")
+            sample_ts, rate = found
+            return f"Курс {from_curr}->{to_curr} на {at_dt.isoformat()}: {convert(rate):.6f} (замер {sample_ts.isoformat()})"
+
+        if interval is not None:
+            try:
+                interval_seconds = parse_interval(interval)
+            except ValueError:
+                raise UserError("'interval' должен быть числом секунд или значением вида 15m, 1h, 1d")
+            candles = history.candles(pair, interval_seconds, start_dt, end_dt)
+            if not candles:
+                raise UserError(f"Нет данных о курсе {from_curr}->{to_curr} за указанный период")
+            lines = [f"Свечи {from_curr}->{to_curr} (интервал {interval}):"]
+            for c in candles:
+                o, h, low, close = convert(c.open), convert(c.high), convert(c.low), convert(c.close)
+                if inverse:
+                    h, low = low, h
+                lines.append(f"- {c.start.isoformat()}: O={o:.6f} H={h:.6f} L={low:.6f} C={close:.6f} (замеров: {c.count})")
+            return "\n".join(lines)
+
+        if start_dt is None:
+            start_dt = end_dt - timedelta(days=1)
+        samples = history.range(pair, start_dt, end_dt)
+        if not samples:
+            raise UserError(f"Нет данных о курсе {from_curr}->{to_curr} за указанный период")
+        lines = [f"История {from_curr}->{to_curr} с {start_dt.isoformat()} по {end_dt.isoformat()}:"]
+        for ts, rate in samples:
+            lines.append(f"- {ts.isoformat()}: {convert(rate):.6f}")
+        return "\n".join(lines)
@@ -1,4 +1,6 @@
 import json
+import os
+import tempfile
 from pathlib import Path
 from typing import Any
 
@@ -26,8 +28,9 @@ def load_json_file(path: str) -> Any:
 
 
 def save_json_file(path: str, data: Any) -> None:
-    """Сохранение данных в JSON-файл"""
+    """Атомарное сохранение данных в JSON-файл (через временный файл)"""
     path_obj = Path(path)
     path_obj.parent.mkdir(parents=True, exist_ok=True)
-    with open(path_obj, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=path_obj.parent) as tmp:
+        json.dump(data, tmp, indent=2, ensure_ascii=False)
+    os.replace(tmp.name, path_obj)
\ No newline at end of file
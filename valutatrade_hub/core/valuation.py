@@ -0,0 +1,122 @@
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from valutatrade_hub.core.rate_matrix import RateMatrix
+
+# Модуль загружается лениво (leaderboard, оценка портфеля по матрице),
+# поэтому импорт NumPy не входит во время запуска остальных команд
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+
+@dataclass
+class ValuationReport:
+    """Результат массовой оценки портфелей (все суммы в базовой валюте)
+
+    wallets — число непустых кошельков в валютах матрицы.
+    """
+    base: str
+    user_ids: Sequence[int]
+    totals: Sequence[float]
+    aum_units: Dict[str, float]
+    aum_value: Dict[str, float]
+    wallets: int
+
+    @property
+    def total_aum(self) -> float:
+        return sum(self.aum_value.values())
+
+    def top(self, n: int) -> List[Tuple[int, float]]:
+        """Топ-N пользователей по стоимости портфеля"""
+        if np is not None and not isinstance(self.totals, list):
+            totals = self.totals
+            n = min(n, len(totals))
+            if n <= 0:
+                return []
+            idx = np.argpartition(-totals, n - 1)[:n]
+            idx = idx[np.argsort(-totals[idx], kind="stable")]
+            return [(int(self.user_ids[i]), float(totals[i])) for i in idx]
+        return [
+            (self.user_ids[i], self.totals[i])
+            for i in heapq.nlargest(n, range(len(self.totals)), key=self.totals.__getitem__)
+        ]
+
+
+# Код валюты хранится в 8 байтах ASCII: столбец можно рассматривать как
+# uint64 и сопоставлять валюты целочисленным np.unique вместо сортировки строк
+_WALLET_DTYPE = [("user_id", "i8"), ("code", "S8"), ("balance", "f8")]
+
+
+def _base_rate_vector(matrix: RateMatrix, base: str) -> List[float]:
+    """Курсы валют матрицы к базовой (0 для валют без курса)"""
+    base_usd = matrix.usd_rate(base) if base in matrix else math.nan
+    if math.isnan(base_usd):
+        raise ValueError(f"Базовая валюта не поддерживается: {base}")
+    return [
+        0.0 if math.isnan(matrix.usd_rate(code)) else matrix.usd_rate(code) / base_usd
+        for code in matrix.codes
+    ]
+
+
+def value_portfolios(wallet_rows: Iterable[Tuple[int, str, float]], matrix: RateMatrix, base: str) -> ValuationReport:
+    """Оценка всех портфелей за один проход
+
+    С NumPy строки кошельков читаются в массив одним вызовом (np.fromiter),
+    валюты сопоставляются столбцам матрицы через np.unique, а суммы по
+    пользователям и валютам считаются np.bincount. Валюты без курса
+    оцениваются в 0; ValueError, если нет курса базовой валюты.
+    """
+    base = base.upper()
+    rate_vector = _base_rate_vector(matrix, base)
+    index = matrix.index
+    if np is not None:
+        return _value_portfolios_numpy(wallet_rows, matrix, base, rate_vector)
+
+    rows: Dict[int, int] = {}
+    user_ids: List[int] = []
+    totals: List[float] = []
+    unit_sums = [0.0] * matrix.size
+    wallets = 0
+    for user_id, code, balance in wallet_rows:
+        col = index.get(code.upper())
+        if col is None:
+            continue
+        row = rows.get(user_id)
+        if row is None:
+            row = rows[user_id] = len(user_ids)
+            user_ids.append(user_id)
+            totals.append(0.0)
+        if balance:
+            totals[row] += balance * rate_vector[col]
+            unit_sums[col] += balance
+            wallets += 1
+    aum_units = {code: unit_sums[i] for i, code in enumerate(matrix.codes) if unit_sums[i]}
+    aum_value = {code: units * rate_vector[index[code]] for code, units in aum_units.items()}
+    return ValuationReport(base, user_ids, totals, aum_units, aum_value, wallets)
+
+
+def _value_portfolios_numpy(
+    wallet_rows: Iterable[Tuple[int, str, float]], matrix: RateMatrix, base: str, rate_vector: List[float]
+) -> ValuationReport:
+    data = np.fromiter(wallet_rows, dtype=_WALLET_DTYPE)
+    code_keys, code_rows = np.unique(data["code"].view(np.uint64), return_inverse=True)
+    code_cols = np.array(
+        [matrix.index.get(code.decode("ascii").upper(), -1) for code in code_keys.view("S8")],
+        dtype=np.intp,
+    )
+    cols = code_cols[code_rows]
+    known = cols >= 0
+    cols = cols[known]
+    balances = data["balance"][known]
+    user_ids, rows = np.unique(data["user_id"][known], return_inverse=True)
+
+    rates = np.array(rate_vector, dtype=np.float64)
+    totals = np.bincount(rows, weights=balances * rates[cols], minlength=len(user_ids))
+    units = np.bincount(cols, weights=balances, minlength=matrix.size)
+    aum_units = {code: float(units[i]) for i, code in enumerate(matrix.codes) if units[i]}
+    aum_value = {code: float(units[i] * rates[i]) for i, code in enumerate(matrix.codes) if units[i]}
+    return ValuationReport(base, user_ids, totals, aum_units, aum_value, int(np.count_nonzero(balances)))
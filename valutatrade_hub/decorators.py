@@ -1,8 +1,11 @@
 import logging
 import functools
+import time
 from typing import Any, Callable
 
 from valutatrade_hub.core.exceptions import UserError
+from valutatrade_hub.core.session import Session
+from valutatrade_hub.metrics import registry
 
 
 logger = logging.getLogger("valutatrade")
@@ -25,7 +28,8 @@ def log_action(action_name: str, verbose: bool = False) -> Callable:
                 usecase_instance = args[0] if args else None
                 if hasattr(usecase_instance, 'get_logged_in_user'):
                     try:
-                        user = usecase_instance.get_logged_in_user()
+                        # Сессия передаётся явно (session=...) или берётся сессия CLI по умолчанию
+                        user = usecase_instance.get_logged_in_user(kwargs.get("session"))
                         username = user.username
                         user_id = user.user_id
                     except (UserError, AttributeError):
@@ -55,40 +59,67 @@ def log_action(action_name: str, verbose: bool = False) -> Callable:
             result_status = "ERROR"
             error_message = None
             error_type = None
+            started = time.perf_counter()
 
             try:
                 result = func(*args, **kwargs)
                 result_status = "OK"
-                if verbose and isinstance(result, str):
-                    pass
+                if isinstance(result, Session):
+                    # login: пользователь известен только после создания сессии
+                    username = result.username
+                    user_id = result.user_id
+                if verbose and currency_code != "N/A" and hasattr(usecase_instance, "_get_exchange_rate"):
+                    # Курс сделки для журнала: поиск в матрице кросс-курсов
+                    try:
+                        rate = usecase_instance._get_exchange_rate(currency_code, base_currency)
+                    except Exception:
+                        rate = None
                 return result
             except Exception as e:
                 error_type = type(e).__name__
                 error_message = str(e)
                 raise
             finally:
-                # Формирование логов
-                log_parts = [
-                    action_name,
-                    f"user='{username}'",
-                ]
-                if user_id is not None:
-                    log_parts.append(f"user_id={user_id}")
-                if currency_code != "N/A":
-                    log_parts.append(f"currency='{currency_code}'")
-                if amount is not None:
-                    log_parts.append(f"amount={amount:.4f}")
-                if rate is not None:
-                    log_parts.append(f"rate={rate:.2f}")
-                if base_currency:
-                    log_parts.append(f"base='{base_currency}'")
-                log_parts.append(f"result={result_status}")
-                if error_message:
-                    log_parts.append(f"error_type={error_type}")
-                    log_parts.append(f"error_message='{error_message}'")
+                duration = time.perf_counter() - started
+                registry.observe(action_name, duration, error_type)
+                # Формирование логов (только если уровень INFO включён)
+                if logger.isEnabledFor(logging.INFO):
+                    log_parts = [
+                        action_name,
+                        f"user='{username}'",
+                    ]
+                    if user_id is not None:
+                        log_parts.append(f"user_id={user_id}")
+                    if currency_code != "N/A":
+                        log_parts.append(f"currency='{currency_code}'")
+                    if amount is not None:
+                        log_parts.append(f"amount={amount:.4f}")
+                    if rate is not None:
+                        log_parts.append(f"rate={rate:.2f}")
+                    if base_currency:
+                        log_parts.append(f"base='{base_currency}'")
+                    log_parts.append(f"result={result_status}")
+                    log_parts.append(f"duration_ms={duration * 1000:.3f}")
+                    if error_message:
+                        log_parts.append(f"error_type={error_type}")
+                        log_parts.append(f"error_message='{error_message}'")
 
-                log_message = " ".join(log_parts)
-                logger.info(log_message)
+                    log_message = " ".join(log_parts)
+                    # Поля для структурированного (JSON) журнала
+                    fields = {
+                        "action": action_name,
+                        "user": username,
+                        "user_id": user_id,
+                        "currency": None if currency_code == "N/A" else currency_code,
+                        "amount": amount,
+                        "rate": rate,
+                        "base": base_currency,
+                        "result": result_status,
+                        "duration_ms": round(duration * 1000, 3),
+                        "error_type": error_type,
+                        "error_message": error_message,
+                    }
+                    logger.info(log_message, extra={"fields": fields})
 
         return wrapper
     return decorator
\ No newline at end of file
@@ -0,0 +1,88 @@
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Set
+
+logger = logging.getLogger("valutatrade")
+
+# Новый снимок курсов записан в rates.json (RatesStorage.save_snapshot / commit_batch)
+SNAPSHOT_COMMITTED = "rates.snapshot_committed"
+
+
+@dataclass(frozen=True)
+class SnapshotCommitted:
+    """Событие фиксации снимка курсов
+
+    changed — пары, курс которых изменился (или появился), с новым курсом;
+    snapshot — содержимое rates.json целиком. Данные общие для всех
+    подписчиков и не должны изменяться.
+    """
+    version: int
+    changed: Dict[str, float]
+    snapshot: Dict[str, Any]
+
+    def changed_codes(self) -> Set[str]:
+        """Валюты, входящие в изменившиеся пары"""
+        return {code for pair in self.changed for code in pair.split("_")}
+
+
+class EventBus:
+    """Внутрипроцессная шина событий: синхронная доставка в потоке издателя
+
+    Связанные методы хранятся по слабой ссылке: подписка объекта исчезает
+    вместе с ним, и его не нужно отписывать вручную. Ошибка подписчика
+    записывается в журнал и не мешает остальным.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Callable[[], Any]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type: str, handler: Callable[[Any], None]) -> Callable[[], None]:
+        """Подписка на событие; возвращает функцию отписки"""
+        if hasattr(handler, "__self__"):
+            ref: Callable[[], Any] = weakref.WeakMethod(handler)
+        else:
+            ref = lambda: handler  # noqa: E731
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(ref)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                handlers = self._handlers.get(event_type, [])
+                if ref in handlers:
+                    handlers.remove(ref)
+        return unsubscribe
+
+    def publish(self, event_type: str, event: Any) -> int:
+        """Доставка события подписчикам; возвращает число вызванных"""
+        with self._lock:
+            refs = list(self._handlers.get(event_type, ()))
+        delivered = 0
+        dead = []
+        for ref in refs:
+            handler = ref()
+            if handler is None:
+                dead.append(ref)
+                continue
+            try:
+                handler(event)
+                delivered += 1
+            except Exception as e:
+                logger.error(f"Ошибка обработчика события {event_type}: {e}")
+        if dead:
+            with self._lock:
+                handlers = self._handlers.get(event_type, [])
+                for ref in dead:
+                    if ref in handlers:
+                        handlers.remove(ref)
+        return delivered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handlers.clear()
+
+
+# Общая шина процесса
+bus = EventBus()
@@ -0,0 +1,664 @@
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.core import utils
+from valutatrade_hub.core.exceptions import InsufficientFundsError
+from valutatrade_hub.infra.cache import JsonFileCache
+from valutatrade_hub.infra.file_lock import FileLock
+from valutatrade_hub.infra.journal import JournalCompactor, TradeJournal, apply_journal_record
+
+logger = logging.getLogger("valutatrade")
+
+class StorageBackend(ABC):
+    """Абстрактное хранилище пользователей и портфелей"""
+
+    @abstractmethod
+    def load_users(self) -> List[Dict[str, Any]]:
+        """Загрузка списка всех пользователей"""
+        pass
+
+    @abstractmethod
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        """Полная перезапись списка пользователей"""
+        pass
+
+    @abstractmethod
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        """Загрузка списка всех портфелей"""
+        pass
+
+    @abstractmethod
+    def save_portfolios(self, portfolios: List[Dict[str, Any]]) -> None:
+        """Полная перезапись списка портфелей"""
+        pass
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """Поиск пользователя по имени"""
+        pass
+
+    @abstractmethod
+    def add_user(self, user: Dict[str, Any]) -> None:
+        """Добавление нового пользователя"""
+        pass
+
+    @abstractmethod
+    def next_user_id(self) -> int:
+        """Следующий свободный идентификатор пользователя"""
+        pass
+
+    @abstractmethod
+    def create_user(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Атомарное добавление пользователя с новым user_id; None — имя уже занято"""
+        pass
+
+    @abstractmethod
+    def get_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получение портфеля пользователя"""
+        pass
+
+    @abstractmethod
+    def save_portfolio(self, portfolio: Dict[str, Any]) -> None:
+        """Сохранение (вставка или замена) одного портфеля"""
+        pass
+
+    @abstractmethod
+    def set_wallet_balance(self, user_id: int, currency: str, balance: float) -> None:
+        """Установка баланса одного кошелька"""
+        pass
+
+    @abstractmethod
+    def adjust_wallet_balance(
+        self, user_id: int, currency: str, delta: float, min_balance: float = 0.0
+    ) -> Tuple[float, float]:
+        """Атомарное изменение баланса кошелька на delta между процессами
+
+        Возвращает (старый, новый) баланс; InsufficientFundsError, если при
+        списании баланс опустился бы ниже min_balance.
+        """
+        pass
+
+    def iter_wallets(self) -> Iterator[Tuple[int, str, float]]:
+        """Потоковый перебор всех кошельков: (user_id, валюта, баланс)"""
+        for portfolio in self.load_portfolios():
+            for code, wallet in portfolio["wallets"].items():
+                yield portfolio["user_id"], code, wallet["balance"]
+
+    def get_usernames(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """Имена пользователей по списку идентификаторов"""
+        wanted = set(user_ids)
+        return {u["user_id"]: u["username"] for u in self.load_users() if u["user_id"] in wanted}
+
+    def begin(self) -> None:
+        """Начало группы записей, фиксируемых вместе вызовом commit()"""
+        pass
+
+    def commit(self) -> None:
+        """Фиксация накопленной группы записей"""
+        pass
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Статистика внутренних кешей хранилища"""
+        return {}
+
+    def close(self, compact: bool = True) -> None:
+        """Освобождение ресурсов хранилища (compact — свернуть журнал изменений)"""
+        pass
+
+
+class JsonBackend(StorageBackend):
+    """Хранилище на JSON-файлах (исходный формат проекта)
+
+    Если задан журнал сделок, portfolios.json служит контрольной точкой,
+    а изменения дописываются в журнал и периодически сворачиваются в неё.
+    """
+
+    def __init__(
+        self,
+        users_file: Path,
+        portfolios_file: Path,
+        journal: Optional[TradeJournal] = None,
+        compact_threshold_bytes: int = 1048576,
+        compact_interval_seconds: float = 60.0,
+    ) -> None:
+        self.users_file = users_file
+        self.portfolios_file = portfolios_file
+        utils.ensure_file_exists(str(self.users_file), "[]")
+        utils.ensure_file_exists(str(self.portfolios_file), "[]")
+        self._users_cache = JsonFileCache(self.users_file)
+        self._portfolios_cache = JsonFileCache(self.portfolios_file)
+        # Хеш-индексы поверх закешированных списков
+        self._indexed_users: Optional[List[Dict[str, Any]]] = None
+        self._users_by_name: Dict[str, Dict[str, Any]] = {}
+        self._next_user_id = 1
+        self._indexed_portfolios: Optional[List[Dict[str, Any]]] = None
+        self._portfolio_slots: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._journal = journal
+        self._compactor: Optional[JournalCompactor] = None
+        self._replayed_portfolios: Optional[List[Dict[str, Any]]] = None
+        self._journal_offset = 0
+        self._journal_inode = 0
+        if journal is not None:
+            self._compactor = JournalCompactor(
+                journal, self.compact, compact_threshold_bytes, compact_interval_seconds
+            )
+            self._compactor.start()
+        # Межпроцессная блокировка чтения-изменения-записи пользователей и портфелей
+        if journal is not None:
+            self._file_lock = journal.lock()
+        else:
+            self._file_lock = FileLock(Path(str(self.portfolios_file) + ".lock"))
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        return self._users_cache.load()
+
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        self._indexed_users = None
+        self._users_cache.save(users)
+
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            portfolios = self._portfolios_cache.load()
+            if self._journal is not None:
+                self._replay_journal(portfolios)
+            return portfolios
+
+    def _replay_journal(self, portfolios: List[Dict[str, Any]]) -> None:
+        """Применение журнала сделок поверх контрольной точки
+
+        К уже применённому журналу дочитывается только хвост, дописанный
+        с прошлого раза (в том числе другими процессами).
+        """
+        tail = None
+        if portfolios is self._replayed_portfolios:
+            tail = self._journal.read_from(self._journal_offset, self._journal_inode)
+        if tail is None:
+            # Новая контрольная точка или журнал сброшен: применяется целиком
+            tail = self._journal.read_from(0)
+        records, self._journal_offset, self._journal_inode = tail
+        if portfolios is self._indexed_portfolios:
+            slots = self._portfolio_slots
+        else:
+            slots = {p["user_id"]: i for i, p in enumerate(portfolios)}
+        by_id = {
+            record["user_id"]: portfolios[slots[record["user_id"]]]
+            for record in records
+            if record.get("user_id") in slots
+        }
+        for record in records:
+            created = apply_journal_record(by_id, record)
+            if created is not None:
+                slots[created["user_id"]] = len(portfolios)
+                portfolios.append(created)
+        self._replayed_portfolios = portfolios
+        self._portfolio_slots = slots
+        self._indexed_portfolios = portfolios
+
+    def save_portfolios(self, portfolios: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._indexed_portfolios = None
+            if self._journal is None:
+                self._portfolios_cache.save(portfolios)
+                return
+            with self._journal.lock():
+                self._portfolios_cache.save(portfolios)
+                # Полная запись сама является контрольной точкой, поэтому
+                # должна попасть на диск до сброса журнала даже в пакетном режиме
+                self._portfolios_cache.flush()
+                self._journal.reset()
+                self._replayed_portfolios = portfolios
+                self._journal_offset, self._journal_inode = self._journal.position()
+
+    def _user_index(self) -> Dict[str, Dict[str, Any]]:
+        """Индекс username -> запись, перестраиваемый при перечитывании файла"""
+        users = self.load_users()
+        if users is not self._indexed_users:
+            self._users_by_name = {u["username"]: u for u in users}
+            self._next_user_id = max((u["user_id"] for u in users), default=0) + 1
+            self._indexed_users = users
+        return self._users_by_name
+
+    def _portfolio_index(self) -> Dict[int, int]:
+        """Индекс user_id -> позиция портфеля в списке"""
+        portfolios = self.load_portfolios()
+        if portfolios is not self._indexed_portfolios:
+            self._portfolio_slots = {p["user_id"]: i for i, p in enumerate(portfolios)}
+            self._indexed_portfolios = portfolios
+        return self._portfolio_slots
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._user_index().get(username)
+
+    def add_user(self, user: Dict[str, Any]) -> None:
+        with self._lock, self._file_lock:
+            index = self._user_index()
+            users = self._indexed_users
+            users.append(user)
+            try:
+                self._users_cache.save(users)
+            except Exception:
+                self._indexed_users = None
+                raise
+            index[user["username"]] = user
+            self._next_user_id = max(self._next_user_id, user["user_id"] + 1)
+
+    def next_user_id(self) -> int:
+        with self._lock:
+            self._user_index()
+            return self._next_user_id
+
+    def create_user(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # users.json перечитывается под файловой блокировкой: имя и user_id
+        # проверяются по записям всех процессов
+        with self._lock, self._file_lock:
+            if user["username"] in self._user_index():
+                return None
+            user = dict(user, user_id=self._next_user_id)
+            self.add_user(user)
+            return user
+
+    def get_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            slot = self._portfolio_index().get(user_id)
+            return self._indexed_portfolios[slot] if slot is not None else None
+
+    def _put_portfolio(self, portfolio: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Вставка или замена портфеля в закешированном списке"""
+        slots = self._portfolio_index()
+        portfolios = self._indexed_portfolios
+        slot = slots.get(portfolio["user_id"])
+        if slot is None:
+            slots[portfolio["user_id"]] = len(portfolios)
+            portfolios.append(portfolio)
+        else:
+            portfolios[slot] = portfolio
+        return portfolios
+
+    def save_portfolio(self, portfolio: Dict[str, Any]) -> None:
+        # Чтение под файловой блокировкой применяет записи других процессов,
+        # поэтому запись не затирает их изменения
+        with self._lock, self._file_lock:
+            if self._journal is not None:
+                self._portfolio_index()
+                self._journal.append_portfolio(portfolio)
+                self._put_portfolio(portfolio)
+                self._journal_offset, self._journal_inode = self._journal.position()
+                return
+            portfolios = self._put_portfolio(portfolio)
+            try:
+                self._portfolios_cache.save(portfolios)
+            except Exception:
+                self._indexed_portfolios = None
+                raise
+
+    def set_wallet_balance(self, user_id: int, currency: str, balance: float) -> None:
+        with self._lock:
+            if self._journal is None:
+                portfolio = self.get_portfolio(user_id) or {"user_id": user_id, "wallets": {}}
+                portfolio["wallets"][currency] = {"balance": balance}
+                self.save_portfolio(portfolio)
+                return
+            with self._journal.lock():
+                portfolio = self.get_portfolio(user_id)
+                if portfolio is None:
+                    portfolio = {"user_id": user_id, "wallets": {}}
+                    self._put_portfolio(portfolio)
+                old_balance = portfolio["wallets"].get(currency, {}).get("balance", 0.0)
+                self._journal.append_trade(user_id, currency, balance - old_balance, balance)
+                portfolio["wallets"][currency] = {"balance": balance}
+                self._journal_offset, self._journal_inode = self._journal.position()
+
+    def adjust_wallet_balance(
+        self, user_id: int, currency: str, delta: float, min_balance: float = 0.0
+    ) -> Tuple[float, float]:
+        """Изменение баланса кошелька на delta; возвращает (старый, новый) баланс
+
+        Баланс читается и записывается под файловой блокировкой, поэтому
+        одновременные изменения из разных процессов не теряются.
+        """
+        with self._lock, self._file_lock:
+            portfolio = self.get_portfolio(user_id)
+            old_balance = portfolio["wallets"].get(currency, {}).get("balance", 0.0) if portfolio else 0.0
+            new_balance = old_balance + delta
+            if delta < 0 and new_balance < min_balance:
+                raise InsufficientFundsError(available=old_balance, required=-delta, code=currency)
+            if self._journal is None:
+                portfolio = portfolio or {"user_id": user_id, "wallets": {}}
+                portfolio["wallets"][currency] = {"balance": new_balance}
+                self.save_portfolio(portfolio)
+                return old_balance, new_balance
+            if portfolio is None:
+                portfolio = {"user_id": user_id, "wallets": {}}
+                self._put_portfolio(portfolio)
+            self._journal.append_trade(user_id, currency, delta, new_balance)
+            portfolio["wallets"][currency] = {"balance": new_balance}
+            self._journal_offset, self._journal_inode = self._journal.position()
+            return old_balance, new_balance
+
+    def begin(self) -> None:
+        self._users_cache.deferred = True
+        self._portfolios_cache.deferred = True
+
+    def commit(self) -> None:
+        with self._lock:
+            self._users_cache.deferred = False
+            self._portfolios_cache.deferred = False
+            self._users_cache.flush()
+            self._portfolios_cache.flush()
+            if self._journal is not None:
+                self._journal.flush()
+
+    def compact(self) -> None:
+        """Сворачивание журнала сделок в новую контрольную точку portfolios.json"""
+        if self._journal is None:
+            return
+        # Блокировка журнала удерживается от чтения до сброса: записи,
+        # дописанные другими процессами, попадают в контрольную точку
+        with self._lock, self._journal.lock():
+            portfolios = self.load_portfolios()
+            self._journal.flush()
+            self._portfolios_cache.save(portfolios)
+            # При begin() save() только помечает кеш изменённым: контрольная
+            # точка записывается явно, иначе reset() стёр бы единственную копию сделок
+            self._portfolios_cache.flush()
+            self._journal.reset()
+            self._replayed_portfolios = portfolios
+            self._journal_offset, self._journal_inode = self._journal.position()
+        logger.info(f"Журнал сделок свёрнут в контрольную точку (seq={self._journal.seq})")
+
+    def close(self, compact: bool = True) -> None:
+        if self._journal is None:
+            self._file_lock.close()
+            return
+        if self._compactor is not None:
+            self._compactor.stop()
+        if compact:
+            self.compact()
+        self._journal.close()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "users": self._users_cache.stats(),
+            "portfolios": self._portfolios_cache.stats(),
+        }
+
+
+class SqliteBackend(StorageBackend):
+    """Хранилище на SQLite (WAL) с индексами по пользователям и кошелькам"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            hashed_password TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            registration_date TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username);
+        CREATE TABLE IF NOT EXISTS portfolios (
+            user_id INTEGER PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS wallets (
+            user_id INTEGER NOT NULL,
+            currency TEXT NOT NULL,
+            balance REAL NOT NULL,
+            PRIMARY KEY (user_id, currency)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = db_file
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_file), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False) -> Iterator[None]:
+        """Транзакция; внутри группы записей (begin/commit) — точка сохранения
+
+        immediate — блокировка записи берётся сразу (BEGIN IMMEDIATE), чтобы
+        прочитанное в транзакции не изменил другой процесс до записи.
+        """
+        if self._conn.in_transaction:
+            self._conn.execute("SAVEPOINT sp")
+            try:
+                yield
+                self._conn.execute("RELEASE sp")
+            except Exception:
+                self._conn.execute("ROLLBACK TO sp")
+                self._conn.execute("RELEASE sp")
+                raise
+            return
+        self._conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def begin(self) -> None:
+        with self._lock:
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN")
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+
+    def _row_to_user(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "user_id": row["user_id"],
+            "username": row["username"],
+            "hashed_password": row["hashed_password"],
+            "salt": row["salt"],
+            "registration_date": row["registration_date"],
+        }
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM users ORDER BY user_id").fetchall()
+        return [self._row_to_user(row) for row in rows]
+
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            with self._transaction():
+                self._conn.execute("DELETE FROM users")
+                self._insert_users(users)
+
+    def _insert_users(self, users: List[Dict[str, Any]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO users (user_id, username, hashed_password, salt, registration_date) "
+            "VALUES (:user_id, :username, :hashed_password, :salt, :registration_date)",
+            users,
+        )
+
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT user_id FROM portfolios ORDER BY user_id")]
+            rows = self._conn.execute("SELECT user_id, currency, balance FROM wallets").fetchall()
+        portfolios = {user_id: {"user_id": user_id, "wallets": {}} for user_id in ids}
+        for row in rows:
+            portfolio = portfolios.setdefault(row["user_id"], {"user_id": row["user_id"], "wallets": {}})
+            portfolio["wallets"][row["currency"]] = {"balance": row["balance"]}
+        return list(portfolios.values())
+
+    def save_portfolios(self, portfolios: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            with self._transaction():
+                self._conn.execute("DELETE FROM wallets")
+                self._conn.execute("DELETE FROM portfolios")
+                self._insert_portfolios(portfolios)
+
+    def _insert_portfolios(self, portfolios: List[Dict[str, Any]]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO portfolios (user_id) VALUES (?)",
+            ((p["user_id"],) for p in portfolios),
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO wallets (user_id, currency, balance) VALUES (?, ?, ?)",
+            (
+                (p["user_id"], code, wallet["balance"])
+                for p in portfolios
+                for code, wallet in p.get("wallets", {}).items()
+            ),
+        )
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def add_user(self, user: Dict[str, Any]) -> None:
+        with self._lock:
+            self._insert_users([user])
+
+    def next_user_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(user_id) FROM users").fetchone()
+        return (row[0] or 0) + 1
+
+    def create_user(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # user_id назначает SQLite (INTEGER PRIMARY KEY) в той же вставке,
+        # уникальность имени проверяет индекс idx_users_username
+        with self._lock:
+            try:
+                with self._transaction():
+                    cursor = self._conn.execute(
+                        "INSERT INTO users (username, hashed_password, salt, registration_date) "
+                        "VALUES (:username, :hashed_password, :salt, :registration_date)",
+                        user,
+                    )
+            except sqlite3.IntegrityError:
+                return None
+        return dict(user, user_id=cursor.lastrowid)
+
+    def get_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM portfolios WHERE user_id = ?", (user_id,)).fetchone()
+            rows = self._conn.execute(
+                "SELECT currency, balance FROM wallets WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        if not exists and not rows:
+            return None
+        return {"user_id": user_id, "wallets": {row["currency"]: {"balance": row["balance"]} for row in rows}}
+
+    def save_portfolio(self, portfolio: Dict[str, Any]) -> None:
+        with self._lock:
+            with self._transaction():
+                self._conn.execute("DELETE FROM wallets WHERE user_id = ?", (portfolio["user_id"],))
+                self._insert_portfolios([portfolio])
+
+    def set_wallet_balance(self, user_id: int, currency: str, balance: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO wallets (user_id, currency, balance) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, currency) DO UPDATE SET balance = excluded.balance",
+                (user_id, currency, balance),
+            )
+
+    def adjust_wallet_balance(
+        self, user_id: int, currency: str, delta: float, min_balance: float = 0.0
+    ) -> Tuple[float, float]:
+        with self._lock:
+            with self._transaction(immediate=True):
+                row = self._conn.execute(
+                    "SELECT balance FROM wallets WHERE user_id = ? AND currency = ?", (user_id, currency)
+                ).fetchone()
+                old_balance = row[0] if row else 0.0
+                new_balance = old_balance + delta
+                if delta < 0 and new_balance < min_balance:
+                    raise InsufficientFundsError(available=old_balance, required=-delta, code=currency)
+                self._conn.execute(
+                    "INSERT INTO wallets (user_id, currency, balance) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id, currency) DO UPDATE SET balance = excluded.balance",
+                    (user_id, currency, new_balance),
+                )
+        return old_balance, new_balance
+
+    def iter_wallets(self) -> Iterator[Tuple[int, str, float]]:
+        with self._lock:
+            # Обычные кортежи вместо sqlite3.Row: их принимает np.fromiter при массовой оценке
+            cursor = self._conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute("SELECT user_id, currency, balance FROM wallets").fetchall()
+        return iter(rows)
+
+    def get_usernames(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT user_id, username FROM users WHERE user_id IN ({placeholders})", ids
+            ).fetchall()
+        return {row["user_id"]: row["username"] for row in rows}
+
+    def is_migrated(self) -> bool:
+        """Проверка, выполнялся ли перенос данных из JSON"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        return row is not None
+
+    def migrate_from_json(
+        self, users_file: Path, portfolios_file: Path, journal_file: Optional[Path] = None
+    ) -> int:
+        """Однократный перенос пользователей и портфелей из JSON-файлов
+
+        Несвёрнутый журнал сделок (journal_file) применяется поверх
+        portfolios.json, иначе сделки после последней контрольной точки
+        были бы потеряны.
+        """
+        if self.is_migrated():
+            return 0
+        users = utils.load_json_file(str(users_file)) if users_file.exists() else []
+        if journal_file is not None and journal_file.exists():
+            journal = TradeJournal(journal_file)
+            try:
+                with journal.lock():
+                    portfolios = utils.load_json_file(str(portfolios_file)) if portfolios_file.exists() else []
+                    by_id = {p["user_id"]: p for p in portfolios}
+                    records, _, _ = journal.read_from(0)
+                    for record in records:
+                        created = apply_journal_record(by_id, record)
+                        if created is not None:
+                            portfolios.append(created)
+            finally:
+                journal.close()
+            logger.info(f"Журнал сделок применён перед переносом в SQLite: {len(records)} записей")
+        else:
+            portfolios = utils.load_json_file(str(portfolios_file)) if portfolios_file.exists() else []
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO users (user_id, username, hashed_password, salt, registration_date) "
+                    "VALUES (:user_id, :username, :hashed_password, :salt, :registration_date)",
+                    users,
+                )
+                self._insert_portfolios(portfolios)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                    (f"users={len(users)} portfolios={len(portfolios)}",),
+                )
+        return len(users)
+
+    def close(self, compact: bool = True) -> None:
+        with self._lock:
+            self._conn.close()
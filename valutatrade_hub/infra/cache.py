@@ -0,0 +1,95 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from valutatrade_hub.core import utils
+
+
+class JsonFileCache:
+    """Кеш декодированного JSON-файла с инвалидацией по mtime и размеру
+
+    Возвращаемые данные разделяются между вызовами: изменять их можно
+    только перед последующим save(). При deferred = True save() только
+    обновляет копию в памяти, а запись на диск выполняет flush().
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data: Any = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.deferred = False
+        self._dirty = False
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> Any:
+        """Загрузка данных: из памяти, если файл не менялся, иначе с диска"""
+        with self._lock:
+            if self._dirty:
+                # Отложенные изменения ещё не записаны на диск
+                self.hits += 1
+                return self._data
+            signature = self._stat_signature()
+            if signature is not None and signature == self._signature:
+                self.hits += 1
+                return self._data
+            self.misses += 1
+            data = utils.load_json_file(str(self.path))
+            self._data = data
+            self._signature = signature
+            return data
+
+    def save(self, data: Any) -> None:
+        """Запись данных на диск с обновлением кеша"""
+        with self._lock:
+            if self.deferred:
+                self._data = data
+                self._dirty = True
+                return
+            self._write(data)
+
+    def _write(self, data: Any) -> None:
+        try:
+            utils.save_json_file(str(self.path), data)
+        except Exception:
+            self._signature = None
+            raise
+        self._data = data
+        self._signature = self._stat_signature()
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Запись отложенных изменений на диск"""
+        with self._lock:
+            if self._dirty:
+                self._write(self._data)
+
+    def prime(self, data: Any) -> None:
+        """Подстановка данных, только что записанных в файл другим компонентом
+
+        Следующая загрузка вернёт их без повторного чтения и разбора файла.
+        """
+        with self._lock:
+            if self._dirty:
+                return
+            self._data = data
+            self._signature = self._stat_signature()
+
+    def invalidate(self) -> None:
+        """Сброс кеша: следующая загрузка прочитает файл заново"""
+        with self._lock:
+            self._signature = None
+            self._data = None
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий и промахов"""
+        return {"hits": self.hits, "misses": self.misses}
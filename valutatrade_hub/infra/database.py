@@ -1,10 +1,18 @@
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
 from valutatrade_hub.core import utils
+from valutatrade_hub.core.currencies import SUPPORTED_CURRENCIES
+from valutatrade_hub.events import SNAPSHOT_COMMITTED, SnapshotCommitted, bus
+from valutatrade_hub.infra.backends import JsonBackend, SqliteBackend, StorageBackend
+from valutatrade_hub.infra.cache import JsonFileCache
+from valutatrade_hub.infra.journal import TradeJournal
 from valutatrade_hub.infra.settings import SettingsLoader
 
+if TYPE_CHECKING:
+    from valutatrade_hub.core.rate_matrix import RateMatrix
+
 
 class DatabaseManager:
     """Управление локальной БД"""
@@ -23,56 +31,176 @@ class DatabaseManager:
         self.users_file = Path(settings.get("users_file"))
         self.portfolios_file = Path(settings.get("portfolios_file"))
         self.rates_file = Path(settings.get("rates_file"))
+        self.backend = self._create_backend(settings)
+        self._rates_cache = JsonFileCache(self.rates_file)
+        # (снимок курсов, матрица) — заменяются вместе, чтобы потоки не видели несогласованную пару
+        self._rate_matrix_state: Optional[Tuple[Dict[str, Any], "RateMatrix"]] = None
+        # (снимок курсов, время last_refresh) для проверки TTL без повторного разбора
+        self._last_refresh_state: Optional[Tuple[Dict[str, Any], Optional[datetime]]] = None
         self._ensure_data_files()
+        # Новый снимок приходит событием: кеш и матрица обновляются без чтения файла
+        self._unsubscribe = bus.subscribe(SNAPSHOT_COMMITTED, self._on_snapshot_committed)
+
+    def _create_backend(self, settings: SettingsLoader) -> StorageBackend:
+        """Выбор хранилища пользователей и портфелей по параметру storage_backend"""
+        kind = settings.get("storage_backend", "json")
+        if kind == "json":
+            journal = None
+            if settings.get("trade_journal", True):
+                journal = TradeJournal(
+                    Path(settings.get("journal_file", "data/portfolios.journal")),
+                    fsync_batch=int(settings.get("journal_fsync_batch", 32)),
+                )
+            return JsonBackend(
+                self.users_file,
+                self.portfolios_file,
+                journal=journal,
+                compact_threshold_bytes=int(settings.get("journal_compact_bytes", 1048576)),
+                compact_interval_seconds=float(settings.get("journal_compact_interval", 60)),
+            )
+        if kind == "sqlite":
+            backend = SqliteBackend(Path(settings.get("sqlite_file", "data/valutatrade.db")))
+            # Однократный перенос данных из JSON при первом запуске
+            backend.migrate_from_json(
+                self.users_file,
+                self.portfolios_file,
+                Path(settings.get("journal_file", "data/portfolios.journal")),
+            )
+            return backend
+        raise ValueError(f"Неизвестное хранилище storage_backend: {kind}")
 
     def _ensure_data_files(self) -> None:
         """Создание файлов данных, если они отсутствуют"""
-        utils.ensure_file_exists(str(self.users_file), "[]")
-        utils.ensure_file_exists(str(self.portfolios_file), "[]")
         initial_rates = {
             "EUR_USD": {"rate": 1.0786, "updated_at": datetime.now().isoformat()},
             "BTC_USD": {"rate": 59337.21, "updated_at": datetime.now().isoformat()},
             "RUB_USD": {"rate": 0.01016, "updated_at": datetime.now().isoformat()},
             "ETH_USD": {"rate": 3720.00, "updated_at": datetime.now().isoformat()},
             "source": "ParserService",
-            "last_refresh": datetime.now().isoformat()
+            "last_refresh": datetime.now().isoformat(),
+            "version": 0,
         }
         if not self.rates_file.exists():
             utils.save_json_file(str(self.rates_file), initial_rates)
 
     def load_users(self) -> List[Dict[str, Any]]:
-        """Загрузка списка пользователей из файла"""
-        return utils.load_json_file(str(self.users_file))
+        """Загрузка списка пользователей"""
+        return self.backend.load_users()
 
     def save_users(self, users: List[Dict[str, Any]]) -> None:
-        """Сохранение списка пользователей в файл"""
-        utils.save_json_file(str(self.users_file), users)
+        """Сохранение списка пользователей"""
+        self.backend.save_users(users)
 
     def load_portfolios(self) -> List[Dict[str, Any]]:
-        """Загрузка списка портфелей из файла"""
-        return utils.load_json_file(str(self.portfolios_file))
+        """Загрузка списка портфелей"""
+        return self.backend.load_portfolios()
 
     def save_portfolios(self, portfolios: List[Dict[str, Any]]) -> None:
-        """Сохранение списка портфелей в файл"""
-        utils.save_json_file(str(self.portfolios_file), portfolios)
+        """Сохранение списка портфелей"""
+        self.backend.save_portfolios(portfolios)
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """Поиск пользователя по имени"""
+        return self.backend.get_user(username)
+
+    def add_user(self, user: Dict[str, Any]) -> None:
+        """Добавление нового пользователя"""
+        self.backend.add_user(user)
+
+    def next_user_id(self) -> int:
+        """Следующий свободный идентификатор пользователя"""
+        return self.backend.next_user_id()
+
+    def create_user(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Добавление пользователя с атомарно выделенным user_id; None — имя уже занято"""
+        return self.backend.create_user(user)
+
+    def get_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получение портфеля пользователя"""
+        return self.backend.get_portfolio(user_id)
+
+    def save_portfolio(self, portfolio: Dict[str, Any]) -> None:
+        """Сохранение одного портфеля"""
+        self.backend.save_portfolio(portfolio)
+
+    def set_wallet_balance(self, user_id: int, currency: str, balance: float) -> None:
+        """Изменение баланса одного кошелька без перезаписи остальных данных"""
+        self.backend.set_wallet_balance(user_id, currency, balance)
+
+    def adjust_wallet_balance(
+        self, user_id: int, currency: str, delta: float, min_balance: float = 0.0
+    ) -> Tuple[float, float]:
+        """Атомарное изменение баланса кошелька; возвращает (старый, новый) баланс"""
+        return self.backend.adjust_wallet_balance(user_id, currency, delta, min_balance)
+
+    def iter_wallets(self) -> Iterator[Tuple[int, str, float]]:
+        """Перебор всех кошельков: (user_id, валюта, баланс)"""
+        return self.backend.iter_wallets()
+
+    def get_usernames(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """Имена пользователей по списку идентификаторов"""
+        return self.backend.get_usernames(user_ids)
+
+    def begin(self) -> None:
+        """Начало группы записей (пакетный режим)"""
+        self.backend.begin()
+
+    def commit(self) -> None:
+        """Фиксация группы записей"""
+        self.backend.commit()
+
+    def close(self, compact: bool = True) -> None:
+        """Закрытие хранилища; compact=False оставляет журнал сделок как есть"""
+        self._unsubscribe()
+        self.backend.close(compact=compact)
+
+    def _on_snapshot_committed(self, event: SnapshotCommitted) -> None:
+        """Подстановка нового снимка в кеш курсов и перестроение матрицы"""
+        state = self._rate_matrix_state
+        if state is not None and state[1].version >= event.version:
+            return
+        from valutatrade_hub.core.rate_matrix import RateMatrix
+
+        self._rates_cache.prime(event.snapshot)
+        self._rate_matrix_state = (event.snapshot, RateMatrix.from_snapshot(event.snapshot, SUPPORTED_CURRENCIES))
 
     def load_rates(self) -> Dict[str, Any]:
-        """Загрузка текущих курсов валют из файла"""
-        return utils.load_json_file(str(self.rates_file))
+        """Загрузка текущих курсов валют (из памяти, если файл не менялся)"""
+        return self._rates_cache.load()
 
     def save_rates(self, rates: Dict[str, Any]) -> None:
         """Сохранение курсов валют в файл"""
-        utils.save_json_file(str(self.rates_file), rates)
+        self._rates_cache.save(rates)
+
+    def get_rate_matrix(self) -> "RateMatrix":
+        """Матрица кросс-курсов текущего снимка (перестраивается только при новом снимке)"""
+        rates = self.load_rates()
+        state = self._rate_matrix_state
+        if state is None or state[0] is not rates:
+            from valutatrade_hub.core.rate_matrix import RateMatrix
+
+            state = (rates, RateMatrix.from_snapshot(rates, SUPPORTED_CURRENCIES))
+            self._rate_matrix_state = state
+        return state[1]
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Счётчики попаданий и промахов кешей чтения"""
+        stats = {"rates": self._rates_cache.stats()}
+        stats.update(self.backend.cache_stats())
+        return stats
 
     def is_rates_cache_fresh(self, ttl_seconds: int) -> bool:
         """Проверка, не устарел ли кеш курсов"""
         rates = self.load_rates()
-        last_refresh_str = rates.get("last_refresh")
-        if not last_refresh_str:
-            return False
-        try:
-            last_refresh = datetime.fromisoformat(last_refresh_str)
-        except ValueError:
+        state = self._last_refresh_state
+        if state is None or state[0] is not rates:
+            try:
+                last_refresh = datetime.fromisoformat(rates.get("last_refresh") or "")
+            except ValueError:
+                last_refresh = None
+            state = (rates, last_refresh)
+            self._last_refresh_state = state
+        if state[1] is None:
             return False
         now = datetime.now()
-        return (now - last_refresh).total_seconds() < ttl_seconds
\ No newline at end of file
+        return (now - state[1]).total_seconds() < ttl_seconds
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: только блокировка внутри процесса
+    fcntl = None  # type: ignore[assignment]
+
+
+class FileLock:
+    """Реентерабельная блокировка между потоками и процессами
+
+    Внутри процесса — RLock, между процессами — fcntl.flock на отдельном
+    файле-замке, который никогда не заменяется (в отличие от защищаемого
+    файла, переписываемого через os.replace).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = -1
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd < 0:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except Exception:
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.infra.file_lock import FileLock
+
+logger = logging.getLogger("valutatrade")
+
+
+class TradeJournal:
+    """Журнал изменений портфелей в формате JSONL (только дозапись)
+
+    Каждая запись хранит изменение и новый баланс кошелька. Баланс
+    вычисляется под lock() после применения всех ранее дописанных записей,
+    поэтому порядок записей в файле совпадает с порядком изменений, и
+    последовательное применение журнала поверх контрольной точки
+    воспроизводит итоговое состояние (в том числе повторно).
+
+    Журнал может вести несколько процессов (REPL, API-сервер, однократные
+    команды): дозапись и сброс выполняются под файловой блокировкой
+    (lock()), номер записи перечитывается из хвоста файла, если его
+    дописал другой процесс, а после сброса журнала другим процессом
+    дескриптор открывается заново.
+    """
+
+    def __init__(self, path: Path, fsync_batch: int = 32) -> None:
+        self.path = path
+        self.fsync_batch = max(1, fsync_batch)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = FileLock(self.path.with_suffix(self.path.suffix + ".lock"))
+        self._unsynced = 0
+        with self._lock:
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._seq = self._last_seq()
+            self._known_size = self._file.tell()
+
+    def lock(self) -> FileLock:
+        """Блокировка журнала между потоками и процессами (реентерабельная)"""
+        return self._lock
+
+    def _last_seq(self) -> int:
+        """Последний номер записи в существующем журнале"""
+        last = 0
+        for record in self.replay():
+            last = max(last, record.get("seq", 0), record.get("checkpoint_seq", 0))
+        return last
+
+    def _tail_seq(self, size: int) -> int:
+        """Номер последней записи по хвосту файла"""
+        with open(self.path, "rb") as f:
+            f.seek(max(0, size - 4096))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(record, dict):
+                return max(record.get("seq", 0), record.get("checkpoint_seq", 0))
+        return self._last_seq()
+
+    def _sync_with_file(self) -> None:
+        """Учёт изменений журнала другими процессами (вызывается под lock)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != os.fstat(self._file.fileno()).st_ino:
+            # Журнал сброшен другим процессом: старый дескриптор указывает на удалённый файл
+            self._file.close()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._unsynced = 0
+            self._seq = max(self._seq, self._tail_seq(self._file.tell()))
+        elif st.st_size != self._known_size:
+            self._seq = max(self._seq, self._tail_seq(st.st_size))
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        with self._lock:
+            self._sync_with_file()
+            self._seq += 1
+            record["seq"] = self._seq
+            record["ts"] = datetime.now().isoformat()
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            self._known_size = self._file.tell()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+            return self._seq
+
+    def append_trade(self, user_id: int, currency: str, delta: float, balance: float) -> int:
+        """Запись изменения баланса одного кошелька"""
+        return self._write({
+            "user_id": user_id,
+            "currency": currency,
+            "delta": delta,
+            "balance": balance,
+        })
+
+    def append_portfolio(self, portfolio: Dict[str, Any]) -> int:
+        """Запись портфеля целиком (создание или замена)"""
+        return self._write({"user_id": portfolio["user_id"], "wallets": portfolio["wallets"]})
+
+    def flush(self) -> None:
+        """Принудительный сброс накопленных записей на диск"""
+        with self._lock:
+            if self._unsynced:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def position(self) -> Tuple[int, int]:
+        """Смещение конца журнала и inode файла (вызывается под lock)"""
+        return self._known_size, os.fstat(self._file.fileno()).st_ino
+
+    def size(self) -> int:
+        """Текущий размер журнала в байтах"""
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Последовательное чтение записей журнала"""
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная последняя строка после сбоя
+                    logger.warning(f"Журнал сделок: пропущена повреждённая запись в {self.path}")
+
+    def read_from(self, offset: int = 0, inode: Optional[int] = None) -> Optional[Tuple[List[Dict[str, Any]], int, int]]:
+        """Чтение записей, дописанных начиная со смещения offset
+
+        Возвращает записи, смещение после последней полной строки и inode
+        файла либо None, если файл inode заменён сбросом журнала.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return ([], 0, 0) if inode is None else None
+        with f:
+            st = os.fstat(f.fileno())
+            if inode is not None and (st.st_ino != inode or st.st_size < offset):
+                return None
+            f.seek(offset)
+            data = f.read()
+        # Недописанная строка не учитывается: её дочитают при следующем вызове
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.warning(f"Журнал сделок: пропущена повреждённая запись в {self.path}")
+        return records, offset + end, st.st_ino
+
+    def reset(self) -> None:
+        """Очистка журнала после записи контрольной точки
+
+        Вызывающий должен держать lock() с момента чтения журнала для
+        контрольной точки, иначе записи других процессов будут потеряны.
+        """
+        with self._lock:
+            self._sync_with_file()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"checkpoint_seq": self._seq}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._known_size = self._file.tell()
+            self._unsynced = 0
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._file.close()
+        self._lock.close()
+
+
+def apply_journal_record(portfolios_by_id: Dict[int, Dict[str, Any]], record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Применение записи журнала к портфелям; возвращает созданный портфель"""
+    user_id = record.get("user_id")
+    if user_id is None:
+        return None
+    created = None
+    portfolio = portfolios_by_id.get(user_id)
+    if portfolio is None:
+        portfolio = {"user_id": user_id, "wallets": {}}
+        portfolios_by_id[user_id] = portfolio
+        created = portfolio
+    if "wallets" in record:
+        portfolio["wallets"] = record["wallets"]
+    else:
+        portfolio["wallets"][record["currency"]] = {"balance": record["balance"]}
+    return created
+
+
+class JournalCompactor:
+    """Фоновое сворачивание журнала в новую контрольную точку"""
+
+    def __init__(
+        self,
+        journal: TradeJournal,
+        compact: Callable[[], None],
+        threshold_bytes: int,
+        interval_seconds: float,
+    ) -> None:
+        self.journal = journal
+        self.compact = compact
+        self.threshold_bytes = threshold_bytes
+        self.interval = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.journal.flush()
+                if self.journal.size() >= self.threshold_bytes:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Журнал сделок: ошибка при сжатии — {e}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
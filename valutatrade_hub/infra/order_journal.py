@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from valutatrade_hub.infra.file_lock import FileLock
+
+logger = logging.getLogger("valutatrade")
+
+
+class OrderJournal:
+    """Журнал отложенных ордеров в формате JSONL (только дозапись)
+
+    Записи: {"op": "place", "order": {...}} и {"op": "close", "id": ...,
+    "status": filled|cancelled|rejected}. Открытые ордера восстанавливаются
+    повторением журнала; когда закрытых записей становится больше открытых,
+    журнал переписывается одними открытыми ордерами (первая запись
+    {"op": "meta", "last_id": ...} сохраняет нумерацию).
+
+    Журнал общий для процессов (REPL, API-сервер, однократные команды):
+    операция с книгой ордеров выполняется целиком под lock().
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = FileLock(self.path.with_suffix(self.path.suffix + ".lock"))
+        self._closed_records = 0
+        self.last_id = 0
+        self._signature: Optional[Tuple[int, int]] = None
+
+    def lock(self) -> FileLock:
+        """Блокировка журнала между потоками и процессами (реентерабельная)"""
+        return self._lock
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed_externally(self) -> bool:
+        """Файл изменён другим процессом после последнего чтения или записи"""
+        return self._stat_signature() != self._signature
+
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        """Открытые ордера по идентификатору"""
+        orders: Dict[int, Dict[str, Any]] = {}
+        closed = 0
+        last_id = 0
+        with self._lock:
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Журнал ордеров: пропущена повреждённая запись в {self.path}")
+                            continue
+                        if record.get("op") == "place":
+                            orders[record["order"]["order_id"]] = record["order"]
+                            last_id = max(last_id, record["order"]["order_id"])
+                        elif record.get("op") == "meta":
+                            last_id = max(last_id, record["last_id"])
+                        elif record.get("op") == "close":
+                            orders.pop(record["id"], None)
+                            closed += 1
+            self._closed_records = closed
+            self.last_id = last_id
+            self._signature = self._stat_signature()
+        return orders
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Дозапись группы записей одной операцией"""
+        lines = []
+        for record in records:
+            record = dict(record, ts=datetime.now().isoformat())
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            if record["op"] == "close":
+                self._closed_records += 1
+            elif record["op"] == "place":
+                self.last_id = max(self.last_id, record["order"]["order_id"])
+        if not lines:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._signature = self._stat_signature()
+
+    def needs_compaction(self, open_count: int) -> bool:
+        return self._closed_records > max(open_count, 1000)
+
+    def rewrite(self, open_orders: Iterable[Dict[str, Any]]) -> None:
+        """Замена журнала записями только открытых ордеров"""
+        with self._lock:
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"op": "meta", "last_id": self.last_id}) + "\n")
+                for order in open_orders:
+                    f.write(json.dumps({"op": "place", "order": order}, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._closed_records = 0
+            self._signature = self._stat_signature()
@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from valutatrade_hub.core.exceptions import UserError
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _write_private(path: Path, data: str) -> None:
+    """Атомарная запись файла, доступного только владельцу"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# Минимальная длина ключа подписи (32 шестнадцатеричных символа — 128 бит)
+MIN_SECRET_LENGTH = 32
+
+
+def _create_key_file(path: Path, data: str) -> bool:
+    """Создание файла ключа, только если его ещё нет; False — ключ уже создан другим процессом
+
+    Ключ пишется во временный файл с уникальным именем и появляется под
+    итоговым именем атомарно (os.link не заменяет существующий файл),
+    поэтому другой процесс не может прочитать его пустым или недописанным.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            return False
+        return True
+    finally:
+        os.unlink(tmp)
+
+
+def _check_secret(secret: bytes, source: str) -> bytes:
+    if len(secret) < MIN_SECRET_LENGTH:
+        raise UserError(
+            f"Ключ подписи сессий ({source}) пуст или короче {MIN_SECRET_LENGTH} символов"
+        )
+    return secret
+
+
+class SessionTokenStore:
+    """Подписанный токен сессии для однократных команд
+
+    Токен имеет вид <payload>.<подпись>: payload — JSON с user_id, username
+    и сроком действия exp, подпись — HMAC-SHA256 секретным ключом. Ключ
+    берётся из переменной VALUTATRADE_SESSION_SECRET, параметра session_secret
+    или создаётся один раз в файле session_key_file.
+    """
+
+    def __init__(
+        self,
+        token_file: Optional[Path] = None,
+        key_file: Optional[Path] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        settings = SettingsLoader()
+        self.token_file = token_file or Path(settings.get("session_file", "data/session.token"))
+        self.key_file = key_file or Path(settings.get("session_key_file", "data/session.key"))
+        self.ttl_seconds = int(ttl_seconds if ttl_seconds is not None else settings.get("session_ttl_seconds", 3600))
+        self._secret: Optional[bytes] = None
+
+    def _get_secret(self) -> bytes:
+        """Секретный ключ подписи (создаётся при первом обращении)"""
+        if self._secret is not None:
+            return self._secret
+        if os.environ.get("VALUTATRADE_SESSION_SECRET"):
+            self._secret = _check_secret(os.environ["VALUTATRADE_SESSION_SECRET"].encode(), "VALUTATRADE_SESSION_SECRET")
+            return self._secret
+        secret = SettingsLoader().get("session_secret")
+        if secret:
+            self._secret = _check_secret(secret.encode(), "session_secret")
+            return self._secret
+        if not self.key_file.exists():
+            # При одновременном первом запуске ключ сохраняет только один процесс,
+            # остальные читают его из файла
+            _create_key_file(self.key_file, secrets.token_hex(32))
+        secret_bytes = self.key_file.read_text(encoding="utf-8").strip().encode()
+        self._secret = _check_secret(secret_bytes, str(self.key_file))
+        return self._secret
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._get_secret(), payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, user_id: int, username: str) -> str:
+        """Создание токена и сохранение его на диск"""
+        now = int(time.time())
+        claims = {"uid": user_id, "sub": username, "iat": now, "exp": now + self.ttl_seconds}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        token = f"{payload}.{self._sign(payload)}"
+        _write_private(self.token_file, token)
+        return token
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Проверка подписи и срока действия; возвращает данные токена"""
+        try:
+            payload, signature = token.strip().split(".", 1)
+        except ValueError:
+            raise UserError("Недействительный токен сессии. Выполните login")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise UserError("Недействительный токен сессии. Выполните login")
+        claims = json.loads(_b64decode(payload))
+        if claims["exp"] <= time.time():
+            raise UserError("Сессия истекла. Выполните login")
+        return claims
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Данные сохранённого токена или None, если вход не выполнялся"""
+        try:
+            token = self.token_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        return self.verify(token)
+
+    def clear(self) -> bool:
+        """Удаление сохранённого токена; True, если он был"""
+        try:
+            self.token_file.unlink()
+            return True
+        except FileNotFoundError:
+            return False
@@ -1,14 +1,166 @@
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import Callable, List, Optional
+
 from valutatrade_hub.infra.settings import SettingsLoader
 
+# logging.handlers (вместе с socket и pickle) заметно удлиняет запуск, поэтому
+# очередь реализована здесь, а файловый обработчик создаётся в фоновом потоке
+
+
+class BoundedQueueHandler(logging.Handler):
+    """Постановка записей в ограниченную очередь без ожидания диска
+
+    При переполнении действует политика overflow: drop — отбросить новую
+    запись, drop_oldest — вытеснить самую старую, block — подождать
+    освобождения места не дольше block_timeout секунд.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop", block_timeout: float = 0.05) -> None:
+        super().__init__()
+        if overflow not in ("drop", "drop_oldest", "block"):
+            raise ValueError(f"Неизвестная политика переполнения log_overflow: {overflow}")
+        self.queue = log_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Копия записи с готовым текстом сообщения (как в logging.handlers.QueueHandler)"""
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        try:
+            if self.overflow == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            if self.overflow == "drop_oldest":
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                except queue.Empty:
+                    pass
+                self.queue.put_nowait(record)
+                return
+        except queue.Full:
+            pass
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _QueueListener:
+    """Фоновый поток, передающий записи из очереди обработчикам
+
+    Обработчики создаются фабрикой уже в потоке: импорт файлового
+    обработчика не задерживает запуск приложения. Если фабрика не смогла
+    создать их (файл журнала недоступен), записи выводятся в stderr, чтобы
+    очередь продолжала разбираться и stop() не зависал.
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.Queue, handler_factory: Callable[[], List[logging.Handler]]) -> None:
+        self.queue = log_queue
+        self.handlers: List[logging.Handler] = []
+        self._handler_factory = handler_factory
+        self._thread = threading.Thread(target=self._monitor, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _create_handlers(self) -> List[logging.Handler]:
+        try:
+            return self._handler_factory()
+        except Exception as e:
+            sys.stderr.write(f"Журнал: не удалось открыть файл журнала ({e!r}), записи выводятся в stderr\n")
+            return [logging.StreamHandler(sys.stderr)]
+
+    def _monitor(self) -> None:
+        self.handlers = self._create_handlers()
+        while True:
+            record = self.queue.get()
+            try:
+                if record is self._sentinel:
+                    return
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Запись оставшихся сообщений и завершение потока (не дольше timeout секунд)"""
+        if self._thread.is_alive():
+            try:
+                self.queue.put(self._sentinel, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Поток не успел разобрать очередь: обработчики ещё используются
+            return
+        for handler in self.handlers:
+            handler.close()
+
+
+# Фоновый поток, пишущий записи из очереди в файл
+_listener: Optional[_QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Структурированный журнал: одна JSON-запись на строку
+
+    Поля действия (action, user, currency, amount, rate, result, duration_ms
+    и т. д.) берутся из extra={"fields": {...}}, которые передаёт log_action.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        else:
+            entry["message"] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 
 def setup_logging() -> None:
-    """Настройка логирования"""
+    """Настройка логирования: запись в файл выполняется фоновым потоком"""
+    global _listener
     settings = SettingsLoader()
     log_file = Path(settings.get("log_file", "logs/actions.log"))
-    
+
     # Создание директории
     log_file.parent.mkdir(parents=True, exist_ok=True)
 
@@ -16,22 +168,63 @@ def setup_logging() -> None:
     logger.setLevel(getattr(logging, settings.get("log_level", "INFO")))
 
     # Очистка
+    shutdown_logging()
     if logger.handlers:
         logger.handlers.clear()
 
-    # Файловый обработчик
-    handler = RotatingFileHandler(
-        log_file,
-        maxBytes=int(settings.get("log_max_bytes", 5242880)),
-        backupCount=int(settings.get("log_backup_count", 3)),
-        encoding="utf-8"
-    )
-    log_format = settings.get("log_format", "%(levelname)s %(asctime)s %(message)s")
-    formatter = logging.Formatter(log_format, datefmt="%Y-%m-%dT%H:%M:%S")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    if settings.get("log_json", False):
+        formatter: logging.Formatter = JsonLinesFormatter(datefmt="%Y-%m-%dT%H:%M:%S")
+    else:
+        log_format = settings.get("log_format", "%(levelname)s %(asctime)s %(message)s")
+        formatter = logging.Formatter(log_format, datefmt="%Y-%m-%dT%H:%M:%S")
+
+    def create_handlers() -> List[logging.Handler]:
+        # Файловый обработчик (работает в фоновом потоке)
+        from logging.handlers import RotatingFileHandler
+
+        handler = RotatingFileHandler(
+            log_file,
+            maxBytes=int(settings.get("log_max_bytes", 5242880)),
+            backupCount=int(settings.get("log_backup_count", 3)),
+            encoding="utf-8"
+        )
+        handler.setFormatter(formatter)
+        return [handler]
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(settings.get("log_queue_size", 10000)))
+    logger.addHandler(BoundedQueueHandler(log_queue, settings.get("log_overflow", "drop")))
+    _listener = _QueueListener(log_queue, create_handlers)
+    _listener.start()
 
     # Вывод логов в консоль
    # console = logging.StreamHandler()
    # console.setFormatter(formatter)
-   # logger.addHandler(console)
\ No newline at end of file
+   # logger.addHandler(console)
+
+
+def flush_logging(timeout: float = 2.0) -> None:
+    """Ожидание записи всех сообщений, уже поставленных в очередь"""
+    listener = _listener
+    if listener is None:
+        return
+    deadline = time.monotonic() + timeout
+    while listener.queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.001)
+    for handler in listener.handlers:
+        handler.flush()
+
+
+def shutdown_logging() -> None:
+    """Запись оставшихся в очереди сообщений и остановка фонового потока"""
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger("valutatrade")
+    dropped = sum(h.dropped for h in logger.handlers if isinstance(h, BoundedQueueHandler))
+    if dropped:
+        logger.warning(f"Журнал: из-за переполнения очереди отброшено записей: {dropped}")
+    listener, _listener = _listener, None
+    listener.stop()
+
+
+atexit.register(shutdown_logging)
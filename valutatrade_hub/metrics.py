@@ -0,0 +1,166 @@
+import os
+import threading
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Границы корзин гистограммы задержек, в секундах (как у Prometheus, от 50 мкс до 10 с)
+BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами: O(log k) на замер, без хранения выборки"""
+
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)  # последняя корзина — +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class MetricsRegistry:
+    """Счётчики и гистограммы задержек по действиям log_action"""
+
+    def __init__(self) -> None:
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._results: Counter = Counter()  # (действие, ok|error)
+        self._errors: Counter = Counter()  # (действие, тип ошибки)
+        self._lock = threading.Lock()
+
+    def observe(self, action: str, seconds: float, error_type: Optional[str] = None) -> None:
+        """Замер одного выполнения действия"""
+        with self._lock:
+            histogram = self._histograms.get(action)
+            if histogram is None:
+                histogram = self._histograms[action] = LatencyHistogram()
+            histogram.observe(seconds)
+            if error_type is None:
+                self._results[action, "ok"] += 1
+            else:
+                self._results[action, "error"] += 1
+                self._errors[action, error_type] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Сводка по действиям: число вызовов, ошибки, квантили задержки в мс"""
+        with self._lock:
+            result = {}
+            for action, h in sorted(self._histograms.items()):
+                result[action] = {
+                    "count": h.count,
+                    "ok": self._results[action, "ok"],
+                    "error": self._results[action, "error"],
+                    "errors": {t: n for (a, t), n in self._errors.items() if a == action},
+                    "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": h.quantile(0.50) * 1000,
+                    "p95_ms": h.quantile(0.95) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                    "max_ms": h.max * 1000,
+                }
+            return result
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines: List[str] = [
+            "# HELP valutatrade_action_duration_seconds Длительность действий",
+            "# TYPE valutatrade_action_duration_seconds histogram",
+        ]
+        with self._lock:
+            for action, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + (float("inf"),), h.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'valutatrade_action_duration_seconds_bucket{{action="{action}",le="{le}"}} {cumulative}')
+                lines.append(f'valutatrade_action_duration_seconds_sum{{action="{action}"}} {h.total!r}')
+                lines.append(f'valutatrade_action_duration_seconds_count{{action="{action}"}} {h.count}')
+
+            lines.append("# HELP valutatrade_actions_total Выполненные действия по результату")
+            lines.append("# TYPE valutatrade_actions_total counter")
+            for (action, result), n in sorted(self._results.items()):
+                lines.append(f'valutatrade_actions_total{{action="{action}",result="{result}"}} {n}')
+
+            lines.append("# HELP valutatrade_action_errors_total Ошибки действий по типу")
+            lines.append("# TYPE valutatrade_action_errors_total counter")
+            for (action, error_type), n in sorted(self._errors.items()):
+                lines.append(f'valutatrade_action_errors_total{{action="{action}",error_type="{error_type}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._results.clear()
+            self._errors.clear()
+
+
+# Общий реестр процесса
+registry = MetricsRegistry()
+
+
+class PrometheusFileExporter:
+    """Периодическая запись метрик в файл (для node_exporter textfile collector)"""
+
+    def __init__(self, path: Path, interval_seconds: float = 15.0, metrics: MetricsRegistry = registry) -> None:
+        self.path = path
+        self.interval = interval_seconds
+        self.metrics = metrics
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> None:
+        """Атомарная запись текущих метрик"""
+        import tempfile
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=self.path.parent) as tmp:
+            tmp.write(self.metrics.to_prometheus())
+        os.replace(tmp.name, self.path)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановка с финальной записью"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        try:
+            self.write()
+        except OSError:
+            pass
@@ -3,12 +3,28 @@ from abc import ABC, abstractmethod
 from typing import Dict
 
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.http_client import CachedHttpClient, get_http_client
 from valutatrade_hub.core.exceptions import ApiRequestError
 
 
+def _is_retryable(error: Exception) -> bool:
+    """Временная ли ошибка запроса: сеть, таймаут, 5xx, 408 и 429 — да, прочие 4xx — нет"""
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.HTTPError) and response is not None:
+        return response.status_code >= 500 or response.status_code in (408, 429)
+    return True
+
+
 class BaseApiClient(ABC):
+    # Отображаемое имя источника и ключ для update-rates --source
+    name: str = ""
+    key: str = ""
+
     def __init__(self, config: ParserConfig):
         self.config = config
+        self.http: CachedHttpClient = get_http_client(
+            config.HTTP_CACHE_DIR, config.REQUEST_TIMEOUT, config.HTTP_POOL_SIZE
+        )
 
     @abstractmethod
     def fetch_rates(self) -> Dict[str, float]:
@@ -16,17 +32,18 @@ class BaseApiClient(ABC):
 
 
 class CoinGeckoClient(BaseApiClient):
+    name = "CoinGecko"
+    key = "coingecko"
+
     def fetch_rates(self) -> Dict[str, float]:
         ids = ",".join(self.config.CRYPTO_ID_MAP[code] for code in self.config.CRYPTO_CURRENCIES)
         vs_currencies = self.config.BASE_CURRENCY.lower()
         url = f"{self.config.COINGECKO_URL}?ids={ids}&vs_currencies={vs_currencies}"
 
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
-        except requests.RequestException as e:
-            raise ApiRequestError(f"Ошибка сети при запросе к CoinGecko: {e}")
+            data = self.http.get_json(url, self.name)
+        except (requests.RequestException, ValueError) as e:
+            raise ApiRequestError(f"Ошибка сети при запросе к CoinGecko: {e}", retryable=_is_retryable(e))
 
         rates = {}
         for code in self.config.CRYPTO_CURRENCIES:
@@ -38,21 +55,25 @@ class CoinGeckoClient(BaseApiClient):
 
 
 class ExchangeRateApiClient(BaseApiClient):
+    name = "ExchangeRate-API"
+    key = "exchangerate"
+
     def __init__(self, config: ParserConfig):
         super().__init__(config)
         if not self.config.EXCHANGERATE_API_KEY:
-            raise ApiRequestError("API-ключ для ExchangeRate-API не задан (EXCHANGERATE_API_KEY)")
+            raise ApiRequestError("API-ключ для ExchangeRate-API не задан (EXCHANGERATE_API_KEY)", retryable=False)
 
     def fetch_rates(self) -> Dict[str, float]:
         url = f"{self.config.EXCHANGERATE_API_URL}/{self.config.EXCHANGERATE_API_KEY}/latest/{self.config.BASE_CURRENCY}"
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
+            data = self.http.get_json(url, self.name)
             if data.get("result") != "success":
-                raise ApiRequestError(f"ExchangeRate-API ошибка: {data.get('error-type', 'неизвестно')}")
-        except requests.RequestException as e:
-            raise ApiRequestError(f"Ошибка сети: {e}")
+                # Ответ получен, но отклонён (invalid-key, quota-reached и т. п.): повтор не поможет
+                raise ApiRequestError(
+                    f"ExchangeRate-API ошибка: {data.get('error-type', 'неизвестно')}", retryable=False
+                )
+        except (requests.RequestException, ValueError) as e:
+            raise ApiRequestError(f"Ошибка сети: {e}", retryable=_is_retryable(e))
 
 
         rates = {}
@@ -0,0 +1,269 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.core import utils
+
+logger = logging.getLogger("valutatrade")
+
+# Запись фиксированной ширины: epoch-ns, id пары, курс, id источника (20 байт)
+RECORD = struct.Struct("<qHdH")
+_TIMESTAMP = struct.Struct("<q")
+
+
+def to_epoch_ns(timestamp: str) -> int:
+    """Перевод ISO-метки времени в наносекунды от эпохи"""
+    return round(datetime.fromisoformat(timestamp).timestamp() * 1_000_000) * 1000
+
+
+class IdDictionary:
+    """Компактный словарь имя <-> числовой id (для пар и источников)"""
+
+    def __init__(self, names: Optional[Dict[str, int]] = None) -> None:
+        self.ids: Dict[str, int] = dict(names or {})
+        self.names: Dict[int, str] = {i: name for name, i in self.ids.items()}
+
+    def get_id(self, name: str) -> Tuple[int, bool]:
+        """Id имени и признак того, что оно добавлено только что"""
+        if name in self.ids:
+            return self.ids[name], False
+        new_id = len(self.ids) + 1
+        self.ids[name] = new_id
+        self.names[new_id] = name
+        return new_id, True
+
+
+class _TimestampView:
+    """Последовательность меток времени поверх mmap (для bisect)"""
+
+    def __init__(self, mm: mmap.mmap, count: int) -> None:
+        self._mm = mm
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return _TIMESTAMP.unpack_from(self._mm, i * RECORD.size)[0]
+
+
+class BinarySeries:
+    """Замеры одной пары из файла записей фиксированной ширины через mmap"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        """Переотображение файла, если он вырос"""
+        size = os.stat(self.path).st_size if self.path.exists() else 0
+        count = size // RECORD.size
+        if count == self._count and (self._mm is not None or count == 0):
+            return
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._count = count
+        if count:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def bisect_left(self, ts: float) -> int:
+        with self._lock:
+            self._refresh()
+            if not self._count:
+                return 0
+            return bisect_left(_TimestampView(self._mm, self._count), round(ts * 1e9))
+
+    def bisect_right(self, ts: float) -> int:
+        with self._lock:
+            self._refresh()
+            if not self._count:
+                return 0
+            return bisect_right(_TimestampView(self._mm, self._count), round(ts * 1e9))
+
+    def item(self, i: int) -> Tuple[float, float]:
+        with self._lock:
+            ts_ns, _, rate, _ = RECORD.unpack_from(self._mm, i * RECORD.size)
+        return ts_ns / 1e9, rate
+
+    def slice(self, lo: int, hi: int) -> List[Tuple[float, float]]:
+        """Замеры [lo, hi) без копирования буфера файла"""
+        with self._lock:
+            self._refresh()
+            hi = min(hi, self._count)
+            if lo >= hi:
+                return []
+            with memoryview(self._mm) as view:
+                chunk = view[lo * RECORD.size:hi * RECORD.size]
+                try:
+                    return [(ts_ns / 1e9, rate) for ts_ns, _, rate, _ in RECORD.iter_unpack(chunk)]
+                finally:
+                    chunk.release()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+                self._count = 0
+
+
+class BinaryHistoryStore:
+    """История курсов в бинарных файлах по парам (<PAIR>.bin) со словарём id"""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dictionary_path = directory / "dictionary.json"
+        data = utils.load_json_file(str(self.dictionary_path)) if self.dictionary_path.exists() else {}
+        self.pair_ids = IdDictionary(data.get("pairs"))
+        self.source_ids = IdDictionary(data.get("sources"))
+        self._series: Dict[str, BinarySeries] = {}
+        self._lock = threading.Lock()
+
+    def _pair_path(self, pair: str) -> Path:
+        return self.directory / f"{pair}.bin"
+
+    def _save_dictionary(self) -> None:
+        utils.save_json_file(
+            str(self.dictionary_path),
+            {"pairs": self.pair_ids.ids, "sources": self.source_ids.ids},
+        )
+
+    def is_empty(self) -> bool:
+        return not any(self.directory.glob("*.bin"))
+
+    def pairs(self) -> List[str]:
+        """Пары, по которым есть история"""
+        return sorted(path.stem for path in self.directory.glob("*.bin"))
+
+    def append(self, records: Iterable[Dict[str, Any]], sync: bool = False) -> Dict[Path, int]:
+        """Дозапись записей в файлы пар; возвращает исходные размеры файлов для отката"""
+        packed: Dict[str, bytearray] = {}
+        with self._lock:
+            dictionary_changed = False
+            for record in records:
+                pair = f"{record['from_currency']}_{record['to_currency']}"
+                pair_id, new_pair = self.pair_ids.get_id(pair)
+                source_id, new_source = self.source_ids.get_id(record.get("source", ""))
+                dictionary_changed = dictionary_changed or new_pair or new_source
+                packed.setdefault(pair, bytearray()).extend(
+                    RECORD.pack(to_epoch_ns(record["timestamp"]), pair_id, float(record["rate"]), source_id)
+                )
+            if dictionary_changed:
+                self._save_dictionary()
+
+            position: Dict[Path, int] = {}
+            for pair, data in packed.items():
+                path = self._pair_path(pair)
+                with open(path, "ab") as f:
+                    position[path] = f.tell()
+                    f.write(data)
+                    if sync:
+                        f.flush()
+                        os.fsync(f.fileno())
+        return position
+
+    def rollback(self, position: Dict[Path, int]) -> None:
+        """Откат незафиксированной записи"""
+        with self._lock:
+            for path, offset in position.items():
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+
+    def recover(self, snapshot: Dict[str, Any], committed_version: Optional[int] = None) -> Optional[int]:
+        """Отсечение записей новее снимка (остались после сбоя между записями)
+
+        Записи не хранят версию, поэтому граница берётся по updated_at пар
+        снимка, а версия истории неизвестна (None).
+        """
+        for pair in self.pairs():
+            info = snapshot.get(pair)
+            limit = to_epoch_ns(info["updated_at"]) if isinstance(info, dict) else None
+            path = self._pair_path(pair)
+            size = path.stat().st_size
+            count = size // RECORD.size
+            with open(path, "r+b") as f:
+                keep = count
+                while keep > 0 and limit is not None:
+                    f.seek((keep - 1) * RECORD.size)
+                    ts_ns = _TIMESTAMP.unpack(f.read(_TIMESTAMP.size))[0]
+                    if ts_ns <= limit:
+                        break
+                    keep -= 1
+                if keep * RECORD.size != size:
+                    f.truncate(keep * RECORD.size)
+                    logger.warning(f"История курсов: отброшены незафиксированные записи {pair}")
+        return None
+
+    def series(self, pair: str) -> Optional[BinarySeries]:
+        """Отображённый в память ряд замеров пары"""
+        path = self._pair_path(pair)
+        if not path.exists():
+            return None
+        with self._lock:
+            if pair not in self._series:
+                self._series[pair] = BinarySeries(path)
+            return self._series[pair]
+
+    def iter_records(self, pair: Optional[str] = None, chunk_records: int = 4096) -> Iterator[Dict[str, Any]]:
+        """Потоковое чтение записей в формате exchange_rates.json"""
+        for name in ([pair] if pair else self.pairs()):
+            path = self._pair_path(name)
+            if not path.exists():
+                continue
+            from_curr, to_curr = name.split("_")
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(RECORD.size * chunk_records)
+                    if len(data) < RECORD.size:
+                        break
+                    for ts_ns, _, rate, source_id in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+                        timestamp = datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+                        yield {
+                            "id": f"{name}_{timestamp}",
+                            "from_currency": from_curr,
+                            "to_currency": to_curr,
+                            "rate": rate,
+                            "timestamp": timestamp,
+                            "source": self.source_ids.names.get(source_id, ""),
+                        }
+
+    def close(self) -> None:
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+
+def import_records(store: BinaryHistoryStore, records: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+    """Перенос записей истории (из JSONL или JSON-массива) в бинарный формат
+
+    Записи должны идти в хронологическом порядке.
+    """
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            store.append(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        store.append(batch)
+        total += len(batch)
+    return total
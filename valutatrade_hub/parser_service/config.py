@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass, field
-from typing import Tuple, Dict
+from typing import Dict, Optional, Tuple
 
 
 def _default_crypto_id_map() -> Dict[str, str]:
@@ -22,9 +22,15 @@ class ParserConfig:
     # Ключ загружается из переменной окружения
     EXCHANGERATE_API_KEY: str = os.getenv("EXCHANGERATE_API_KEY", "")
 
-    # Эндпоинты
-    COINGECKO_URL: str = " https://api.coingecko.com/api/v3/simple/price"
-    EXCHANGERATE_API_URL: str = "https://v6.exchangerate-api.com/v6"
+    # Эндпоинты (переопределяются, например, для локального mock_server)
+    COINGECKO_URL: str = os.getenv("VALUTATRADE_COINGECKO_URL", " https://api.coingecko.com/api/v3/simple/price")
+    EXCHANGERATE_API_URL: str = os.getenv("VALUTATRADE_EXCHANGERATE_URL", "https://v6.exchangerate-api.com/v6")
+
+    # Источник курсов: live (внешние API), replay (записанная история) или random (случайное блуждание)
+    RATES_SOURCE: str = os.getenv("VALUTATRADE_RATES_SOURCE", "live")
+    OFFLINE_SPEED: float = float(os.getenv("VALUTATRADE_OFFLINE_SPEED", "1.0"))  # <= 0: шаг на каждый запрос
+    OFFLINE_VOLATILITY: float = 0.0005  # за секунду модельного времени
+    OFFLINE_SEED: Optional[int] = None
 
     # Списки валют
     BASE_CURRENCY: str = "USD"
@@ -34,7 +40,29 @@ class ParserConfig:
 
     # Пути к файлам
     RATES_FILE_PATH: str = "data/rates.json"
-    HISTORY_FILE_PATH: str = "data/exchange_rates.json"
+    HISTORY_FILE_PATH: str = "data/exchange_rates.json"  # устаревший формат (JSON-массив)
+    HISTORY_DIR: str = "data/history"
+    HISTORY_SEGMENT_MAX_BYTES: int = 4 * 1024 * 1024
+    HISTORY_BINARY_DIR: str = "data/history_bin"
+
+    # Формат истории: jsonl (сегменты) или binary (записи фиксированной ширины)
+    HISTORY_FORMAT: str = os.getenv("VALUTATRADE_HISTORY_FORMAT", "jsonl")
 
     # Сетевые параметры
-    REQUEST_TIMEOUT: int = 10
\ No newline at end of file
+    REQUEST_TIMEOUT: int = 10  # таймаут одного запроса к источнику
+    UPDATE_DEADLINE: float = 15.0  # общий срок одного цикла обновления
+    HTTP_CACHE_DIR: str = "data/http_cache"  # кеш ответов (ETag / Last-Modified / Cache-Control)
+    HTTP_POOL_SIZE: int = 4
+
+    # Повторы и предохранитель источников
+    RETRY_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 4.0
+    BREAKER_FAILURE_THRESHOLD: int = 3  # неудачных циклов подряд до размыкания
+    BREAKER_RESET_TIMEOUT: float = 300.0  # через сколько секунд пробовать снова
+
+    # Расписание планировщика
+    SCHEDULER_MIN_INTERVAL: float = 30.0  # нижняя граница интервала источника
+    SCHEDULER_JITTER: float = 0.1  # случайный сдвиг срока, доля интервала
+    SCHEDULER_TTL_FRACTION: float = 0.8  # доля rates_ttl_seconds, за которую снимок обновляется с учётом сдвига
+    SCHEDULER_RETRY_DELAY: float = 10.0  # первая задержка повтора после ошибки
\ No newline at end of file
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("valutatrade")
+
+
+class HistorySegments:
+    """История курсов в виде JSONL-сегментов, доступных только для дозаписи
+
+    Сегменты называются history-YYYYMMDD-NNNN.jsonl и ротируются при смене
+    дня или при превышении max_segment_bytes.
+    """
+
+    PREFIX = "history-"
+    SUFFIX = ".jsonl"
+
+    def __init__(self, directory: Path, max_segment_bytes: int = 4194304) -> None:
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def segments(self) -> List[Path]:
+        """Список сегментов в хронологическом порядке"""
+        return sorted(self.directory.glob(f"{self.PREFIX}*{self.SUFFIX}"))
+
+    def _segment_name(self, day: str, number: int) -> Path:
+        return self.directory / f"{self.PREFIX}{day}-{number:04d}{self.SUFFIX}"
+
+    def _current_segment(self, incoming_bytes: int, day: str) -> Path:
+        """Сегмент для записи с учётом ротации по дню и размеру"""
+        day_segments = sorted(self.directory.glob(f"{self.PREFIX}{day}-*{self.SUFFIX}"))
+        if not day_segments:
+            return self._segment_name(day, 1)
+        last = day_segments[-1]
+        size = last.stat().st_size
+        if size > 0 and size + incoming_bytes > self.max_segment_bytes:
+            return self._segment_name(day, int(last.stem.rsplit("-", 1)[1]) + 1)
+        return last
+
+    def append(
+        self, records: Iterable[Dict[str, Any]], sync: bool = False, day: Optional[str] = None
+    ) -> Tuple[Path, int]:
+        """Дозапись записей в сегмент дня (по умолчанию текущего) одной операцией записи
+
+        Возвращает сегмент и смещение, с которого начались новые записи.
+        """
+        payload = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records
+        )
+        data = payload.encode("utf-8")
+        with self._lock:
+            segment = self._current_segment(len(data), day or datetime.now().strftime("%Y%m%d"))
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        return segment, offset
+
+    def truncate(self, segment: Path, offset: int) -> None:
+        """Отсечение сегмента до указанного смещения (откат незафиксированной записи)"""
+        with self._lock:
+            with open(segment, "r+b") as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def rollback(self, position: Tuple[Path, int]) -> None:
+        """Откат незафиксированной записи"""
+        self.truncate(*position)
+
+    def recover(self, snapshot: Dict[str, Any], committed_version: Optional[int] = None) -> Optional[int]:
+        """Отсечение хвоста, записанного без последующей фиксации снимка
+
+        Отсекаются только записи единственного незафиксированного пакета
+        (версия committed_version + 1). Если версия неизвестна или история
+        опережает её сильнее, снимок был заменён извне, и история не трогается.
+        Возвращает последнюю версию, оставшуюся в истории.
+        """
+        segments = self.segments()
+        if not segments:
+            return None
+        if committed_version is None:
+            logger.warning("История курсов: версия снимка неизвестна, проверка незафиксированных записей пропущена")
+            return None
+        last = segments[-1]
+        offset = 0
+        cut = None
+        last_version = 0
+        with open(last, "rb") as f:
+            for line in f:
+                try:
+                    record_version = json.loads(line).get("version", 0)
+                    last_version = max(last_version, record_version)
+                except json.JSONDecodeError:
+                    # Недописанная строка после сбоя
+                    record_version = committed_version + 1
+                if cut is None and record_version > committed_version:
+                    cut = offset
+                offset += len(line)
+        if cut is None:
+            return last_version
+        if last_version > committed_version + 1:
+            logger.warning(
+                f"История курсов: версия {last_version} в {last.name} опережает зафиксированную "
+                f"{committed_version}, записи сохранены"
+            )
+            return last_version
+        self.truncate(last, cut)
+        logger.warning(f"История курсов: отброшены незафиксированные записи из {last.name}")
+        return committed_version
+
+    def iter_records(self, pair: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Ленивое чтение записей из всех сегментов по порядку"""
+        for segment in self.segments():
+            with open(segment, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка после сбоя
+                        continue
+                    if pair is None or f"{record['from_currency']}_{record['to_currency']}" == pair:
+                        yield record
+
+    def read_since(self, cursor: Optional[Tuple[str, int]]) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """Чтение записей, появившихся после позиции cursor (имя сегмента, смещение)
+
+        Возвращает новые записи и позицию для следующего вызова.
+        """
+        records: List[Dict[str, Any]] = []
+        for segment in self.segments():
+            if cursor is not None and segment.name < cursor[0]:
+                continue
+            offset = cursor[1] if cursor is not None and segment.name == cursor[0] else 0
+            with open(segment, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Строка ещё дописывается
+                        break
+                    offset += len(line)
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            cursor = (segment.name, offset)
+        return records, cursor
+
+
+def convert_legacy_history(legacy_path: Path, segments: HistorySegments, batch_size: int = 10000) -> int:
+    """Перенос истории из JSON-массива exchange_rates.json в JSONL-сегменты"""
+    if not legacy_path.exists():
+        return 0
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        history = json.load(f)
+    history.sort(key=lambda record: record["timestamp"])
+    for day, day_records in groupby(history, key=lambda record: record["timestamp"][:10].replace("-", "")):
+        day_records = list(day_records)
+        for start in range(0, len(day_records), batch_size):
+            segments.append(day_records[start:start + batch_size], day=day)
+    legacy_path.rename(legacy_path.with_suffix(legacy_path.suffix + ".bak"))
+    return len(history)
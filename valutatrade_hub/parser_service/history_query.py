@@ -0,0 +1,155 @@
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from valutatrade_hub.parser_service.binary_history import BinaryHistoryStore, BinarySeries
+from valutatrade_hub.parser_service.storage import RatesStorage
+
+
+@dataclass
+class Candle:
+    """Свеча OHLC за один интервал"""
+    start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int
+
+
+class _PairSeries:
+    """Отсортированные по времени замеры одной пары"""
+
+    def __init__(self) -> None:
+        self.timestamps: List[float] = []
+        self.rates: List[float] = []
+
+    def add(self, ts: float, rate: float) -> None:
+        if not self.timestamps or ts >= self.timestamps[-1]:
+            self.timestamps.append(ts)
+            self.rates.append(rate)
+            return
+        # Редкий случай: запись пришла не по порядку
+        i = bisect_right(self.timestamps, ts)
+        self.timestamps.insert(i, ts)
+        self.rates.insert(i, rate)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def bisect_left(self, ts: float) -> int:
+        return bisect_left(self.timestamps, ts)
+
+    def bisect_right(self, ts: float) -> int:
+        return bisect_right(self.timestamps, ts)
+
+    def item(self, i: int) -> Tuple[float, float]:
+        return self.timestamps[i], self.rates[i]
+
+    def slice(self, lo: int, hi: int) -> List[Tuple[float, float]]:
+        return list(zip(self.timestamps[lo:hi], self.rates[lo:hi]))
+
+
+def parse_interval(value: str) -> int:
+    """Разбор интервала свечей: число секунд или 15m / 1h / 1d"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    value = value.strip().lower()
+    if value and value[-1] in units:
+        number, multiplier = value[:-1], units[value[-1]]
+    else:
+        number, multiplier = value, 1
+    seconds = int(number) * multiplier
+    if seconds <= 0:
+        raise ValueError("Интервал должен быть положительным")
+    return seconds
+
+
+class RateHistory:
+    """Запросы к истории курсов по времени
+
+    Для JSONL-истории индекс по каждой паре хранит отсортированные метки
+    времени и дочитывает только новые записи. Бинарная история уже
+    отсортирована на диске и читается через mmap без построения индекса.
+    В обоих случаях поиск выполняется бинарным поиском.
+    """
+
+    def __init__(self, storage: RatesStorage) -> None:
+        self.storage = storage
+        self._series: Dict[str, _PairSeries] = {}
+        self._cursor: Optional[Tuple[str, int]] = None
+        self._lock = threading.Lock()
+        self._binary = storage.history if isinstance(storage.history, BinaryHistoryStore) else None
+
+    def refresh(self) -> None:
+        """Дочитывание новых записей истории в индекс"""
+        if self._binary is not None:
+            return
+        with self._lock:
+            records, self._cursor = self.storage.history.read_since(self._cursor)
+            for record in records:
+                pair = f"{record['from_currency']}_{record['to_currency']}"
+                ts = datetime.fromisoformat(record["timestamp"]).timestamp()
+                self._series.setdefault(pair, _PairSeries()).add(ts, float(record["rate"]))
+
+    def pairs(self) -> List[str]:
+        """Пары, по которым есть история"""
+        if self._binary is not None:
+            return self._binary.pairs()
+        self.refresh()
+        return sorted(self._series)
+
+    def _get_series(self, pair: str) -> Optional[Union[_PairSeries, BinarySeries]]:
+        if self._binary is not None:
+            return self._binary.series(pair)
+        self.refresh()
+        return self._series.get(pair)
+
+    def rate_at(self, pair: str, ts: datetime) -> Optional[Tuple[datetime, float]]:
+        """Последний известный курс на момент ts"""
+        series = self._get_series(pair)
+        if series is None:
+            return None
+        i = series.bisect_right(ts.timestamp()) - 1
+        if i < 0:
+            return None
+        sample_ts, rate = series.item(i)
+        return datetime.fromtimestamp(sample_ts), rate
+
+    def range(self, pair: str, start: datetime, end: datetime) -> List[Tuple[datetime, float]]:
+        """Все замеры пары в интервале [start, end]"""
+        series = self._get_series(pair)
+        if series is None:
+            return []
+        lo = series.bisect_left(start.timestamp())
+        hi = series.bisect_right(end.timestamp())
+        return [(datetime.fromtimestamp(ts), rate) for ts, rate in series.slice(lo, hi)]
+
+    def candles(
+        self,
+        pair: str,
+        interval_seconds: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Candle]:
+        """Свечи OHLC с шагом interval_seconds"""
+        series = self._get_series(pair)
+        if series is None or not len(series):
+            return []
+        lo = series.bisect_left(start.timestamp()) if start else 0
+        hi = series.bisect_right(end.timestamp()) if end else len(series)
+
+        candles: List[Candle] = []
+        bucket = None
+        for ts, rate in series.slice(lo, hi):
+            key = int(ts // interval_seconds) * interval_seconds
+            if key != bucket:
+                bucket = key
+                candles.append(Candle(datetime.fromtimestamp(key), rate, rate, rate, rate, 0))
+            candle = candles[-1]
+            candle.high = max(candle.high, rate)
+            candle.low = min(candle.low, rate)
+            candle.close = rate
+            candle.count += 1
+        return candles
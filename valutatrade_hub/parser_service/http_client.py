@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class SourceStats:
+    """Счётчики обращений к одному источнику"""
+    requests: int = 0
+    bytes_received: int = 0
+    cache_hits: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    last_latency: float = 0.0
+    max_age: Optional[int] = None
+
+    @property
+    def avg_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+
+def _parse_cache_control(header: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in header.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, value = part.partition("=")
+        directives[name.strip()] = value.strip().strip('"') or None
+    return directives
+
+
+class CachedHttpClient:
+    """Общий HTTP-клиент с пулом соединений и кешем ответов на диске
+
+    Учитывает Cache-Control (max-age, no-cache, no-store): пока ответ свежий,
+    сеть не используется; после устаревания выполняется условный запрос
+    с If-None-Match / If-Modified-Since, и ответ 304 возвращает данные из кеша.
+    """
+
+    def __init__(self, cache_dir: Path, timeout: float, pool_size: int = 4) -> None:
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats: Dict[str, SourceStats] = {}
+        self._lock = threading.Lock()
+
+    def _entry_path(self, url: str) -> Path:
+        # В URL может быть API-ключ, поэтому на диске хранится только хеш
+        return self.cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _load_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        path = self._entry_path(url)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=self.cache_dir) as tmp:
+            json.dump(entry, tmp, ensure_ascii=False)
+        os.replace(tmp.name, path)
+
+    def _source_stats(self, source: str) -> SourceStats:
+        with self._lock:
+            return self._stats.setdefault(source, SourceStats())
+
+    def _expires_at(self, response: requests.Response, stats: SourceStats) -> float:
+        directives = _parse_cache_control(response.headers.get("Cache-Control", ""))
+        if "no-cache" in directives or "no-store" in directives:
+            stats.max_age = 0
+            return 0.0
+        try:
+            max_age = int(directives.get("max-age") or 0)
+        except ValueError:
+            max_age = 0
+        stats.max_age = max_age
+        return time.time() + max_age
+
+    def get_json(self, url: str, source: str) -> Any:
+        """GET с учётом кеша; бросает requests.RequestException при ошибке сети"""
+        stats = self._source_stats(source)
+        entry = self._load_entry(url)
+        if entry is not None and time.time() < entry.get("expires_at", 0):
+            with self._lock:
+                stats.cache_hits += 1
+            return entry["body"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.RequestException:
+            with self._lock:
+                stats.errors += 1
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                stats.requests += 1
+                stats.total_latency += latency
+                stats.last_latency = latency
+
+        with self._lock:
+            stats.bytes_received += len(response.content)
+        expires_at = self._expires_at(response, stats)
+
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                stats.not_modified += 1
+            entry["expires_at"] = expires_at
+            self._save_entry(url, entry)
+            return entry["body"]
+
+        body = response.json()
+        if "no-store" not in _parse_cache_control(response.headers.get("Cache-Control", "")):
+            self._save_entry(url, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "expires_at": expires_at,
+                "body": body,
+            })
+        return body
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Счётчики по источникам: запросы, байты, попадания в кеш, задержка"""
+        with self._lock:
+            return {
+                source: dict(asdict(s), avg_latency=s.avg_latency)
+                for source, s in self._stats.items()
+            }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_shared_client: Optional[CachedHttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client(cache_dir: str, timeout: float, pool_size: int = 4) -> CachedHttpClient:
+    """Общий для всех источников долгоживущий HTTP-клиент"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = CachedHttpClient(Path(cache_dir), timeout, pool_size)
+        return _shared_client
@@ -0,0 +1,173 @@
+"""Локальная замена CoinGecko и ExchangeRate-API для офлайн-запуска и нагрузочных замеров
+
+Запуск: python -m valutatrade_hub.parser_service.mock_server [--port 8765]
+Затем приложение направляется на сервер переменными окружения:
+VALUTATRADE_COINGECKO_URL=http://127.0.0.1:8765/api/v3/simple/price
+VALUTATRADE_EXCHANGERATE_URL=http://127.0.0.1:8765/v6
+EXCHANGERATE_API_KEY=offline
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.offline import RandomWalk, seed_rates
+
+
+class MockRatesServer:
+    """HTTP-сервер с ответами в форматах обоих источников
+
+    Курсы сдвигаются случайным блужданием не чаще раза в tick секунд;
+    ответы содержат ETag, Last-Modified и Cache-Control: max-age, так что
+    клиент проходит те же ветки кеша, что и с настоящими источниками.
+    """
+
+    def __init__(self, config: ParserConfig, host: str = "127.0.0.1", port: int = 0,
+                 tick: float = 1.0, max_age: int = 0) -> None:
+        self.config = config
+        self.tick = tick
+        self.max_age = max_age
+        self.walk = RandomWalk(seed_rates(config), config.OFFLINE_VOLATILITY, config.OFFLINE_SEED)
+        self.requests = 0
+        self._rates = dict(self.walk.rates)
+        self._version = 0
+        self._ticked_at = time.monotonic()
+        self._modified_at = time.time()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _current_rates(self) -> Tuple[Dict[str, float], int, float]:
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._ticked_at >= self.tick:
+                self._rates = self.walk.step(now - self._ticked_at)
+                self._ticked_at = now
+                self._modified_at = time.time()
+                self._version += 1
+            return self._rates, self._version, self._modified_at
+
+    def coingecko_body(self, rates: Dict[str, float], query: Dict[str, Any]) -> Dict[str, Any]:
+        base = self.config.BASE_CURRENCY
+        ids = query.get("ids", [""])[0].split(",")
+        vs = query.get("vs_currencies", [base.lower()])[0].lower()
+        by_id = {coin_id: code for code, coin_id in self.config.CRYPTO_ID_MAP.items()}
+        body = {}
+        for coin_id in ids:
+            pair = f"{by_id.get(coin_id, '')}_{base}"
+            if pair in rates and vs == base.lower():
+                body[coin_id] = {vs: round(rates[pair], 2)}
+        return body
+
+    def exchangerate_body(self, rates: Dict[str, float], base: str, modified_at: float) -> Dict[str, Any]:
+        if base != self.config.BASE_CURRENCY:
+            return {"result": "error", "error-type": "unsupported-code"}
+        conversion = {base: 1}
+        for code in self.config.FIAT_CURRENCIES:
+            pair = f"{code}_{base}"
+            if pair in rates:
+                conversion[code] = round(1.0 / rates[pair], 6)
+        return {
+            "result": "success",
+            "base_code": base,
+            "time_last_update_unix": int(modified_at),
+            "time_last_update_utc": formatdate(modified_at, usegmt=True),
+            "conversion_rates": conversion,
+        }
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело уходят одним пакетом, без задержки Nagle
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: Optional[Dict[str, Any]] = None,
+                      headers: Optional[Dict[str, str]] = None) -> None:
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/")
+                rates, version, modified_at = server._current_rates()
+
+                if parsed.path.rstrip("/") == "/api/v3/simple/price":
+                    body = server.coingecko_body(rates, parse_qs(parsed.query))
+                elif len(parts) == 4 and parts[0] == "v6" and parts[2] == "latest":
+                    body = server.exchangerate_body(rates, parts[3].upper(), modified_at)
+                else:
+                    self._send(404, {"error": "not found"})
+                    return
+
+                etag = '"' + hashlib.sha1(f"{parsed.path}?{parsed.query}:{version}".encode()).hexdigest() + '"'
+                headers = {
+                    "ETag": etag,
+                    "Last-Modified": formatdate(modified_at, usegmt=True),
+                    "Cache-Control": f"max-age={server.max_age}",
+                }
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, headers=headers)
+                else:
+                    self._send(200, body, headers)
+
+        return Handler
+
+    def start(self) -> "MockRatesServer":
+        """Запуск сервера в фоновом потоке"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-rates", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный сервер курсов в форматах CoinGecko и ExchangeRate-API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=1.0, help="как часто меняются курсы, с")
+    parser.add_argument("--max-age", type=int, default=0, help="значение Cache-Control: max-age")
+    args = parser.parse_args()
+
+    server = MockRatesServer(ParserConfig(), args.host, args.port, args.tick, args.max_age)
+    print(f"Сервер курсов: {server.url}")
+    print(f"VALUTATRADE_COINGECKO_URL={server.url}/api/v3/simple/price")
+    print(f"VALUTATRADE_EXCHANGERATE_URL={server.url}/v6")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
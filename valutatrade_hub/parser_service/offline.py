@@ -0,0 +1,159 @@
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.parser_service.api_clients import BaseApiClient
+from valutatrade_hub.parser_service.config import ParserConfig
+
+# Начальные курсы (USD за единицу валюты), если сохранённых курсов нет
+DEFAULT_RATES: Dict[str, float] = {
+    "BTC": 60000.0,
+    "ETH": 3000.0,
+    "SOL": 150.0,
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "RUB": 0.011,
+}
+
+
+def seed_rates(config: ParserConfig) -> Dict[str, float]:
+    """Начальные курсы пар CODE_BASE: из rates.json, иначе значения по умолчанию"""
+    from valutatrade_hub.parser_service.storage import RatesStorage
+
+    snapshot = RatesStorage(config).load_snapshot()
+    rates = {}
+    for code in config.CRYPTO_CURRENCIES + config.FIAT_CURRENCIES:
+        pair = f"{code}_{config.BASE_CURRENCY}"
+        info = snapshot.get(pair)
+        if isinstance(info, dict) and info.get("rate"):
+            rates[pair] = float(info["rate"])
+        else:
+            rates[pair] = DEFAULT_RATES.get(code, 1.0)
+    return rates
+
+
+class RandomWalk:
+    """Синтетические курсы: геометрическое случайное блуждание по каждой паре
+
+    volatility — стандартное отклонение логарифма курса за одну секунду
+    модельного времени; seed делает ряд воспроизводимым.
+    """
+
+    def __init__(self, rates: Dict[str, float], volatility: float, seed: Optional[int] = None) -> None:
+        self.rates = dict(rates)
+        self.volatility = volatility
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def step(self, dt: float = 1.0) -> Dict[str, float]:
+        """Сдвиг всех курсов на dt секунд модельного времени"""
+        sigma = self.volatility * math.sqrt(max(dt, 0.0))
+        with self._lock:
+            for pair, rate in self.rates.items():
+                self.rates[pair] = rate * math.exp(self._random.gauss(-sigma * sigma / 2, sigma))
+            return dict(self.rates)
+
+
+class _SimulatedClock:
+    """Модельное время: speed секунд за секунду реального; speed <= 0 — один шаг на вызов"""
+
+    def __init__(self, speed: float) -> None:
+        self.speed = speed
+        self._started = time.monotonic()
+        self._last = 0.0
+        self._calls = 0
+
+    def advance(self) -> Tuple[float, float]:
+        """Текущее модельное время и прирост с прошлого вызова"""
+        self._calls += 1
+        if self.speed <= 0:
+            now = float(self._calls)
+        else:
+            now = (time.monotonic() - self._started) * self.speed
+        delta, self._last = now - self._last, now
+        return now, delta
+
+
+class RandomWalkClient(BaseApiClient):
+    """Офлайн-источник синтетических курсов для тестов и нагрузочных замеров"""
+
+    name = "RandomWalk"
+    key = "random"
+
+    def __init__(self, config: ParserConfig):
+        super().__init__(config)
+        self.walk = RandomWalk(seed_rates(config), config.OFFLINE_VOLATILITY, config.OFFLINE_SEED)
+        self.clock = _SimulatedClock(config.OFFLINE_SPEED)
+
+    def fetch_rates(self) -> Dict[str, float]:
+        _, delta = self.clock.advance()
+        return self.walk.step(delta)
+
+
+class ReplayClient(BaseApiClient):
+    """Офлайн-источник, воспроизводящий записанную историю курсов
+
+    Замеры группируются по моменту записи; при speed > 0 возвращается
+    кадр, соответствующий модельному времени, при speed <= 0 — следующий
+    кадр на каждый вызов. По окончании истории воспроизведение идёт по кругу.
+    """
+
+    name = "Replay"
+    key = "replay"
+
+    def __init__(self, config: ParserConfig):
+        super().__init__(config)
+        self.frames = self._load_frames(config)
+        if not self.frames:
+            raise ApiRequestError("История курсов пуста — воспроизводить нечего")
+        self.clock = _SimulatedClock(config.OFFLINE_SPEED)
+        self._position = -1
+        self._state: Dict[str, float] = {}
+
+    @staticmethod
+    def _load_frames(config: ParserConfig) -> List[Tuple[float, Dict[str, float]]]:
+        from valutatrade_hub.parser_service.storage import RatesStorage
+
+        records = sorted(RatesStorage(config).iter_history(), key=lambda r: r["timestamp"])
+        frames = []
+        for timestamp, group in groupby(records, key=lambda r: r["timestamp"]):
+            moment = datetime.fromisoformat(timestamp).timestamp()
+            frames.append((moment, {f"{r['from_currency']}_{r['to_currency']}": float(r["rate"]) for r in group}))
+        return frames
+
+    def _frame_index(self, now: float) -> int:
+        if self.clock.speed <= 0:
+            return (self._position + 1) % len(self.frames)
+        start = self.frames[0][0]
+        span = self.frames[-1][0] - start
+        target = start + (now % span if span > 0 else 0.0)
+        index = self._position if self._position >= 0 else 0
+        if self.frames[index][0] > target:
+            index = 0  # начался новый круг
+        while index + 1 < len(self.frames) and self.frames[index + 1][0] <= target:
+            index += 1
+        return index
+
+    def fetch_rates(self) -> Dict[str, float]:
+        now, _ = self.clock.advance()
+        index = self._frame_index(now)
+        if index < self._position:
+            self._state, first = {}, 0
+        else:
+            first = self._position + 1
+        for i in range(first, index + 1):
+            self._state.update(self.frames[i][1])
+        self._position = index
+        return dict(self._state)
+
+
+def create_offline_client(config: ParserConfig) -> BaseApiClient:
+    """Офлайн-источник по config.RATES_SOURCE (replay или random)"""
+    if config.RATES_SOURCE == "replay":
+        return ReplayClient(config)
+    return RandomWalkClient(config)
@@ -0,0 +1,137 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.parser_service.api_clients import BaseApiClient
+from valutatrade_hub.parser_service.config import ParserConfig
+
+logger = logging.getLogger("valutatrade")
+
+
+class CircuitBreaker:
+    """Предохранитель источника: closed -> open после серии ошибок -> half_open по таймеру
+
+    В half_open к источнику пропускается ровно один пробный запрос; его
+    результат замыкает или снова размыкает предохранитель.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Можно ли обращаться к источнику (в half_open — только первому вызвавшему)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probing = False
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Через сколько секунд предохранитель перейдёт в half_open"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        return {"state": state, "failures": self._failures, "retry_after": round(self.retry_after(), 1)}
+
+
+class ResilientClient(BaseApiClient):
+    """Обёртка клиента: повторы с экспоненциальной задержкой и джиттером + предохранитель
+
+    Повторяются только временные ошибки (ApiRequestError.retryable) и только
+    пока попытка успевает завершиться до срока цикла обновления; пробный
+    запрос в half_open выполняется один раз.
+    """
+
+    def __init__(self, inner: BaseApiClient, config: ParserConfig) -> None:
+        super().__init__(config)
+        self.inner = inner
+        self.name = inner.name
+        self.key = inner.key
+        self.http = inner.http
+        self.breaker = CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT)
+
+    def _backoff(self, attempt: int) -> float:
+        """Задержка перед повтором (full jitter)"""
+        cap = min(self.config.RETRY_MAX_DELAY, self.config.RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def fetch_rates(self, deadline: Optional[float] = None) -> Dict[str, float]:
+        """Получение курсов; deadline — срок цикла обновления по time.monotonic()"""
+        if not self.breaker.allow():
+            raise ApiRequestError(
+                f"{self.name} временно отключён после серии ошибок "
+                f"(повтор через {self.breaker.retry_after():.0f} с)"
+            )
+        attempts = 1 if self.breaker.state == CircuitBreaker.HALF_OPEN else self.config.RETRY_ATTEMPTS
+        last_error: ApiRequestError = ApiRequestError(f"{self.name}: нет попыток")
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    delay = self._backoff(attempt - 1)
+                    # Повтор, не успевающий до срока цикла, только занял бы поток
+                    if deadline is not None and time.monotonic() + delay + self.config.REQUEST_TIMEOUT > deadline:
+                        break
+                    time.sleep(delay)
+                try:
+                    rates = self.inner.fetch_rates()
+                except ApiRequestError as e:
+                    last_error = e
+                    logger.warning(f"{self.name}: попытка {attempt + 1}/{attempts} не удалась — {e}")
+                    if not e.retryable:
+                        break
+                    continue
+                self.breaker.record_success()
+                return rates
+        except Exception:
+            # Непредвиденная ошибка клиента тоже считается неудачей (и завершает пробу half_open)
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_failure()
+        if self.breaker.state == CircuitBreaker.OPEN:
+            logger.error(f"{self.name}: предохранитель разомкнут на {self.config.BREAKER_RESET_TIMEOUT} с")
+        raise last_error
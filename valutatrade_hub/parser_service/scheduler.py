@@ -1,6 +1,12 @@
+import random
 import threading
-from typing import Optional
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.logging_config import flush_logging
 from valutatrade_hub.parser_service.updater import RatesUpdater
 from valutatrade_hub.parser_service.config import ParserConfig
 import logging
@@ -8,44 +14,176 @@ import logging
 logger = logging.getLogger("valutatrade")
 
 
+@dataclass
+class SourceSchedule:
+    """Расписание и статистика обновлений одного источника"""
+    key: str
+    name: str
+    interval: float
+    next_due: float = 0.0  # time.monotonic()
+    last_run: Optional[str] = None
+    last_duration: float = 0.0
+    last_count: int = 0
+    last_error: Optional[str] = None
+    runs: int = 0
+    failures: int = 0  # неудачных запусков подряд
+    running: bool = False
+
+
 class RatesScheduler:
-    """Планировщик периодического обновления курсов валют в фоновом режиме."""
+    """Планировщик периодического обновления курсов валют в фоновом режиме.
+
+    У каждого источника своё расписание со случайным сдвигом: интервал равен
+    max-age из заголовков источника, но не длиннее предела, при котором
+    снимок обновляется за SCHEDULER_TTL_FRACTION от rates_ttl_seconds даже
+    с наибольшим сдвигом (предел важнее max-age); после ошибки повтор назначается сразу с нарастающей задержкой.
+    Источники обновляются в отдельных потоках: медленный или повторяющий
+    запросы источник не задерживает остальные.
+    """
 
-    def __init__(self, interval_seconds: int = 120):  # по умолчанию каждые две минуты
-        self.interval = interval_seconds
+    def __init__(self, interval_seconds: Optional[int] = None):
+        self.config = ParserConfig()
+        # По умолчанию интервал выбирается так, чтобы новый снимок появлялся
+        # раньше, чем истечёт срок актуальности курсов, даже с учётом сдвига
+        ttl = float(SettingsLoader().get("rates_ttl_seconds", 300))
+        max_interval = ttl * self.config.SCHEDULER_TTL_FRACTION / (1 + self.config.SCHEDULER_JITTER)
+        self.interval = interval_seconds or max_interval
         self._thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
-        self.config = ParserConfig()
+        self._lock = threading.Lock()
+        # Сигнал основному циклу: источник завершил обновление или планировщик остановлен
+        self._changed = threading.Condition(self._lock)
         self.updater = RatesUpdater(self.config)
+        self._schedules: Dict[str, SourceSchedule] = {
+            client.key: SourceSchedule(client.key, client.name, float(self.interval))
+            for client in self.updater.clients
+        }
+
+    def _source_interval(self, schedule: SourceSchedule) -> float:
+        """Интервал источника: max-age источника, ограниченный сверху базовым интервалом"""
+        max_age = self.updater.source_stats().get(schedule.name, {}).get("max_age")
+        interval = float(self.interval)
+        if max_age:
+            # Чаще, чем источник обновляет данные, опрашивать бессмысленно
+            interval = min(interval, max(float(max_age), self.config.SCHEDULER_MIN_INTERVAL))
+        return interval
+
+    def _jittered(self, delay: float) -> float:
+        jitter = self.config.SCHEDULER_JITTER
+        return max(0.0, delay * random.uniform(1 - jitter, 1 + jitter))
+
+    def _retry_delay(self, schedule: SourceSchedule) -> float:
+        """Задержка повтора после ошибки: экспоненциальная, но не дольше интервала
+
+        Разомкнутый предохранитель продлевает задержку до своего retry_after,
+        даже если он длиннее интервала: раньше запрос всё равно будет отклонён.
+        """
+        delay = self.config.SCHEDULER_RETRY_DELAY * (2 ** (schedule.failures - 1))
+        delay = self._jittered(min(delay, schedule.interval))
+        breaker = self.updater.breaker_states().get(schedule.name)
+        if breaker and breaker["state"] == "open":
+            # retry_after округлён до 0,1 с: небольшой запас, чтобы не прийти раньше half_open
+            delay = max(delay, breaker["retry_after"] + 0.1)
+        return delay
+
+    def _run_source(self, schedule: SourceSchedule) -> None:
+        logger.info(f"Планировщик: обновление курсов {schedule.name}...")
+        started = time.perf_counter()
+        try:
+            count = self.updater.run_update(source=schedule.key)
+        except Exception as e:
+            count, error = 0, str(e)
+            logger.error(f"Планировщик: ошибка при обновлении {schedule.name} — {e}")
+        else:
+            error = None
+            logger.info(f"Планировщик: {schedule.name} — обновлено {count} курсов")
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            schedule.runs += 1
+            schedule.last_run = datetime.now().isoformat(timespec="seconds")
+            schedule.last_duration = duration
+            schedule.last_count = count
+            schedule.last_error = error
+            if error is None:
+                schedule.failures = 0
+                schedule.interval = self._source_interval(schedule)
+                delay = self._jittered(schedule.interval)
+            else:
+                schedule.failures += 1
+                delay = self._retry_delay(schedule)
+            schedule.next_due = time.monotonic() + delay
+            schedule.running = False
+            self._changed.notify()
+        if error is not None:
+            self._report_breakers()
 
     def _run(self) -> None:
-        """Основной цикл обновления"""
-        logger.info(f"Планировщик запущен. Интервал: {self.interval} секунд")
-        while not self._stop_event.wait(self.interval):
-            try:
-                logger.info("Планировщик: запуск обновления курсов...")
-                count = self.updater.run_update()
-                logger.info(f"Планировщик: обновлено {count} курсов")
-            except Exception as e:
-                logger.error(f"Планировщик: ошибка при обновлении — {e}")
+        """Основной цикл: запуск источников, срок которых наступил, каждого в своём потоке"""
+        logger.info(f"Планировщик запущен. Базовый интервал: {self.interval:.0f} секунд")
+        with self._lock:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                for schedule in self._schedules.values():
+                    if not schedule.running and schedule.next_due <= now:
+                        schedule.running = True
+                        # Поток-демон: зависший запрос не задерживает выход из программы
+                        threading.Thread(
+                            target=self._run_source, args=(schedule,),
+                            name=f"rates-scheduler-{schedule.key}", daemon=True,
+                        ).start()
+                # Выполняющиеся источники получат срок по завершении (notify)
+                waiting = [s.next_due for s in self._schedules.values() if not s.running]
+                timeout = max(min(waiting) - time.monotonic(), 0.0) if waiting else None
+                self._changed.wait(timeout)
+
+    def _report_breakers(self) -> None:
+        """Запись в лог источников с разомкнутым предохранителем"""
+        for name, state in self.updater.breaker_states().items():
+            if state["state"] != "closed":
+                logger.warning(
+                    f"Планировщик: источник {name} в состоянии {state['state']} "
+                    f"(ошибок подряд: {state['failures']}, повтор через {state['retry_after']} с)"
+                )
+
+    def source_health(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние предохранителей источников"""
+        return self.updater.breaker_states()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Статистика источников: последний запуск, длительность, следующий срок"""
+        now = time.monotonic()
+        health = self.updater.breaker_states()
+        with self._lock:
+            return [
+                {
+                    "source": s.name,
+                    "interval": s.interval,
+                    "last_run": s.last_run,
+                    "last_duration": s.last_duration,
+                    "last_count": s.last_count,
+                    "last_error": s.last_error,
+                    "runs": s.runs,
+                    "failures": s.failures,
+                    "next_due_in": max(0.0, s.next_due - now) if self.is_running() else None,
+                    "breaker": health.get(s.name, {}).get("state", "closed"),
+                }
+                for s in self._schedules.values()
+            ]
 
     def start(self) -> None:
-        """Запуск фонового потока с первым обновлением"""
+        """Запуск фонового потока; первое обновление выполняется в нём же"""
         if self._thread is not None and self._thread.is_alive():
             logger.warning("Планировщик уже запущен")
             return
-        
+
         self._stop_event.clear()
-        
-        try:
-            logger.info("Планировщик: первое обновление курсов при старте...")
-            count = self.updater.run_update()
-            logger.info(f"Планировщик: первое обновление завершено. Получено {count} курсов")
-        except Exception as e:
-            logger.error(f"Планировщик: ошибка при первом обновлении — {e}")
-        
-        # Запуск фонового потока для периодических обновлений
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        now = time.monotonic()
+        with self._lock:
+            for schedule in self._schedules.values():
+                schedule.next_due = now
+
+        self._thread = threading.Thread(target=self._run, name="rates-scheduler", daemon=True)
         self._thread.start()
         logger.info("Планировщик активирован")
 
@@ -53,9 +191,12 @@ class RatesScheduler:
         """Остановка фонового потока"""
         if self._thread is not None:
             self._stop_event.set()
+            with self._lock:
+                self._changed.notify_all()
             self._thread.join(timeout=2.0)
             logger.info("Планировщик остановлен")
+            flush_logging()
 
     def is_running(self) -> bool:
         """Проверка, запущен ли планировщик"""
-        return self._thread is not None and self._thread.is_alive()
\ No newline at end of file
+        return self._thread is not None and self._thread.is_alive()
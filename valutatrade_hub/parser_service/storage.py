@@ -1,23 +1,142 @@
 import json
+import logging
 import os
 import tempfile
-from datetime import datetime, timezone
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
 
+from valutatrade_hub.events import SNAPSHOT_COMMITTED, SnapshotCommitted, bus
+from valutatrade_hub.infra.file_lock import FileLock
+from valutatrade_hub.parser_service.binary_history import BinaryHistoryStore, import_records
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.history import HistorySegments, convert_legacy_history
+
+logger = logging.getLogger("valutatrade")
+
+# Блокировки фиксации по файлу снимка: общие для всех экземпляров RatesStorage
+# процесса (обновление, история, офлайн-источники) и, через flock, для других процессов
+_commit_locks: Dict[str, FileLock] = {}
+_commit_locks_guard = threading.Lock()
+# Файлы снимков, для которых в этом процессе уже выполнено восстановление истории
+_recovered: Set[str] = set()
+
+
+def _commit_lock_for(rates_file: str) -> FileLock:
+    key = os.path.abspath(rates_file)
+    with _commit_locks_guard:
+        lock = _commit_locks.get(key)
+        if lock is None:
+            lock = FileLock(Path(key + ".lock"))
+            _commit_locks[key] = lock
+        return lock
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Атомарная замена JSON-файла через временный файл в том же каталоге"""
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=path.parent) as tmp:
+        json.dump(data, tmp, indent=2, ensure_ascii=False)
+        tmp.flush()
+        os.fsync(tmp.fileno())
+    os.replace(tmp.name, path)
+
+
+def make_history_record(pair: str, rate: float, source: str, timestamp: str) -> Dict[str, Any]:
+    """Запись истории курсов в формате exchange_rates.json"""
+    from_curr, to_curr = pair.split("_")
+    return {
+        "id": f"{from_curr}_{to_curr}_{timestamp}",
+        "from_currency": from_curr,
+        "to_currency": to_curr,
+        "rate": rate,
+        "timestamp": timestamp,
+        "source": source
+    }
 
 
 class RatesStorage:
     def __init__(self, config: ParserConfig):
         self.config = config
         self._ensure_data_dir()
+        self.history = self._create_history_store()
+        self._commit_lock = _commit_lock_for(self.config.RATES_FILE_PATH)
+        self._convert_legacy_history()
 
     def _ensure_data_dir(self) -> None:
         Path(self.config.RATES_FILE_PATH).parent.mkdir(parents=True, exist_ok=True)
 
-    def save_snapshot(self, pairs: Dict[str, Dict[str, Any]]) -> int:
-        """Сохранение курсов в совместимом формате"""
+    def _create_history_store(self) -> Union[HistorySegments, BinaryHistoryStore]:
+        """Хранилище истории по параметру HISTORY_FORMAT (jsonl или binary)"""
+        if self.config.HISTORY_FORMAT == "binary":
+            return BinaryHistoryStore(Path(self.config.HISTORY_BINARY_DIR))
+        if self.config.HISTORY_FORMAT == "jsonl":
+            return HistorySegments(Path(self.config.HISTORY_DIR), self.config.HISTORY_SEGMENT_MAX_BYTES)
+        raise ValueError(f"Неизвестный формат истории HISTORY_FORMAT: {self.config.HISTORY_FORMAT}")
+
+    def _convert_legacy_history(self) -> None:
+        """Однократный перенос истории из старых форматов"""
+        legacy_path = Path(self.config.HISTORY_FILE_PATH)
+        if isinstance(self.history, HistorySegments):
+            if legacy_path.exists():
+                count = convert_legacy_history(legacy_path, self.history)
+                logger.info(f"История курсов перенесена в {self.config.HISTORY_DIR}: {count} записей")
+            return
+
+        if not self.history.is_empty():
+            return
+        count = 0
+        if legacy_path.exists():
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = sorted(json.load(f), key=lambda record: record["timestamp"])
+            count += import_records(self.history, legacy)
+            legacy_path.rename(legacy_path.with_suffix(legacy_path.suffix + ".bak"))
+        segments_dir = Path(self.config.HISTORY_DIR)
+        if segments_dir.exists():
+            count += import_records(self.history, HistorySegments(segments_dir).iter_records())
+        if count:
+            logger.info(f"История курсов перенесена в {self.config.HISTORY_BINARY_DIR}: {count} записей")
+
+    def load_snapshot(self) -> Dict[str, Any]:
+        """Чтение текущего снимка курсов (пустой словарь, если его нет)"""
+        path = Path(self.config.RATES_FILE_PATH)
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> None:
+        """Атомарная замена файла снимка"""
+        _write_json_atomic(Path(self.config.RATES_FILE_PATH), data)
+
+    def _commit_marker_path(self) -> Path:
+        return Path(self.config.RATES_FILE_PATH + ".commit")
+
+    def _committed_version(self, snapshot: Dict[str, Any]) -> Optional[int]:
+        """Последняя зафиксированная версия снимка (None — неизвестна)
+
+        Метка фиксации хранится отдельно от rates.json, поэтому замена
+        снимка извне (без версии или более старого) не выдаёт историю
+        за незафиксированную. Снимок записывается раньше метки, так что
+        после сбоя между ними его версия больше.
+        """
+        versions = [snapshot.get("version")]
+        try:
+            with open(self._commit_marker_path(), "r", encoding="utf-8") as f:
+                versions.append(json.load(f).get("version"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        versions = [v for v in versions if isinstance(v, int)]
+        return max(versions) if versions else None
+
+    def _write_commit_marker(self, version: int) -> None:
+        """Метка фиксации: пишется после снимка"""
+        _write_json_atomic(self._commit_marker_path(), {"version": version})
+
+    def _build_snapshot(self, pairs: Dict[str, Dict[str, Any]], version: int) -> Dict[str, Any]:
         data = {}
         for pair, info in pairs.items():
             data[pair] = {
@@ -28,33 +147,105 @@ class RatesStorage:
             (info["updated_at"] for info in pairs.values()),
             default=datetime.now().isoformat()
         )
+        data["version"] = version
+        return data
+
+    def _publish(self, previous: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+        """Событие о новом снимке с парами, курс которых изменился"""
+        changed = {
+            pair: info["rate"]
+            for pair, info in snapshot.items()
+            if isinstance(info, dict) and (previous.get(pair) or {}).get("rate") != info["rate"]
+        }
+        bus.publish(SNAPSHOT_COMMITTED, SnapshotCommitted(snapshot["version"], changed, snapshot))
 
-        with tempfile.NamedTemporaryFile("w", delete=False, dir=Path(self.config.RATES_FILE_PATH).parent) as tmp:
-            json.dump(data, tmp, indent=2, ensure_ascii=False)
-            os.replace(tmp.name, self.config.RATES_FILE_PATH)
+    def save_snapshot(self, pairs: Dict[str, Dict[str, Any]]) -> int:
+        """Сохранение курсов в совместимом формате"""
+        with self._commit_lock:
+            self._recover_uncommitted_history()
+            previous = self.load_snapshot()
+            snapshot = self._build_snapshot(pairs, (self._committed_version(previous) or 0) + 1)
+            self._write_snapshot(snapshot)
+            self._write_commit_marker(snapshot["version"])
+        self._publish(previous, snapshot)
         return len(pairs)
 
     def append_to_history(self, pair: str, rate: float, source: str) -> None:
-        from_curr, to_curr = pair.split("_")
-        timestamp = datetime.now().isoformat()
-        record_id = f"{from_curr}_{to_curr}_{timestamp}"
-
-        record = {
-            "id": record_id,
-            "from_currency": from_curr,
-            "to_currency": to_curr,
-            "rate": rate,
-            "timestamp": timestamp,
-            "source": source
-        }
+        record = make_history_record(pair, rate, source, datetime.now().isoformat())
+        with self._commit_lock:
+            self._recover_uncommitted_history()
+            self.history.append([record])
+
+    def begin_batch(self) -> "RatesBatch":
+        """Начало пакета записей одного цикла обновления"""
+        return RatesBatch()
+
+    def commit_batch(self, batch: "RatesBatch") -> int:
+        """Фиксация пакета: одна дозапись истории и одна замена снимка
+
+        Записи истории помечаются версией снимка и пишутся первыми; если
+        снимок не удалось заменить, они отрезаются, поэтому история никогда
+        не опережает снимок. SNAPSHOT_COMMITTED публикуется после снятия
+        блокировки: подписчики (исполнение ордеров) не задерживают фиксацию
+        в других потоках и процессах, а устаревшие версии отбрасывают сами.
+        """
+        if not batch.pairs:
+            return 0
+        with self._commit_lock:
+            self._recover_uncommitted_history()
+            snapshot = self.load_snapshot()
+            version = (self._committed_version(snapshot) or 0) + 1
+            records = [dict(record, version=version) for record in batch.records]
+            position = self.history.append(records, sync=True)
+            try:
+                pairs = {k: v for k, v in snapshot.items() if isinstance(v, dict)}
+                pairs.update(batch.pairs)
+                new_snapshot = self._build_snapshot(pairs, version)
+                self._write_snapshot(new_snapshot)
+            except Exception:
+                self.history.rollback(position)
+                raise
+            self._write_commit_marker(version)
+        self._publish(snapshot, new_snapshot)
+        return len(batch.pairs)
+
+    def _recover_uncommitted_history(self) -> None:
+        """Удаление хвоста истории, записанного без последующей фиксации снимка
+
+        Выполняется один раз на процесс и только под блокировкой фиксации:
+        иначе новый экземпляр мог бы отрезать записи, которые другой
+        экземпляр уже дописал, но ещё не закрепил снимком.
+        """
+        with self._commit_lock:
+            key = os.path.abspath(self.config.RATES_FILE_PATH)
+            if key in _recovered:
+                return
+            snapshot = self.load_snapshot()
+            committed = self._committed_version(snapshot)
+            history_version = self.history.recover(snapshot, committed)
+            if history_version is not None and history_version > (committed or 0):
+                # Сохранённая история опережает заменённый снимок: нумерация
+                # продолжается после неё, чтобы версии не повторялись
+                self._write_commit_marker(history_version)
+            _recovered.add(key)
+
+    def iter_history(self, pair: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Ленивое чтение истории курсов (опционально по одной паре)"""
+        self._recover_uncommitted_history()
+        return self.history.iter_records(pair)
+
+
+class RatesBatch:
+    """Записи одного цикла обновления, фиксируемые одной операцией"""
+
+    def __init__(self) -> None:
+        self.pairs: Dict[str, Dict[str, Any]] = {}
+        self.records: List[Dict[str, Any]] = []
 
-        history_path = Path(self.config.HISTORY_FILE_PATH)
-        history = []
-        if history_path.exists():
-            with open(history_path, "r", encoding="utf-8") as f:
-                history = json.load(f)
-        history.append(record)
+    def add(self, pair: str, rate: float, source: str, timestamp: str) -> None:
+        """Добавление курса в пакет"""
+        self.pairs[pair] = {"rate": rate, "updated_at": timestamp}
+        self.records.append(make_history_record(pair, rate, source, timestamp))
 
-        with tempfile.NamedTemporaryFile("w", delete=False, dir=history_path.parent) as tmp:
-            json.dump(history, tmp, indent=2, ensure_ascii=False)
-            os.replace(tmp.name, history_path)
\ No newline at end of file
+    def __len__(self) -> int:
+        return len(self.pairs)
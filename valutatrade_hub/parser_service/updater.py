@@ -1,8 +1,12 @@
 import logging
-from typing import List
-from datetime import datetime, timezone
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Any, Dict, List, Optional
+from datetime import datetime
 
 from valutatrade_hub.parser_service.api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient
+from valutatrade_hub.parser_service.resilience import ResilientClient
 from valutatrade_hub.parser_service.storage import RatesStorage
 from valutatrade_hub.parser_service.config import ParserConfig
 from valutatrade_hub.core.exceptions import ApiRequestError
@@ -16,45 +20,77 @@ class RatesUpdater:
         self.config = config
         self.storage = RatesStorage(config)
         self.clients: List[BaseApiClient] = [
-            CoinGeckoClient(config),
-            ExchangeRateApiClient(config)
+            ResilientClient(client, config) for client in self._create_clients(config)
         ]
 
+    @staticmethod
+    def _create_clients(config: ParserConfig) -> List[BaseApiClient]:
+        if config.RATES_SOURCE in ("replay", "random"):
+            from valutatrade_hub.parser_service.offline import create_offline_client
+            return [create_offline_client(config)]
+        return [CoinGeckoClient(config), ExchangeRateApiClient(config)]
+
+    def breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние предохранителей источников"""
+        return {
+            client.name: client.breaker.snapshot()
+            for client in self.clients
+            if isinstance(client, ResilientClient)
+        }
+
+    def source_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Сетевые счётчики по источникам (байты, попадания в кеш, задержка)"""
+        stats: Dict[str, Dict[str, Any]] = {}
+        for client in self.clients:
+            stats.update(client.http.stats())
+        return stats
+
+    def _select_clients(self, source: Optional[str]) -> List[BaseApiClient]:
+        if source is None:
+            return self.clients
+        clients = [c for c in self.clients if c.key == source]
+        if not clients:
+            keys = " или ".join(dict.fromkeys(c.key for c in self.clients))
+            raise ApiRequestError(f"Неизвестный источник. Используйте: {keys}")
+        return clients
+
     def run_update(self, source: str = None) -> int:
         logger.info("Начало обновления курсов валют...")
-        all_rates = {}
+        batch = self.storage.begin_batch()
         timestamp = datetime.now().isoformat()
         errors = []
 
-        clients_to_use = []
-        if source is None:
-            clients_to_use = self.clients
-        elif source == "coingecko":
-            clients_to_use = [c for c in self.clients if isinstance(c, CoinGeckoClient)]
-        elif source == "exchangerate":
-            clients_to_use = [c for c in self.clients if isinstance(c, ExchangeRateApiClient)]
-
-        if not clients_to_use:
-            raise ApiRequestError("Неизвестный источник. Используйте: coingecko или exchangerate")
-
-        for client in clients_to_use:
-            source_name = "CoinGecko" if isinstance(client, CoinGeckoClient) else "ExchangeRate-API"
-            try:
-                rates = client.fetch_rates()
-                for pair, rate in rates.items():
-                    all_rates[pair] = {
-                        "rate": rate,
-                        "updated_at": timestamp,
-                        "source": source_name
-                    }
-                    self.storage.append_to_history(pair, rate, source_name)
-                logger.info(f"{source_name}: OK ({len(rates)} курса)")
-            except ApiRequestError as e:
-                logger.error(f"Не удалось получить курс {source_name}: {e}")
-                errors.append(str(e))
-
-        if all_rates:
-            self.storage.save_snapshot(all_rates)
-            return len(all_rates)
-        else:
-            raise ApiRequestError("Не удалось получить ни одного курса")
\ No newline at end of file
+        clients_to_use = self._select_clients(source)
+
+        # Источники опрашиваются параллельно: длительность цикла — максимум, а не сумма
+        executor = ThreadPoolExecutor(max_workers=len(clients_to_use), thread_name_prefix="rates-fetch")
+        deadline = time.monotonic() + self.config.UPDATE_DEADLINE
+        futures = {executor.submit(client.fetch_rates, deadline): client for client in clients_to_use}
+        try:
+            for future in as_completed(futures, timeout=self.config.UPDATE_DEADLINE):
+                source_name = futures[future].name
+                try:
+                    rates = future.result()
+                    for pair, rate in rates.items():
+                        batch.add(pair, rate, source_name, timestamp)
+                    logger.info(f"{source_name}: OK ({len(rates)} курса)")
+                except ApiRequestError as e:
+                    logger.error(f"Не удалось получить курс {source_name}: {e}")
+                    errors.append(str(e))
+                except Exception as e:
+                    # Например, изменившийся формат ответа: курсы остальных источников сохраняются
+                    logger.error(f"Не удалось обработать ответ {source_name}: {e!r}")
+                    errors.append(f"{source_name}: {e!r}")
+        except FuturesTimeoutError:
+            for future, client in futures.items():
+                if not future.done():
+                    logger.error(f"Не удалось получить курс {client.name}: превышен срок цикла {self.config.UPDATE_DEADLINE} с")
+                    errors.append(f"{client.name}: timeout")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not batch:
+            raise ApiRequestError("Не удалось получить ни одного курса")
+        # История и снимок фиксируются одной операцией на цикл;
+        # подписчики узнают о новом снимке из события SNAPSHOT_COMMITTED
+        return self.storage.commit_batch(batch)